@@ -0,0 +1,40 @@
+"""Store amounts in kopecks
+
+Revision ID: 0b6d2e94c7a1
+Revises: f3a81c6d0b94
+Create Date: 2026-10-18 19:40:51.772310
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '0b6d2e94c7a1'
+down_revision = 'f3a81c6d0b94'
+branch_labels = None
+depends_on = None
+
+# До этой ревизии суммы хранились в целых рублях.
+MONEY_COLUMNS = {
+    'charityproject': ('full_amount', 'invested_amount'),
+    'donation': ('full_amount', 'invested_amount'),
+    'allocation': ('amount',),
+    'fundtotals': ('projects_required', 'donated', 'invested'),
+    'usertotals': ('donated', 'invested'),
+}
+
+
+def rescale(operator):
+    for table, columns in MONEY_COLUMNS.items():
+        op.execute(f'UPDATE {table} SET ' + ', '.join(
+            f'{column} = {column} {operator} 100' for column in columns
+        ))
+
+
+def upgrade():
+    rescale('*')
+
+
+def downgrade():
+    # Доли рубля при откате отбрасываются.
+    rescale('/')
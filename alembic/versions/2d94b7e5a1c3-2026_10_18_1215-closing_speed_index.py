@@ -0,0 +1,28 @@
+"""Closing speed index
+
+Revision ID: 2d94b7e5a1c3
+Revises: 8f3a61c0d2e7
+Create Date: 2026-10-18 12:15:03.281640
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '2d94b7e5a1c3'
+down_revision = '8f3a61c0d2e7'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index(
+        'ix_charityproject_fully_invested', 'charityproject',
+        ['fully_invested', 'create_date', 'close_date'], unique=False,
+    )
+
+
+def downgrade():
+    op.drop_index(
+        'ix_charityproject_fully_invested', table_name='charityproject'
+    )
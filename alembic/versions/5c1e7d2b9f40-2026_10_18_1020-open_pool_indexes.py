@@ -0,0 +1,36 @@
+"""Open pool indexes
+
+Revision ID: 5c1e7d2b9f40
+Revises: a13c2eb6033a
+Create Date: 2026-10-18 10:20:41.512334
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5c1e7d2b9f40'
+down_revision = 'a13c2eb6033a'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    for table in ('charityproject', 'donation'):
+        op.create_index(
+            op.f(f'ix_{table}_open_fifo'), table,
+            ['fully_invested', 'create_date', 'id'],
+            unique=False,
+            sqlite_where=sa.text('fully_invested = 0'),
+            postgresql_where=sa.text('fully_invested = false'),
+        )
+    op.create_index(
+        op.f('ix_donation_user_id'), 'donation', ['user_id'], unique=False
+    )
+
+
+def downgrade():
+    op.drop_index(op.f('ix_donation_user_id'), table_name='donation')
+    for table in ('donation', 'charityproject'):
+        op.drop_index(op.f(f'ix_{table}_open_fifo'), table_name=table)
@@ -0,0 +1,61 @@
+"""Fund totals
+
+Revision ID: 8f3a61c0d2e7
+Revises: 5c1e7d2b9f40
+Create Date: 2026-10-18 11:40:12.904117
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8f3a61c0d2e7'
+down_revision = '5c1e7d2b9f40'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'fundtotals',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('projects_count', sa.Integer(), nullable=False),
+        sa.Column('projects_required', sa.Integer(), nullable=False),
+        sa.Column('open_projects', sa.Integer(), nullable=False),
+        sa.Column('donations_count', sa.Integer(), nullable=False),
+        sa.Column('donated', sa.Integer(), nullable=False),
+        sa.Column('open_donations', sa.Integer(), nullable=False),
+        sa.Column('invested', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table(
+        'usertotals',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('donations_count', sa.Integer(), nullable=False),
+        sa.Column('donated', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['id'], ['user.id'], ),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.execute(
+        'INSERT INTO fundtotals (id, projects_count, projects_required, '
+        'open_projects, donations_count, donated, open_donations, invested) '
+        'SELECT 1, '
+        '(SELECT COUNT(*) FROM charityproject), '
+        '(SELECT COALESCE(SUM(full_amount), 0) FROM charityproject), '
+        '(SELECT COUNT(*) FROM charityproject WHERE NOT fully_invested), '
+        '(SELECT COUNT(*) FROM donation), '
+        '(SELECT COALESCE(SUM(full_amount), 0) FROM donation), '
+        '(SELECT COUNT(*) FROM donation WHERE NOT fully_invested), '
+        '(SELECT COALESCE(SUM(invested_amount), 0) FROM donation)'
+    )
+    op.execute(
+        'INSERT INTO usertotals (id, donations_count, donated) '
+        'SELECT user_id, COUNT(*), SUM(full_amount) FROM donation '
+        'WHERE user_id IS NOT NULL GROUP BY user_id'
+    )
+
+
+def downgrade():
+    op.drop_table('usertotals')
+    op.drop_table('fundtotals')
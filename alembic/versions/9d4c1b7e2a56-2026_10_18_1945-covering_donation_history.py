@@ -0,0 +1,35 @@
+"""Cover donation history amounts by the history index
+
+Revision ID: 9d4c1b7e2a56
+Revises: 0b6d2e94c7a1
+Create Date: 2026-10-18 19:45:12.408531
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9d4c1b7e2a56'
+down_revision = '0b6d2e94c7a1'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.drop_index('ix_donation_user_history', table_name='donation')
+    op.create_index(
+        'ix_donation_user_history', 'donation',
+        ['user_id', sa.text('create_date DESC'), sa.text('id DESC'),
+         'full_amount'],
+        unique=False,
+    )
+
+
+def downgrade():
+    op.drop_index('ix_donation_user_history', table_name='donation')
+    op.create_index(
+        'ix_donation_user_history', 'donation',
+        ['user_id', sa.text('create_date DESC'), sa.text('id DESC')],
+        unique=False,
+    )
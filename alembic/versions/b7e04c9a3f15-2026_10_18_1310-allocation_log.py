@@ -0,0 +1,44 @@
+"""Allocation log
+
+Revision ID: b7e04c9a3f15
+Revises: 2d94b7e5a1c3
+Create Date: 2026-10-18 13:10:27.640815
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b7e04c9a3f15'
+down_revision = '2d94b7e5a1c3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'allocation',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('donation_id', sa.Integer(), nullable=False),
+        sa.Column('project_id', sa.Integer(), nullable=False),
+        sa.Column('amount', sa.Integer(), nullable=False),
+        sa.Column('ts', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['donation_id'], ['donation.id'], ),
+        sa.ForeignKeyConstraint(['project_id'], ['charityproject.id'], ),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(
+        'ix_allocation_donation_id', 'allocation', ['donation_id', 'id'],
+        unique=False,
+    )
+    op.create_index(
+        'ix_allocation_project_id', 'allocation', ['project_id', 'id'],
+        unique=False,
+    )
+
+
+def downgrade():
+    op.drop_index('ix_allocation_project_id', table_name='allocation')
+    op.drop_index('ix_allocation_donation_id', table_name='allocation')
+    op.drop_table('allocation')
@@ -0,0 +1,49 @@
+"""Money columns as BIGINT minor units
+
+Revision ID: c5f2a8d13e70
+Revises: e41d9a7c2b58
+Create Date: 2026-10-18 19:15:42.518903
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c5f2a8d13e70'
+down_revision = 'e41d9a7c2b58'
+branch_labels = None
+depends_on = None
+
+# Суммы в копейках; в SQLite INTEGER и так восьмибайтовый, поэтому
+# таблицы там не пересоздаются.
+MONEY_COLUMNS = (
+    ('charityproject', 'full_amount', False),
+    ('charityproject', 'invested_amount', True),
+    ('donation', 'full_amount', False),
+    ('donation', 'invested_amount', True),
+    ('allocation', 'amount', False),
+    ('fundtotals', 'projects_required', False),
+    ('fundtotals', 'donated', False),
+    ('fundtotals', 'invested', False),
+    ('usertotals', 'donated', False),
+    ('usertotals', 'invested', False),
+)
+
+
+def alter_money_columns(old_type, new_type):
+    if op.get_bind().dialect.name == 'sqlite':
+        return
+    for table, column, nullable in MONEY_COLUMNS:
+        op.alter_column(
+            table, column, type_=new_type, existing_type=old_type,
+            existing_nullable=nullable,
+        )
+
+
+def upgrade():
+    alter_money_columns(sa.Integer(), sa.BigInteger())
+
+
+def downgrade():
+    alter_money_columns(sa.BigInteger(), sa.Integer())
@@ -0,0 +1,43 @@
+"""Donation history index and user invested totals
+
+Revision ID: e41d9a7c2b58
+Revises: b7e04c9a3f15
+Create Date: 2026-10-18 19:05:08.215407
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e41d9a7c2b58'
+down_revision = 'b7e04c9a3f15'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index(
+        'ix_donation_user_history', 'donation',
+        ['user_id', sa.text('create_date DESC'), sa.text('id DESC')],
+        unique=False,
+    )
+    op.drop_index(op.f('ix_donation_user_id'), table_name='donation')
+    with op.batch_alter_table('usertotals') as batch_op:
+        batch_op.add_column(sa.Column(
+            'invested', sa.Integer(), nullable=False, server_default='0'
+        ))
+    op.execute(
+        'UPDATE usertotals SET invested = ('
+        'SELECT COALESCE(SUM(invested_amount), 0) FROM donation '
+        'WHERE donation.user_id = usertotals.id)'
+    )
+
+
+def downgrade():
+    with op.batch_alter_table('usertotals') as batch_op:
+        batch_op.drop_column('invested')
+    op.create_index(
+        op.f('ix_donation_user_id'), 'donation', ['user_id'], unique=False
+    )
+    op.drop_index('ix_donation_user_history', table_name='donation')
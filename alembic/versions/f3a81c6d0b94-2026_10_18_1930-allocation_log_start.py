@@ -0,0 +1,39 @@
+"""Allocation log start point
+
+Revision ID: f3a81c6d0b94
+Revises: c5f2a8d13e70
+Create Date: 2026-10-18 19:30:14.306521
+
+"""
+from datetime import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f3a81c6d0b94'
+down_revision = 'c5f2a8d13e70'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    log_start = op.create_table(
+        'allocationlogstart',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('ts', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('id')
+    )
+    # Журнал ведётся как минимум с первой записи в нём; пустой журнал
+    # считается начатым сейчас.
+    first_ts = op.get_bind().execute(
+        sa.text('SELECT MIN(ts) FROM allocation')
+    ).scalar()
+    if isinstance(first_ts, str):
+        first_ts = datetime.fromisoformat(first_ts)
+    op.bulk_insert(log_start, [{'id': 1, 'ts': first_ts or datetime.now()}])
+
+
+def downgrade():
+    op.drop_table('allocationlogstart')
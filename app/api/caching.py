@@ -0,0 +1,53 @@
+from http import HTTPStatus
+from typing import Awaitable, Callable
+
+from fastapi import Request, Response
+
+from app.utils.response_cache import CachedResponse, response_cache
+
+CACHED_HEADERS = ('x-next-cursor',)
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get('if-none-match')
+    if header is None:
+        return False
+    tags = [tag.strip() for tag in header.split(',')]
+    return '*' in tags or etag in tags or f'W/{etag}' in tags
+
+
+async def cache_entry(
+    namespace: str,
+    query: str,
+    build: Callable[[], Awaitable[Response]],
+) -> CachedResponse:
+    """Запись кэша для строки запроса; при промахе ответ строится build."""
+    key = await response_cache.key(namespace, query)
+    entry = await response_cache.get(key)
+    if entry is None:
+        response = await build()
+        entry = await response_cache.set(key, response.body, {
+            name: value for name, value in response.headers.items()
+            if name in CACHED_HEADERS
+        })
+    return entry
+
+
+async def cached_response(
+    request: Request,
+    namespace: str,
+    build: Callable[[], Awaitable[Response]],
+) -> Response:
+    """Ответ из кэша пространства имён namespace с поддержкой ETag.
+
+    Ключ кэша — версия пространства имён и строка запроса. Если ETag
+    ответа совпадает с If-None-Match, тело не отправляется.
+    """
+    query = '&'.join(sorted(request.url.query.split('&')))
+    entry = await cache_entry(namespace, query, build)
+    headers = {**entry.headers, 'ETag': entry.etag}
+    if etag_matches(request, entry.etag):
+        return Response(status_code=HTTPStatus.NOT_MODIFIED, headers=headers)
+    return Response(
+        entry.body, media_type='application/json', headers=headers
+    )
@@ -1,19 +1,27 @@
 from typing import List
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query, Request
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.api.caching import cached_response
+from app.api.export import ExportParams, export_response
+from app.api.pagination import PageParams, paginate
 from app.api.validators import (check_charity_project_already_invested,
                                 check_charity_project_closed,
                                 check_charity_project_exists,
                                 check_charity_project_invested_sum,
                                 check_name_duplicate)
+from app.core.config import settings
 from app.core.db import get_async_session
+from app.core.replicas import get_read_session
 from app.core.user import current_superuser
+from app.crud.allocation import allocation_crud
 from app.crud.charity_project import charity_project_crud
-from app.models import Donation
+from app.models import Allocation, CharityProject, Donation
+from app.schemas.allocation import AllocationDB
 from app.schemas.charity_project import (CharityProjectCreate,
                                          CharityProjectDB,
+                                         CharityProjectSpeed,
                                          CharityProjectUpdate)
 from app.utils.investing import investing_process
 
@@ -33,11 +41,10 @@ async def create_charity_project(
     """Только для суперюзеров.
     Создает благотворительный проект.
     """
-    await check_name_duplicate(charity_project.name, session)
-    await charity_project_crud.get_project_id_by_name(
-        charity_project.name, session
-    )
-    new_project = await charity_project_crud.create(charity_project, session)
+    async with check_name_duplicate(session):
+        new_project = await charity_project_crud.create(
+            charity_project, session, commit=False
+        )
     await investing_process(new_project, Donation, session)
     return new_project
 
@@ -48,11 +55,75 @@ async def create_charity_project(
     response_model_exclude_none=True,
 )
 async def get_all_charity_projects(
+    request: Request,
+    page: PageParams = Depends(),
     session: AsyncSession = Depends(get_async_session),
 ):
-    """Получает список всех проектов."""
-    all_projects = await charity_project_crud.get_multi(session)
-    return all_projects
+    """Получает список всех проектов.
+    Поддерживает постраничную выдачу и выбор полей.
+    Ответ кэшируется до изменения проектов и отдаётся с ETag.
+    Промах кэша читается из основной БД: ответ реплики, отстающей
+    от записи, закэшировался бы под уже новой версией.
+    """
+    return await cached_response(
+        request, CharityProject.__tablename__,
+        lambda: paginate(
+            charity_project_crud, session, page, CharityProjectDB
+        ),
+    )
+
+
+@router.get(
+    '/export',
+    dependencies=[Depends(current_superuser)],
+)
+async def export_charity_projects(
+    params: ExportParams = Depends(),
+    session: AsyncSession = Depends(get_read_session),
+):
+    """Только для суперюзеров.
+    Выгружает проекты потоком в NDJSON или CSV.
+    """
+    return export_response(
+        charity_project_crud, session, params, CharityProjectDB, 'projects'
+    )
+
+
+@router.get(
+    '/closing_speed',
+    response_model=List[CharityProjectSpeed],
+    dependencies=[Depends(current_superuser)],
+)
+async def get_closing_speed_report(
+    limit: int = Query(100, ge=1, le=settings.page_max_size),
+    offset: int = Query(0, ge=0),
+    session: AsyncSession = Depends(get_read_session),
+):
+    """Только для суперюзеров.
+    Закрытые проекты в порядке скорости сбора средств.
+    """
+    return await charity_project_crud.get_projects_by_completion_rate(
+        session, limit, offset
+    )
+
+
+@router.get(
+    '/{project_id}/allocations',
+    response_model=List[AllocationDB],
+    dependencies=[Depends(current_superuser)],
+)
+async def get_charity_project_allocations(
+    project_id: int,
+    page: PageParams = Depends(),
+    session: AsyncSession = Depends(get_read_session),
+):
+    """Только для суперюзеров.
+    Журнал поступлений в проект из пожертвований.
+    """
+    return await paginate(
+        allocation_crud, session, page, AllocationDB,
+        where=[Allocation.project_id == project_id], exclude_none=False,
+    )
 
 
 @router.patch(
@@ -73,14 +144,13 @@ async def update_charity_project(
         project_id, session
     )
     check_charity_project_closed(project)
-    if obj_in.name:
-        await check_name_duplicate(obj_in.name, session)
     if obj_in.full_amount is not None:
         check_charity_project_invested_sum(project, obj_in.full_amount)
 
-    charity_project = await charity_project_crud.update(
-        project, obj_in, session
-    )
+    async with check_name_duplicate(session):
+        charity_project = await charity_project_crud.update(
+            project, obj_in, session
+        )
     return charity_project
 
 
@@ -1,14 +1,26 @@
+from http import HTTPStatus
 from typing import List
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.api.export import ExportParams, export_response
+from app.api.pagination import (NEXT_CURSOR_HEADER, HistoryParams,
+                                PageParams, check_fields, paginate)
+from app.api.responses import FastJSONResponse, row_dicts
+from app.core.config import settings
 from app.core.db import get_async_session
+from app.core.replicas import get_read_session
 from app.core.user import current_superuser, current_user
+from app.crud.allocation import allocation_crud
 from app.crud.donation import donation_crud
-from app.models import CharityProject, User
-from app.schemas.donation import DonationBase, DonationCreate, DonationDB
-from app.utils.investing import investing_process
+from app.models import Allocation, CharityProject, Donation, User
+from app.schemas.allocation import AllocationDB
+from app.schemas.donation import (DonationAllocation, DonationBase,
+                                  DonationBatch, DonationCreate, DonationDB)
+from app.utils.allocation_worker import allocation_worker
+from app.utils.investing import (OpenObject, investing_process,
+                                 investing_process_many)
 
 router = APIRouter()
 
@@ -23,12 +35,54 @@ async def create_donation(
     session: AsyncSession = Depends(get_async_session),
     user: User = Depends(current_user),
 ):
-    """Сделать пожертвование."""
-    new_donation = await donation_crud.create(donation, session, user)
+    """Сделать пожертвование.
+    В режиме allocation_async распределение выполняется
+    в фоне после ответа; его состояние — в /donation/{id}/allocation.
+    """
+    if settings.allocation_async:
+        new_donation = await donation_crud.create(donation, session, user)
+        allocation_worker.submit(Donation, [OpenObject(
+            new_donation.id, new_donation.full_amount, 0,
+            new_donation.create_date,
+        )])
+        return new_donation
+    new_donation = await donation_crud.create(
+        donation, session, user, commit=False
+    )
     await investing_process(new_donation, CharityProject, session)
     return new_donation
 
 
+@router.post(
+    '/batch',
+    response_model=List[DonationCreate],
+    response_model_exclude_none=True,
+)
+async def create_donations_batch(
+    donations: DonationBatch,
+    session: AsyncSession = Depends(get_async_session),
+    user: User = Depends(current_user),
+):
+    """Сделать пакет пожертвований.
+    Пожертвования распределяются по проектам в порядке пакета
+    за одну транзакцию.
+    """
+    new_donations = await donation_crud.create_multi(donations, session, user)
+    incoming = [
+        OpenObject(donation['id'], donation['full_amount'], 0,
+                   donation['create_date'])
+        for donation in new_donations
+    ]
+    if settings.allocation_async:
+        await donation_crud.commit(session)
+        allocation_worker.submit(Donation, incoming)
+    else:
+        await investing_process_many(
+            incoming, Donation, CharityProject, session,
+        )
+    return new_donations
+
+
 @router.get(
     '/',
     response_model=List[DonationDB],
@@ -36,13 +90,30 @@ async def create_donation(
     dependencies=[Depends(current_superuser)],
 )
 async def get_all_donations(
-    session: AsyncSession = Depends(get_async_session),
+    page: PageParams = Depends(),
+    session: AsyncSession = Depends(get_read_session),
 ):
     """Только для суперюзеров.
     Получает список всех пожертвований.
+    Поддерживает постраничную выдачу и выбор полей.
+    """
+    return await paginate(donation_crud, session, page, DonationDB)
+
+
+@router.get(
+    '/export',
+    dependencies=[Depends(current_superuser)],
+)
+async def export_donations(
+    params: ExportParams = Depends(),
+    session: AsyncSession = Depends(get_read_session),
+):
+    """Только для суперюзеров.
+    Выгружает пожертвования потоком в NDJSON или CSV.
     """
-    all_donations = await donation_crud.get_multi(session)
-    return all_donations
+    return export_response(
+        donation_crud, session, params, DonationDB, 'donations'
+    )
 
 
 @router.get(
@@ -51,11 +122,80 @@ async def get_all_donations(
     response_model_exclude={'user_id'},
 )
 async def get_my_reservations(
-    session: AsyncSession = Depends(get_async_session),
+    history: HistoryParams = Depends(),
+    session: AsyncSession = Depends(get_read_session),
     user: User = Depends(current_user)
 ):
-    """Получить список моих пожертвований."""
-    donations = await donation_crud.get_by_user(
-        session=session, user=user
+    """Получить список моих пожертвований.
+    Поддерживает постраничную выдачу, фильтр по дате создания
+    и выбор полей. Итоги пожертвований — в /stats/my.
+    """
+    fields = list(DonationCreate.__fields__)
+    if history.fields is not None:
+        fields = check_fields(history.fields, DonationCreate)
+    try:
+        rows, next_cursor = await donation_crud.get_user_history(
+            session, user.id, fields, history.limit, history.cursor,
+            history.date_from, history.date_to, history.newest_first,
+        )
+    except ValueError:
+        raise HTTPException(
+            status_code=HTTPStatus.BAD_REQUEST,
+            detail='Некорректный курсор страницы!',
+        )
+    headers = {}
+    if next_cursor is not None:
+        headers[NEXT_CURSOR_HEADER] = next_cursor
+    return FastJSONResponse(
+        row_dicts(fields, rows, exclude_none=False), headers=headers
+    )
+
+
+@router.get(
+    '/{donation_id}/allocations',
+    response_model=List[AllocationDB],
+    dependencies=[Depends(current_superuser)],
+)
+async def get_donation_allocations(
+    donation_id: int,
+    page: PageParams = Depends(),
+    session: AsyncSession = Depends(get_read_session),
+):
+    """Только для суперюзеров.
+    Журнал распределения пожертвования по проектам.
+    """
+    return await paginate(
+        allocation_crud, session, page, AllocationDB,
+        where=[Allocation.donation_id == donation_id], exclude_none=False,
+    )
+
+
+@router.get(
+    '/{donation_id}/allocation',
+    response_model=DonationAllocation,
+)
+async def get_donation_allocation(
+    donation_id: int,
+    session: AsyncSession = Depends(get_async_session),
+    user: User = Depends(current_user),
+):
+    """Состояние распределения своего пожертвования:
+    pending — ещё в очереди, done — распределено, failed — ошибка,
+    unknown — открыто, но этот процесс его не распределял.
+    """
+    donation = await donation_crud.get(donation_id, session)
+    if donation is None or (
+        donation.user_id != user.id and not user.is_superuser
+    ):
+        raise HTTPException(
+            status_code=HTTPStatus.NOT_FOUND,
+            detail='Пожертвование не найдено!',
+        )
+    return DonationAllocation(
+        id=donation.id,
+        status=allocation_worker.status(
+            Donation, donation.id, donation.fully_invested
+        ),
+        invested_amount=donation.invested_amount,
+        fully_invested=donation.fully_invested,
     )
-    return donations
@@ -0,0 +1,45 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from app.core.db import engine, pool_status
+from app.core.lifecycle import lifecycle
+from app.utils.metrics import render_metrics
+
+router = APIRouter()
+
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def pool_gauges() -> list:
+    lines = []
+    for name, value in pool_status(engine.pool).items():
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            metric = f'db_pool_{name}'
+            lines.extend((f'# TYPE {metric} gauge', f'{metric} {value}'))
+    return lines
+
+
+def startup_gauges() -> list:
+    lines = ['# TYPE app_startup_phase_seconds gauge']
+    for phase, seconds in lifecycle.timings.items():
+        lines.append(
+            f'app_startup_phase_seconds{{phase="{phase}"}} {seconds}'
+        )
+    return lines
+
+
+@router.get('', response_class=PlainTextResponse)
+async def get_metrics():
+    """Гистограммы запросов и распределения, состояние пула и время
+    фаз запуска в формате Prometheus.
+    """
+    return PlainTextResponse(
+        render_metrics(pool_gauges() + startup_gauges()),
+        media_type=PROMETHEUS_CONTENT_TYPE,
+    )
+
+
+@router.get('/pool')
+async def get_pool_status():
+    """Состояние пула соединений с БД."""
+    return pool_status(engine.pool)
@@ -0,0 +1,74 @@
+from fastapi import APIRouter, Depends
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.db import get_async_session
+from app.core.replicas import get_read_session
+from app.core.user import current_superuser, current_user
+from app.models import User
+from app.schemas.stats import FundStats, Reconciliation, UserStats
+from app.utils.aggregates import (read_totals, read_user_totals,
+                                  reconcile_totals)
+from app.utils.investing import check_ledger, rebuild_ledger
+from app.utils.ledger import ledger
+
+router = APIRouter()
+
+
+@router.get('/', response_model=FundStats)
+async def get_fund_stats(
+    session: AsyncSession = Depends(get_read_session),
+):
+    """Итоги фонда: собрано, распределено, сколько ещё нужно проектам."""
+    totals = await read_totals(session)
+    return FundStats(
+        **totals,
+        still_needed=totals['projects_required'] - totals['invested'],
+        free_donations=totals['donated'] - totals['invested'],
+    )
+
+
+@router.get('/my', response_model=UserStats)
+async def get_user_stats(
+    session: AsyncSession = Depends(get_read_session),
+    user: User = Depends(current_user),
+):
+    """Итоги пожертвований текущего пользователя."""
+    return await read_user_totals(session, user.id)
+
+
+@router.post(
+    '/reconcile',
+    response_model=Reconciliation,
+    dependencies=[Depends(current_superuser)],
+)
+async def reconcile_stats(
+    fix: bool = False,
+    session: AsyncSession = Depends(get_async_session),
+):
+    """Только для суперюзеров.
+    Сверяет итоги с пересчётом по таблицам; с fix=true исправляет их.
+    Итоги, изменённые записью во время сверки, можно сверить повторно.
+    """
+    drift = await reconcile_totals(session, fix)
+    return Reconciliation(drift=drift, fixed=fix and bool(drift))
+
+
+@router.post(
+    '/ledger',
+    response_model=Reconciliation,
+    dependencies=[Depends(current_superuser)],
+)
+async def reconcile_ledger(
+    fix: bool = False,
+    session: AsyncSession = Depends(get_async_session),
+):
+    """Только для суперюзеров.
+    Сверяет открытые пулы в памяти этого процесса с БД; с fix=true
+    перечитывает их из БД. Без загруженных пулов сверять нечего.
+    """
+    if not ledger.loaded:
+        return Reconciliation(drift=[], fixed=False)
+    drift = await check_ledger(session)
+    if fix and drift:
+        await rebuild_ledger(session)
+    return Reconciliation(drift=drift, fixed=fix and bool(drift))
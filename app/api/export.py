@@ -0,0 +1,48 @@
+from typing import Type
+
+from fastapi import Depends, Query
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api.pagination import DateRangeParams
+from app.crud.base import CRUDBase
+from app.utils.export import MEDIA_TYPES, ExportFormat, export_rows
+
+
+class ExportParams(DateRangeParams):
+    """Параметры выгрузки: формат и полуинтервал дат создания."""
+
+    def __init__(
+        self,
+        export_format: ExportFormat = Query(
+            ExportFormat.ndjson, alias='format'
+        ),
+        dates: DateRangeParams = Depends(),
+    ):
+        super().__init__(dates.date_from, dates.date_to)
+        self.export_format = export_format
+
+
+def export_response(
+    crud: CRUDBase,
+    session: AsyncSession,
+    params: ExportParams,
+    schema: Type[BaseModel],
+    filename: str,
+) -> StreamingResponse:
+    """Потоковая выгрузка всех полей схемы без загрузки таблицы в память."""
+    fields = list(schema.__fields__)
+    chunks = crud.stream_rows(
+        session, fields, params.date_from, params.date_to
+    )
+    return StreamingResponse(
+        export_rows(params.export_format, fields, chunks),
+        media_type=MEDIA_TYPES[params.export_format],
+        headers={
+            'Content-Disposition': (
+                f'attachment; filename="{filename}.'
+                f'{params.export_format.value}"'
+            ),
+        },
+    )
@@ -0,0 +1,128 @@
+from datetime import datetime
+from http import HTTPStatus
+from typing import Dict, List, Optional, Sequence, Tuple, Type
+
+from fastapi import Depends, HTTPException, Query
+from pydantic import BaseModel
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api.responses import FastJSONResponse, row_dicts
+from app.core.config import settings
+from app.crud.base import CRUDBase
+
+NEXT_CURSOR_HEADER = 'X-Next-Cursor'
+
+
+class PageParams:
+    """Параметры постраничной выдачи списков."""
+
+    def __init__(
+        self,
+        limit: Optional[int] = Query(
+            None, ge=1, le=settings.page_max_size,
+            description='Размер страницы; без него выдаётся весь список.',
+        ),
+        cursor: Optional[str] = Query(
+            None, description=f'Значение заголовка {NEXT_CURSOR_HEADER}.',
+        ),
+        fields: Optional[str] = Query(
+            None, description='Поля ответа через запятую.',
+        ),
+    ):
+        self.limit = limit
+        self.cursor = cursor
+        self.fields = fields
+
+
+class DateRangeParams:
+    """Полуинтервал дат создания: date_from включается, date_to — нет."""
+
+    def __init__(
+        self,
+        date_from: Optional[datetime] = Query(
+            None, description='Созданные не раньше этого момента.'
+        ),
+        date_to: Optional[datetime] = Query(
+            None, description='Созданные раньше этого момента.'
+        ),
+    ):
+        self.date_from = date_from
+        self.date_to = date_to
+
+
+class HistoryParams(PageParams, DateRangeParams):
+    """Постраничная выдача истории с фильтром по дате создания."""
+
+    def __init__(
+        self,
+        page: PageParams = Depends(),
+        dates: DateRangeParams = Depends(),
+        newest_first: bool = Query(
+            False, description='Сначала новые.'
+        ),
+    ):
+        PageParams.__init__(self, page.limit, page.cursor, page.fields)
+        DateRangeParams.__init__(self, dates.date_from, dates.date_to)
+        self.newest_first = newest_first
+
+
+def check_fields(fields: str, schema: Type[BaseModel]) -> List[str]:
+    requested = [field.strip() for field in fields.split(',')]
+    unknown = [field for field in requested if field not in schema.__fields__]
+    if unknown:
+        raise HTTPException(
+            status_code=HTTPStatus.BAD_REQUEST,
+            detail=f'Неизвестные поля: {", ".join(unknown)}',
+        )
+    return list(dict.fromkeys(requested))
+
+
+async def read_page(
+    crud: CRUDBase,
+    session: AsyncSession,
+    params: PageParams,
+    schema: Type[BaseModel],
+    where: Sequence = (),
+) -> Tuple[list, List[str], Dict[str, str]]:
+    """Строки страницы, их поля и заголовки ответа.
+
+    Без параметра fields выбираются все поля схемы.
+    """
+    fields = list(schema.__fields__)
+    if params.fields is not None:
+        fields = check_fields(params.fields, schema)
+    try:
+        rows, next_cursor = await crud.get_page(
+            session, params.limit, params.cursor, fields, where
+        )
+    except ValueError:
+        raise HTTPException(
+            status_code=HTTPStatus.BAD_REQUEST,
+            detail='Некорректный курсор страницы!',
+        )
+    headers = {}
+    if next_cursor is not None:
+        headers[NEXT_CURSOR_HEADER] = next_cursor
+    return rows, fields, headers
+
+
+async def paginate(
+    crud: CRUDBase,
+    session: AsyncSession,
+    params: PageParams,
+    schema: Type[BaseModel],
+    where: Sequence = (),
+    exclude_none: bool = True,
+) -> FastJSONResponse:
+    """Страница списка; курсор следующей — в заголовке X-Next-Cursor.
+
+    Ответ собирается из строк выборки по полям схемы, минуя валидацию
+    response_model; exclude_none повторяет response_model_exclude_none
+    эндпоинта.
+    """
+    rows, fields, headers = await read_page(
+        crud, session, params, schema, where
+    )
+    return FastJSONResponse(
+        row_dicts(fields, rows, exclude_none), headers=headers
+    )
@@ -0,0 +1,38 @@
+from typing import Any, Iterable, List, Sequence
+
+import orjson
+from fastapi.responses import JSONResponse
+
+
+def dumps(content: Any) -> bytes:
+    """JSON в байтах через orjson.
+
+    Даты без часового пояса выводятся как isoformat(), то есть так же,
+    как в схемах pydantic.
+    """
+    return orjson.dumps(content)
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse с кодировщиком dumps для уже готовых словарей."""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def row_dicts(
+    fields: Sequence[str], rows: Iterable[Sequence], exclude_none: bool = True
+) -> List[dict]:
+    """Словари ответа прямо из строк выборки, без валидации схемой.
+
+    Значения колонок уже имеют типы полей схемы, поэтому результат
+    совпадает с ответом через response_model; лишние колонки в конце
+    строки отбрасываются.
+    """
+    if exclude_none:
+        return [
+            {field: value for field, value in zip(fields, row)
+             if value is not None}
+            for row in rows
+        ]
+    return [dict(zip(fields, row)) for row in rows]
@@ -1,12 +1,25 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends
 
-from api.endpoints import charity_project_router, donation_router, user_router
+from api.endpoints import (
+    charity_project_router, donation_router, metrics_router, stats_router,
+    user_router,
+)
+from app.core.replicas import route_writes
 
 main_router = APIRouter()
 main_router.include_router(
-    charity_project_router, prefix='/charity_project', tags=['charity_projects']
+    charity_project_router, prefix='/charity_project', tags=['charity_projects'],
+    dependencies=[Depends(route_writes)],
+)
+main_router.include_router(
+    donation_router, prefix='/donation', tags=['donations'],
+    dependencies=[Depends(route_writes)],
 )
 main_router.include_router(
-    donation_router, prefix='/donation', tags=['donations']
+    stats_router, prefix='/stats', tags=['stats'],
+    dependencies=[Depends(route_writes)],
 )
 main_router.include_router(user_router)
+main_router.include_router(
+    metrics_router, prefix='/metrics', tags=['metrics']
+)
@@ -1,18 +1,45 @@
+from contextlib import asynccontextmanager
 from http import HTTPStatus
 
 from fastapi import HTTPException
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.crud.charity_project import charity_project_crud
 from app.models import CharityProject
 
+# Ограничение UNIQUE(name) создано без имени: PostgreSQL называет его
+# по шаблону <таблица>_<колонка>_key, SQLite пишет в ошибке таблицу
+# и колонку.
+NAME_CONSTRAINT = f'{CharityProject.__tablename__}_name_key'
+NAME_COLUMN = f'{CharityProject.__tablename__}.name'
 
-async def check_name_duplicate(
-    project_name: str,
-    session: AsyncSession,
-):
-    project_id = await charity_project_crud.get_project_id_by_name(project_name, session)
-    if project_id is not None:
+
+def is_name_duplicate(error: IntegrityError) -> bool:
+    """Нарушено ли ограничение уникальности имени проекта.
+
+    Имя ограничения берётся из diag (psycopg) или исключения asyncpg;
+    у SQLite его нет, и проверяется текст ошибки.
+    """
+    constraint = getattr(
+        getattr(error.orig, 'diag', None), 'constraint_name', None
+    ) or getattr(error.orig.__cause__, 'constraint_name', None)
+    if constraint is not None:
+        return constraint == NAME_CONSTRAINT
+    return (
+        f'unique constraint failed: {NAME_COLUMN}' in str(error.orig).lower()
+    )
+
+
+@asynccontextmanager
+async def check_name_duplicate(session: AsyncSession):
+    """Повтор имени проекта ловится уникальным индексом при записи."""
+    try:
+        yield
+    except IntegrityError as error:
+        await session.rollback()
+        if not is_name_duplicate(error):
+            raise
         raise HTTPException(
             status_code=HTTPStatus.BAD_REQUEST,
             detail='Проект с таким именем уже существует!',
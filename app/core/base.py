@@ -1,3 +1,5 @@
 """Импорты класса Base и всех моделей для Alembic."""
 from .db import Base  # noqa
-from app.models import User, CharityProject, Donation # noqa
\ No newline at end of file
+from app.models import (  # noqa
+    Allocation, CharityProject, Donation, FundTotals, User, UserTotals,
+)
\ No newline at end of file
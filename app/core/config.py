@@ -1,4 +1,4 @@
-from typing import Optional
+from typing import List, Optional
 
 from pydantic import BaseSettings, EmailStr
 
@@ -7,9 +7,46 @@ class Settings(BaseSettings):
     app_title: str = 'Кошачий благотворительный фонд'
     description: str = 'Сервис для поддержки котиков!'
     database_url: str = 'sqlite+aiosqlite:///./fastapi.db'
+    replica_urls: List[str] = []
+    read_your_writes_seconds: float = 5
+    read_your_writes_cache_size: int = 10000
+    sql_echo: bool = False
+    pool_size: int = 5
+    pool_max_overflow: int = 10
+    pool_timeout: float = 30
+    pool_recycle: int = 1800
+    pool_pre_ping: bool = True
+    statement_cache_size: int = 100
+    sqlite_journal_mode: str = 'WAL'
+    sqlite_synchronous: str = 'NORMAL'
+    sqlite_busy_timeout: int = 5000
+    instrumentation_enabled: bool = True
+    server_timing_sql: bool = False
     secret: str = 'SECRET'
+    jwt_lifetime_seconds: int = 3600
+    auth_cache_ttl: int = 60
+    auth_cache_size: int = 10000
+    bcrypt_rounds: int = 12
+    password_hash_workers: int = 4
     first_superuser_email: Optional[EmailStr] = None
     first_superuser_password: Optional[str] = None
+    investing_batch_size: int = 100
+    investing_attempts: int = 3
+    totals_shards: int = 16
+    ledger_enabled: bool = False
+    donation_batch_max_size: int = 10000
+    allocation_async: bool = False
+    allocation_batch_max_size: int = 1000
+    allocation_rematch_on_start: bool = True
+    allocation_retry_attempts: int = 3
+    allocation_retry_delay: float = 1
+    allocation_status_size: int = 10000
+    allocation_status_ttl: int = 3600
+    page_max_size: int = 1000
+    response_cache_size: int = 1000
+    response_cache_ttl: int = 5
+    startup_warmup: bool = True
+    startup_preload_cache: bool = False
 
     class Config:
         env_file = '.env'
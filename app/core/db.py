@@ -1,8 +1,14 @@
-from sqlalchemy import Column, Integer
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+import time
+
+from sqlalchemy import Column, Integer, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import (AsyncEngine, AsyncSession,
+                                    create_async_engine)
 from sqlalchemy.orm import declarative_base, declared_attr, sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, Pool
 
 from app.core.config import settings
+from app.utils.metrics import instrument_engine
 
 
 class PreBase:
@@ -16,9 +22,95 @@ class PreBase:
 
 Base = declarative_base(cls=PreBase)
 
-engine = create_async_engine(settings.database_url)
 
-AsyncSessionLocal = sessionmaker(engine, class_=AsyncSession)
+class MeasuredQueuePool(AsyncAdaptedQueuePool):
+    """Пул соединений, который считает ожидание выдачи соединения."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.checkouts = 0
+        self.wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+
+    def connect(self):
+        started = time.perf_counter()
+        try:
+            return super().connect()
+        finally:
+            waited = time.perf_counter() - started
+            self.checkouts += 1
+            self.wait_seconds += waited
+            self.max_wait_seconds = max(self.max_wait_seconds, waited)
+
+
+def engine_options(database_url: str) -> dict:
+    url = make_url(database_url)
+    options = {
+        'echo': settings.sql_echo,
+        'pool_pre_ping': settings.pool_pre_ping,
+    }
+    if url.get_backend_name() == 'sqlite' and url.database in (None, '', ':memory:'):
+        return options
+    options.update(
+        poolclass=MeasuredQueuePool,
+        pool_size=settings.pool_size,
+        max_overflow=settings.pool_max_overflow,
+        pool_timeout=settings.pool_timeout,
+        pool_recycle=settings.pool_recycle,
+    )
+    if url.get_driver_name() == 'asyncpg':
+        options['connect_args'] = {
+            'prepared_statement_cache_size': settings.statement_cache_size,
+        }
+    return options
+
+
+def set_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    cursor.execute(f'PRAGMA journal_mode={settings.sqlite_journal_mode}')
+    cursor.execute(f'PRAGMA synchronous={settings.sqlite_synchronous}')
+    cursor.execute(f'PRAGMA busy_timeout={settings.sqlite_busy_timeout}')
+    cursor.close()
+
+
+def pool_status(pool: Pool) -> dict:
+    """Состояние пула соединений для мониторинга."""
+    status = {'pool': type(pool).__name__}
+    if isinstance(pool, AsyncAdaptedQueuePool):
+        status.update(
+            size=pool.size(),
+            checked_in=pool.checkedin(),
+            checked_out=pool.checkedout(),
+            overflow=pool.overflow(),
+        )
+    if isinstance(pool, MeasuredQueuePool):
+        status.update(
+            checkouts=pool.checkouts,
+            wait_seconds=pool.wait_seconds,
+            max_wait_seconds=pool.max_wait_seconds,
+        )
+    return status
+
+
+def make_engine(database_url: str) -> AsyncEngine:
+    engine = create_async_engine(database_url, **engine_options(database_url))
+    if engine.dialect.name == 'sqlite':
+        event.listen(engine.sync_engine, 'connect', set_sqlite_pragmas)
+    if settings.instrumentation_enabled:
+        instrument_engine(engine.sync_engine)
+    return engine
+
+
+engine = make_engine(settings.database_url)
+replica_engines = [make_engine(url) for url in settings.replica_urls]
+
+AsyncSessionLocal = sessionmaker(
+    engine, class_=AsyncSession, expire_on_commit=False
+)
+ReplicaSessionLocals = [
+    sessionmaker(replica, class_=AsyncSession, expire_on_commit=False)
+    for replica in replica_engines
+]
 
 
 async def get_async_session():
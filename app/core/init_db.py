@@ -3,11 +3,16 @@ import logging
 
 from fastapi_users.exceptions import UserAlreadyExists
 from pydantic import EmailStr
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.config import settings
 from app.core.db import get_async_session
 from app.core.user import get_user_db, get_user_manager
+from app.models import User
 from app.schemas.user import UserCreate
+from app.utils.allocation_worker import allocation_worker
+from app.utils.investing import rebuild_ledger
 
 get_async_session_context = contextlib.asynccontextmanager(get_async_session)
 get_user_db_context = contextlib.asynccontextmanager(get_user_db)
@@ -32,11 +37,44 @@ async def create_user(
         logging.error('Пользователь уже существует!')
 
 
+async def user_exists(session: AsyncSession, email: str) -> bool:
+    user_id = await session.scalar(
+        select(User.id).where(func.lower(User.email) == func.lower(email))
+    )
+    return user_id is not None
+
+
 async def create_first_superuser():
+    """Создаёт первого суперпользователя, если его ещё нет.
+
+    Существование проверяется одним запросом: менеджер пользователей
+    и хеш пароля нужны только для создания.
+    """
     if (settings.first_superuser_email is not None and
             settings.first_superuser_password is not None):
+        async with get_async_session_context() as session:
+            if await user_exists(session, settings.first_superuser_email):
+                return
         await create_user(
             email=settings.first_superuser_email,
             password=settings.first_superuser_password,
             is_superuser=True,
         )
+
+
+async def init_ledger():
+    """Загружает пулы в память; под блокировкой ledger, чтобы не читать
+    их посреди фонового rematch.
+    """
+    if settings.ledger_enabled:
+        async with get_async_session_context() as session:
+            await rebuild_ledger(session)
+
+
+async def start_allocation_worker():
+    if settings.allocation_async:
+        await allocation_worker.start()
+
+
+async def stop_allocation_worker():
+    await allocation_worker.stop()
@@ -0,0 +1,80 @@
+import re
+import time
+
+from app.core.config import settings
+from app.utils.metrics import (REQUEST_DURATION, REQUEST_SQL_DURATION,
+                               REQUEST_SQL_STATEMENTS, RequestStats,
+                               current_stats)
+
+UNMATCHED_ROUTE = '<unmatched>'
+
+
+def describe_statement(statement: str, limit: int = 100) -> str:
+    statement = re.sub(r'\s+', ' ', statement).strip()[:limit]
+    return statement.replace('\\', '\\\\').replace('"', '\\"')
+
+
+def server_timing(stats: RequestStats, duration: float) -> str:
+    """Значение заголовка Server-Timing; длительности в миллисекундах."""
+    entries = [
+        f'app;dur={duration * 1000:.2f}',
+        f'sql;dur={stats.sql_time * 1000:.2f};'
+        f'desc="{stats.sql_count} statements"',
+    ]
+    entries.extend(
+        f'{name};dur={span * 1000:.2f}' for name, span in stats.spans.items()
+    )
+    if settings.server_timing_sql:
+        entries.extend(
+            f'sql-{rank};dur={statement_time * 1000:.2f};'
+            f'desc="{describe_statement(statement)}"'
+            for rank, (statement_time, statement) in enumerate(
+                sorted(stats.slowest, reverse=True), 1
+            )
+        )
+    return ', '.join(entries)
+
+
+class InstrumentationMiddleware:
+    """ASGI-посредник, замеряющий обработку каждого HTTP-запроса.
+
+    Время до начала ответа и SQL-запросы, выполненные за это время,
+    попадают в заголовок Server-Timing и в гистограммы /metrics
+    с разбивкой по шаблону пути.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+        stats = RequestStats()
+        token = current_stats.set(stats)
+        started = time.perf_counter()
+        duration = None
+
+        async def send_with_timing(message):
+            nonlocal duration
+            if message['type'] == 'http.response.start':
+                duration = time.perf_counter() - started
+                message['headers'] = list(message.get('headers', [])) + [(
+                    b'server-timing', server_timing(stats, duration).encode()
+                )]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            current_stats.reset(token)
+            if duration is None:
+                duration = time.perf_counter() - started
+            route = scope.get('route')
+            labels = (
+                scope['method'],
+                route.path if route is not None else UNMATCHED_ROUTE,
+            )
+            REQUEST_DURATION.observe(duration, *labels)
+            REQUEST_SQL_STATEMENTS.observe(stats.sql_count, *labels)
+            REQUEST_SQL_DURATION.observe(stats.sql_time, *labels)
@@ -0,0 +1,71 @@
+import logging
+import time
+from typing import Awaitable, Callable, Dict, List, NamedTuple, Optional
+
+Hook = Callable[[], Awaitable[None]]
+
+
+class Phase(NamedTuple):
+    name: str
+    startup: Optional[Hook]
+    shutdown: Optional[Hook]
+    optional: bool
+
+
+class Lifecycle:
+    """Упорядоченные хуки запуска и остановки приложения.
+
+    Фазы запускаются в порядке добавления, останавливаются в обратном.
+    Если фаза не запустилась, уже запущенные останавливаются, а ошибка
+    пробрасывается дальше. Ошибка необязательной фазы (прогрева)
+    только пишется в лог. Время запуска каждой фазы пишется в лог
+    и доступно в timings.
+    """
+
+    def __init__(self):
+        self.phases: List[Phase] = []
+        self.started: List[Phase] = []
+        self.timings: Dict[str, float] = {}
+
+    def add(
+        self,
+        name: str,
+        startup: Optional[Hook] = None,
+        shutdown: Optional[Hook] = None,
+        optional: bool = False,
+    ) -> None:
+        self.phases.append(Phase(name, startup, shutdown, optional))
+
+    async def startup(self) -> None:
+        started = time.perf_counter()
+        self.started = []
+        self.timings = {}
+        for phase in self.phases:
+            phase_started = time.perf_counter()
+            if phase.startup is not None:
+                try:
+                    await phase.startup()
+                except Exception:
+                    logging.exception('Не удалось запустить %s', phase.name)
+                    if not phase.optional:
+                        await self.shutdown()
+                        raise
+            self.started.append(phase)
+            self.timings[phase.name] = time.perf_counter() - phase_started
+            logging.info('Запуск %s: %.1f мс', phase.name,
+                         self.timings[phase.name] * 1000)
+        logging.info('Приложение запущено за %.1f мс',
+                     (time.perf_counter() - started) * 1000)
+
+    async def shutdown(self) -> None:
+        while self.started:
+            phase = self.started.pop()
+            if phase.shutdown is None:
+                continue
+            try:
+                await phase.shutdown()
+            except Exception:
+                logging.exception('Не удалось остановить %s', phase.name)
+
+
+lifecycle = Lifecycle()
@@ -0,0 +1,49 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Tuple
+
+from fastapi_users.password import PasswordHelper
+from passlib.context import CryptContext
+
+from app.core.config import settings
+
+
+class PooledPasswordHelper(PasswordHelper):
+    """Хеширование паролей bcrypt в отдельном пуле потоков.
+
+    bcrypt отпускает GIL, поэтому расчёт хеша не блокирует цикл событий
+    и идёт параллельно в пределах workers потоков. При workers=0 хеш
+    считается прямо в цикле событий.
+    """
+
+    def __init__(self, rounds: int, workers: int):
+        super().__init__(CryptContext(
+            schemes=['bcrypt'], deprecated='auto', bcrypt__rounds=rounds,
+        ))
+        self.executor = None
+        if workers > 0:
+            self.executor = ThreadPoolExecutor(
+                max_workers=workers, thread_name_prefix='password',
+            )
+
+    async def _run(self, func, *args):
+        if self.executor is None:
+            return func(*args)
+        return await asyncio.get_running_loop().run_in_executor(
+            self.executor, func, *args
+        )
+
+    async def hash_async(self, password: str) -> str:
+        return await self._run(self.hash, password)
+
+    async def verify_and_update_async(
+        self, plain_password: str, hashed_password: str
+    ) -> Tuple[bool, Optional[str]]:
+        return await self._run(
+            self.verify_and_update, plain_password, hashed_password
+        )
+
+
+password_helper = PooledPasswordHelper(
+    settings.bcrypt_rounds, settings.password_hash_workers
+)
@@ -0,0 +1,148 @@
+import itertools
+import math
+import time
+from typing import Optional, Sequence
+
+import jwt
+from fastapi import Depends, Request
+from fastapi.security.utils import get_authorization_scheme_param
+from fastapi_users.jwt import decode_jwt
+from sqlalchemy.orm import sessionmaker
+
+from app.core.config import settings
+from app.core.db import AsyncSessionLocal, ReplicaSessionLocals
+from app.core.user import jwt_strategy, user_cache
+from app.utils.cache import TTLCache
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+READ_PRIMARY_COOKIE = 'read_primary_until'
+
+
+class SessionRouter:
+    """Выбор сессии для запроса: основная БД или одна из реплик.
+
+    Запись всегда идёт в основную БД, чтение — в реплики по кругу.
+    После записи пользователя его чтения ещё read_your_writes секунд
+    идут в основную БД, чтобы отставание реплик не прятало от него
+    его же изменения. Отметка о записи здесь живёт в памяти процесса
+    и видна только ему; между процессами срок переносит cookie
+    клиента (ReadYourWritesMiddleware).
+    """
+
+    def __init__(
+        self,
+        primary: sessionmaker,
+        replicas: Sequence[sessionmaker] = (),
+        read_your_writes: float = 0,
+        maxsize: int = settings.read_your_writes_cache_size,
+    ):
+        self.primary = primary
+        self.replicas = list(replicas)
+        self.next_replica = itertools.cycle(self.replicas)
+        self.writers = TTLCache(maxsize, read_your_writes)
+
+    def record_write(self, user_id: int) -> None:
+        self.writers.set(user_id, True)
+
+    def for_read(
+        self, user_id: Optional[int] = None, wrote_recently: bool = False,
+    ) -> sessionmaker:
+        if not self.replicas or wrote_recently or (
+            user_id is not None and self.writers.get(user_id, False)
+        ):
+            return self.primary
+        return next(self.next_replica)
+
+
+session_router = SessionRouter(
+    AsyncSessionLocal, ReplicaSessionLocals,
+    settings.read_your_writes_seconds,
+)
+
+
+async def current_user_id(request: Request) -> Optional[int]:
+    """id пользователя из токена запроса без обращения к БД.
+
+    Нужен только для выбора БД: проверку пользователя выполняют
+    зависимости авторизации эндпоинта.
+    """
+    scheme, token = get_authorization_scheme_param(
+        request.headers.get('Authorization')
+    )
+    if scheme.lower() != 'bearer' or not token:
+        return None
+    cached = user_cache.get(token)
+    if cached is not None:
+        return cached.id
+    try:
+        data = decode_jwt(
+            token, jwt_strategy.decode_key, jwt_strategy.token_audience,
+            algorithms=[jwt_strategy.algorithm],
+        )
+        return int(data['user_id'])
+    except (jwt.PyJWTError, KeyError, ValueError):
+        return None
+
+
+class ReadYourWritesMiddleware:
+    """Ставит клиенту после успешного пишущего запроса cookie со сроком,
+    до которого его чтения идут в основную БД.
+
+    В отличие от отметки в памяти SessionRouter, cookie приходит
+    в любой процесс приложения. Подделанный срок только отправляет
+    чтения клиента в основную БД.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http' or scope['method'] in SAFE_METHODS:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_cookie(message):
+            if (message['type'] == 'http.response.start' and
+                    message['status'] < 400):
+                seconds = settings.read_your_writes_seconds
+                cookie = (
+                    f'{READ_PRIMARY_COOKIE}={time.time() + seconds:.3f}; '
+                    f'Max-Age={math.ceil(seconds)}; Path=/; HttpOnly; '
+                    'SameSite=Lax'
+                )
+                message['headers'] = [
+                    *message.get('headers', ()),
+                    (b'set-cookie', cookie.encode()),
+                ]
+            await send(message)
+
+        await self.app(scope, receive, send_with_cookie)
+
+
+def wrote_recently(request: Request) -> bool:
+    """Не истёк ли срок чтения из основной БД из cookie клиента."""
+    try:
+        until = float(request.cookies.get(READ_PRIMARY_COOKIE, 0))
+    except ValueError:
+        return False
+    return until > time.time()
+
+
+async def route_writes(
+    request: Request,
+    user_id: Optional[int] = Depends(current_user_id),
+) -> None:
+    """Отмечает пишущий запрос пользователя до начала записи."""
+    if request.method not in SAFE_METHODS and user_id is not None:
+        session_router.record_write(user_id)
+
+
+async def get_read_session(
+    request: Request,
+    user_id: Optional[int] = Depends(current_user_id),
+):
+    """Сессия только для чтения: реплика или основная БД."""
+    async with session_router.for_read(
+        user_id, wrote_recently(request)
+    )() as async_session:
+        yield async_session
@@ -1,18 +1,28 @@
 import logging
-from typing import Optional, Union
+import time
+from typing import Any, Dict, Optional, Union
 
+import jwt
 from fastapi import Depends, Request
+from fastapi.security import OAuth2PasswordRequestForm
 from fastapi_users import (BaseUserManager, FastAPIUsers, IntegerIDMixin,
-                           InvalidPasswordException)
+                           InvalidPasswordException, exceptions)
 from fastapi_users.authentication import (AuthenticationBackend,
                                           BearerTransport, JWTStrategy)
+from fastapi_users.jwt import decode_jwt
 from fastapi_users_db_sqlalchemy import SQLAlchemyUserDatabase
+from sqlalchemy import inspect
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import make_transient_to_detached
 
 from app.core.config import settings
 from app.core.db import get_async_session
+from app.core.password import password_helper
 from app.models.user import User
 from app.schemas.user import UserCreate
+from app.utils.cache import TTLCache
+
+user_cache = TTLCache(settings.auth_cache_size, settings.auth_cache_ttl)
 
 
 async def get_user_db(session: AsyncSession = Depends(get_async_session)):
@@ -21,8 +31,65 @@ async def get_user_db(session: AsyncSession = Depends(get_async_session)):
 bearer_transport = BearerTransport(tokenUrl='auth/jwt/login')
 
 
+def detached_copy(user: User) -> User:
+    """Копия пользователя, не связанная ни с одной сессией."""
+    copy = User(**{
+        column.key: getattr(user, column.key)
+        for column in inspect(User).column_attrs
+    })
+    make_transient_to_detached(copy)
+    return copy
+
+
+def invalidate_user(user: User) -> None:
+    user_cache.discard_where(lambda cached: cached.id == user.id)
+
+
+class CachedJWTStrategy(JWTStrategy):
+    """JWT-стратегия, которая кэширует пользователей по токену.
+
+    Повторный запрос с тем же токеном не обращается к БД: копия
+    пользователя из кэша присоединяется к сессии запроса без SELECT.
+    Запись живёт не дольше auth_cache_ttl и срока действия токена
+    и удаляется при изменении пользователя через UserManager.
+    """
+
+    async def read_token(
+        self,
+        token: Optional[str],
+        user_manager: BaseUserManager[User, int],
+    ) -> Optional[User]:
+        if token is None:
+            return None
+        session = user_manager.user_db.session
+        cached = user_cache.get(token)
+        if cached is not None:
+            return await session.merge(cached, load=False)
+        try:
+            data = decode_jwt(
+                token, self.decode_key, self.token_audience,
+                algorithms=[self.algorithm],
+            )
+            user = await user_manager.get(
+                user_manager.parse_id(data['user_id'])
+            )
+        except (jwt.PyJWTError, KeyError,
+                exceptions.UserNotExists, exceptions.InvalidID):
+            return None
+        ttl = None
+        if 'exp' in data:
+            ttl = data['exp'] - time.time()
+        user_cache.set(token, detached_copy(user), ttl)
+        return user
+
+
+jwt_strategy = CachedJWTStrategy(
+    secret=settings.secret, lifetime_seconds=settings.jwt_lifetime_seconds
+)
+
+
 def get_jwt_strategy() -> JWTStrategy:
-    return JWTStrategy(secret=settings.secret, lifetime_seconds=3600)
+    return jwt_strategy
 
 
 auth_backend = AuthenticationBackend(
@@ -33,6 +100,68 @@ auth_backend = AuthenticationBackend(
 
 
 class UserManager(IntegerIDMixin, BaseUserManager[User, int]):
+    """Менеджер пользователей; bcrypt считается в пуле потоков."""
+
+    def __init__(self, user_db):
+        super().__init__(user_db, password_helper)
+
+    async def create(
+            self,
+            user_create: UserCreate,
+            safe: bool = False,
+            request: Optional[Request] = None,
+    ) -> User:
+        await self.validate_password(user_create.password, user_create)
+        if await self.user_db.get_by_email(user_create.email) is not None:
+            raise exceptions.UserAlreadyExists()
+        user_dict = (
+            user_create.create_update_dict()
+            if safe
+            else user_create.create_update_dict_superuser()
+        )
+        user_dict['hashed_password'] = await (
+            self.password_helper.hash_async(user_dict.pop('password'))
+        )
+        created_user = await self.user_db.create(user_dict)
+        await self.on_after_register(created_user, request)
+        return created_user
+
+    async def authenticate(
+            self, credentials: OAuth2PasswordRequestForm
+    ) -> Optional[User]:
+        try:
+            user = await self.get_by_email(credentials.username)
+        except exceptions.UserNotExists:
+            user = None
+        # Соединение с БД не должно простаивать, пока считается хеш.
+        await self.user_db.session.commit()
+        if user is None:
+            # Хеш считается и для неизвестного e-mail: время ответа
+            # не должно выдавать, зарегистрирован ли пользователь.
+            await self.password_helper.hash_async(credentials.password)
+            return None
+        verified, updated_password_hash = await (
+            self.password_helper.verify_and_update_async(
+                credentials.password, user.hashed_password
+            )
+        )
+        if not verified:
+            return None
+        if updated_password_hash is not None:
+            await self.user_db.update(
+                user, {'hashed_password': updated_password_hash}
+            )
+        return user
+
+    async def _update(self, user: User, update_dict: Dict[str, Any]) -> User:
+        if 'password' in update_dict:
+            update_dict = dict(update_dict)
+            password = update_dict.pop('password')
+            await self.validate_password(password, user)
+            update_dict['hashed_password'] = await (
+                self.password_helper.hash_async(password)
+            )
+        return await super()._update(user, update_dict)
 
     async def validate_password(
         self,
@@ -53,6 +182,24 @@ class UserManager(IntegerIDMixin, BaseUserManager[User, int]):
     ):
         logging.info(f'Пользователь {user.email} зарегистрирован.')
 
+    async def on_after_update(
+            self,
+            user: User,
+            update_dict: Dict[str, Any],
+            request: Optional[Request] = None,
+    ):
+        invalidate_user(user)
+
+    async def on_after_verify(
+            self, user: User, request: Optional[Request] = None
+    ):
+        invalidate_user(user)
+
+    async def on_after_reset_password(
+            self, user: User, request: Optional[Request] = None
+    ):
+        invalidate_user(user)
+
 
 async def get_user_manager(user_db=Depends(get_user_db)):
     yield UserManager(user_db)
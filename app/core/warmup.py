@@ -0,0 +1,138 @@
+"""Прогрев приложения перед приёмом запросов.
+
+Первые запросы после запуска иначе платят за подключение к БД,
+определение версии сервера, компиляцию SQL и запуск пула потоков.
+Соединения открываются заранее, а горячие запросы выполняются по разу:
+SQLAlchemy кэширует скомпилированный SQL в движке по структуре запроса,
+без значений параметров, поэтому дальше те же запросы берутся из кэша.
+"""
+import asyncio
+from datetime import datetime
+
+from fastapi_users_db_sqlalchemy import SQLAlchemyUserDatabase
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+from sqlalchemy.pool import QueuePool
+from starlette.concurrency import run_in_threadpool
+
+from app.api.caching import cache_entry
+from app.api.pagination import PageParams, paginate
+from app.core.config import settings
+from app.core.db import (AsyncSessionLocal, ReplicaSessionLocals, engine,
+                         replica_engines)
+from app.crud.charity_project import charity_project_crud
+from app.crud.donation import donation_crud
+from app.models import CharityProject, Donation, User
+from app.schemas.charity_project import CharityProjectDB
+from app.schemas.donation import DonationCreate, DonationDB
+from app.utils.aggregates import read_totals, read_user_totals
+from app.utils.investing import open_objects_query
+
+# Ключ после всех объектов: продолжение выборки открытых объектов
+# компилируется, но ничего не читает.
+LAST_KEY = (datetime.max, 0)
+
+
+async def warm_pool(
+    engine: AsyncEngine, size: int = settings.pool_size
+) -> int:
+    """Открывает до size соединений пула и возвращает их в пул.
+
+    Пулы без постоянных соединений (SQLite в памяти, NullPool)
+    пропускаются. Возвращает число открытых соединений.
+    """
+    if not isinstance(engine.pool, QueuePool):
+        return 0
+    connections = [
+        engine.connect() for _ in range(min(size, engine.pool.size()))
+    ]
+    if not connections:
+        return 0
+    try:
+        # Первое подключение движка определяет параметры диалекта под
+        # блокировкой потока; параллельные первые подключения в одном
+        # цикле событий на ней зависают.
+        await connections[0].start()
+        await asyncio.gather(*(
+            connection.start() for connection in connections[1:]
+        ))
+        await asyncio.gather(*(
+            connection.execute(text('SELECT 1'))
+            for connection in connections
+        ))
+    finally:
+        await asyncio.gather(*(
+            connection.close() for connection in connections
+            if connection.sync_connection is not None
+        ))
+    return len(connections)
+
+
+async def warm_threadpool() -> None:
+    """Запускает пул потоков для синхронных зависимостей FastAPI.
+
+    Бэкенд anyio импортируется, а поток создаётся при первом вызове,
+    иначе это достаётся первому запросу.
+    """
+    await run_in_threadpool(lambda: None)
+
+
+async def warm_statements(session: AsyncSession) -> None:
+    """Выполняет горячие запросы распределения, CRUD и входа.
+
+    Списки прогреваются в постраничном виде: список целиком пришлось
+    бы прочитать из БД полностью.
+    """
+    for model in (CharityProject, Donation):
+        batch_size = settings.investing_batch_size
+        await session.execute(open_objects_query(model, batch_size))
+        await session.execute(
+            open_objects_query(model, batch_size, LAST_KEY)
+        )
+    for crud, schema in (
+        (charity_project_crud, CharityProjectDB),
+        (donation_crud, DonationDB),
+    ):
+        await crud.get(0, session)
+        await crud.get_page(session, 1, fields=list(schema.__fields__))
+    await charity_project_crud.get_project_id_by_name('', session)
+    await donation_crud.get_user_history(
+        session, 0, list(DonationCreate.__fields__)
+    )
+    await donation_crud.get_user_history(
+        session, 0, list(DonationCreate.__fields__), limit=1
+    )
+    await read_totals(session)
+    await read_user_totals(session, 0)
+    await SQLAlchemyUserDatabase(session, User).get_by_email('')
+    await session.rollback()
+
+
+async def preload_project_list(session: AsyncSession) -> None:
+    """Кладёт в кэш ответов полный список проектов."""
+    await cache_entry(
+        CharityProject.__tablename__, '',
+        lambda: paginate(
+            charity_project_crud, session, PageParams(None, None, None),
+            CharityProjectDB,
+        ),
+    )
+
+
+async def warm_up() -> None:
+    """Прогревает пул потоков, пулы соединений и кэши SQL основной БД
+    и реплик.
+    """
+    await warm_threadpool()
+    await asyncio.gather(*(
+        warm_pool(pool_engine) for pool_engine in (engine, *replica_engines)
+    ))
+    for session_factory in (AsyncSessionLocal, *ReplicaSessionLocals):
+        async with session_factory() as session:
+            await warm_statements(session)
+
+
+async def preload_caches() -> None:
+    """Заполняет кэш ответов; список проектов читается из основной БД."""
+    async with AsyncSessionLocal() as session:
+        await preload_project_list(session)
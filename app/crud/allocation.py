@@ -0,0 +1,4 @@
+from app.crud.base import CRUDBase
+from app.models import Allocation
+
+allocation_crud = CRUDBase(Allocation)
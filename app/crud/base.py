@@ -1,9 +1,41 @@
-from typing import Optional
-from fastapi.encoders import jsonable_encoder
-from sqlalchemy import select
+import base64
+import binascii
+from datetime import datetime
+from typing import AsyncIterator, List, Optional, Sequence, Tuple
+
+from sqlalchemy import insert, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.models import User
+from app.utils import aggregates
+from app.utils.ledger import ledger
+from app.utils.response_cache import response_cache
+
+INSERT_CHUNK_SIZE = 500
+
+
+def encode_cursor(*key) -> str:
+    """Курсор страницы из значений ключа сортировки (id или дата и id)."""
+    return base64.urlsafe_b64encode(' '.join(
+        value.isoformat() if isinstance(value, datetime) else str(value)
+        for value in key
+    ).encode()).decode()
+
+
+def decode_cursor(cursor: str, types: Sequence[type] = (int,)) -> tuple:
+    """Разбирает курсор с ключом из значений types; ValueError, если
+    он повреждён."""
+    parsers = {int: int, datetime: datetime.fromisoformat}
+    try:
+        values = base64.urlsafe_b64decode(cursor.encode()).decode().split(' ')
+        if len(values) != len(types):
+            raise ValueError(cursor)
+        return tuple(
+            parsers[value_type](value)
+            for value_type, value in zip(types, values)
+        )
+    except (binascii.Error, UnicodeError) as error:
+        raise ValueError(cursor) from error
 
 
 class CRUDBase:
@@ -11,6 +43,12 @@ class CRUDBase:
     def __init__(self, model):
         self.model = model
 
+    async def commit(self, session: AsyncSession) -> None:
+        """Фиксирует транзакцию вместе с накопленными итогами."""
+        await aggregates.flush_totals(session)
+        await session.commit()
+        await response_cache.bump(self.model.__tablename__)
+
     async def get(
             self,
             obj_id: int,
@@ -30,36 +68,149 @@ class CRUDBase:
         db_objs = await session.execute(select(self.model))
         return db_objs.scalars().all()
 
+    async def get_page(
+            self,
+            session: AsyncSession,
+            limit: Optional[int] = None,
+            cursor: Optional[str] = None,
+            fields: Optional[List[str]] = None,
+            where: Sequence = (),
+    ) -> Tuple[list, Optional[str]]:
+        """Страница объектов по возрастанию id и курсор следующей.
+
+        Если переданы fields, выбираются только эти колонки (и id
+        последней, если её нет среди них), а объекты возвращаются
+        строками Row. where — условия отбора.
+        """
+        if fields is None:
+            query = select(self.model)
+        else:
+            columns = [getattr(self.model, field) for field in fields]
+            if 'id' not in fields:
+                columns.append(self.model.id)
+            query = select(*columns)
+        query = query.where(*where).order_by(self.model.id)
+        if cursor is not None:
+            (last_id,) = decode_cursor(cursor)
+            query = query.where(self.model.id > last_id)
+        if limit is not None:
+            query = query.limit(limit + 1)
+        result = await session.execute(query)
+        if fields is None:
+            objs = result.scalars().all()
+        else:
+            objs = result.all()
+        next_cursor = None
+        if limit is not None and len(objs) > limit:
+            objs = objs[:limit]
+            next_cursor = encode_cursor(objs[-1].id)
+        return objs, next_cursor
+
+    async def stream_rows(
+            self,
+            session: AsyncSession,
+            fields: List[str],
+            date_from: Optional[datetime] = None,
+            date_to: Optional[datetime] = None,
+            chunk_size: int = 1000,
+    ) -> AsyncIterator[list]:
+        """Порции строк с колонками fields по возрастанию id.
+
+        Строки читаются курсором на стороне сервера, поэтому
+        в памяти одновременно держится не больше chunk_size строк.
+        """
+        query = select(
+            *(getattr(self.model, field) for field in fields)
+        ).order_by(self.model.id)
+        if date_from is not None:
+            query = query.where(self.model.create_date >= date_from)
+        if date_to is not None:
+            query = query.where(self.model.create_date < date_to)
+        result = await session.stream(
+            query.execution_options(yield_per=chunk_size)
+        )
+        async for rows in result.partitions(chunk_size):
+            yield rows
+
     async def create(
             self,
             obj_in,
             session: AsyncSession,
-            user: Optional[User] = None
+            user: Optional[User] = None,
+            commit: bool = True,
     ):
         obj_in_data = obj_in.dict()
         if user is not None:
             obj_in_data['user_id'] = user.id
         db_obj = self.model(**obj_in_data)
         session.add(db_obj)
-        await session.commit()
-        await session.refresh(db_obj)
+        await session.flush()
+        aggregates.record_created(
+            session, self.model, [db_obj.full_amount],
+            user.id if user is not None else None, [db_obj.id],
+        )
+        if commit:
+            await self.commit(session)
         return db_obj
 
+    async def create_multi(
+            self,
+            objs_in: list,
+            session: AsyncSession,
+            user: Optional[User] = None
+    ) -> List[dict]:
+        """Добавляет объекты многострочными INSERT без коммита.
+
+        Возвращает вставленные данные вместе с id в исходном порядке.
+        """
+        create_date = datetime.now()
+        rows = []
+        for obj_in in objs_in:
+            obj_in_data = obj_in.dict()
+            if user is not None:
+                obj_in_data['user_id'] = user.id
+            obj_in_data['create_date'] = create_date
+            rows.append(obj_in_data)
+        connection = await session.connection()
+        for start in range(0, len(rows), INSERT_CHUNK_SIZE):
+            chunk = rows[start:start + INSERT_CHUNK_SIZE]
+            statement = insert(self.model).values(chunk)
+            if connection.dialect.full_returning:
+                ids = await session.scalars(statement.returning(self.model.id))
+            else:
+                # SQLite выдаёт новым строкам id подряд после максимального,
+                # а блокировка записи держится до конца транзакции.
+                await session.execute(statement)
+                ids = reversed((await session.scalars(
+                    select(self.model.id).order_by(
+                        self.model.id.desc()
+                    ).limit(len(chunk))
+                )).all())
+            for obj_in_data, obj_id in zip(chunk, ids):
+                obj_in_data['id'] = obj_id
+        aggregates.record_created(
+            session, self.model, [row['full_amount'] for row in rows],
+            user.id if user is not None else None,
+            [row['id'] for row in rows],
+        )
+        return rows
+
     async def update(
             self,
             db_obj,
             obj_in,
             session: AsyncSession,
     ):
-        obj_data = jsonable_encoder(db_obj)
         update_data = obj_in.dict(exclude_unset=True)
+        old_data = {field: getattr(db_obj, field) for field in update_data}
 
-        for field in obj_data:
-            if field in update_data:
-                setattr(db_obj, field, update_data[field])
+        for field, value in update_data.items():
+            setattr(db_obj, field, value)
         session.add(db_obj)
-        await session.commit()
-        await session.refresh(db_obj)
+        aggregates.record_updated(session, db_obj, old_data)
+        await self.commit(session)
+        if ledger.loaded:
+            await ledger.update(db_obj)
         return db_obj
 
     async def remove(
@@ -68,5 +219,8 @@ class CRUDBase:
             session: AsyncSession,
     ):
         await session.delete(db_obj)
-        await session.commit()
+        aggregates.record_removed(session, db_obj)
+        await self.commit(session)
+        if ledger.loaded:
+            await ledger.discard(db_obj)
         return db_obj
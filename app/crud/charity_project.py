@@ -1,12 +1,41 @@
-from typing import Optional
+from typing import List, Optional
 
-from sqlalchemy import select
+from sqlalchemy import Float, select, true
+from sqlalchemy.engine import Row
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.functions import FunctionElement
 
 from app.crud.base import CRUDBase
 from app.models.charity_project import CharityProject
 
 
+class seconds_between(FunctionElement):
+    """Число секунд между двумя моментами времени."""
+
+    type = Float()
+    name = 'seconds_between'
+    inherit_cache = True
+
+
+@compiles(seconds_between, 'sqlite')
+def compile_seconds_between_sqlite(element, compiler, **kw):
+    start, end = element.clauses
+    return (
+        f'(julianday({compiler.process(end, **kw)}) - '
+        f'julianday({compiler.process(start, **kw)})) * 86400.0'
+    )
+
+
+@compiles(seconds_between, 'postgresql')
+def compile_seconds_between_postgresql(element, compiler, **kw):
+    start, end = element.clauses
+    return (
+        f'EXTRACT(EPOCH FROM {compiler.process(end, **kw)} - '
+        f'{compiler.process(start, **kw)})'
+    )
+
+
 class CRUDCharityProject(CRUDBase):
 
     async def get_project_id_by_name(self,
@@ -33,5 +62,32 @@ class CRUDCharityProject(CRUDBase):
         db_project = db_project.scalars().first()
         return db_project
 
+    async def get_projects_by_completion_rate(
+        self,
+        session: AsyncSession,
+        limit: Optional[int] = None,
+        offset: int = 0,
+    ) -> List[Row]:
+        """Закрытые проекты от быстрее всех собравших средства.
+
+        Длительность сбора и порядок считаются в БД.
+        """
+        collection_time = seconds_between(
+            CharityProject.create_date, CharityProject.close_date
+        ).label('collection_time')
+        query = select(
+            CharityProject.id,
+            CharityProject.name,
+            CharityProject.description,
+            CharityProject.create_date,
+            CharityProject.close_date,
+            collection_time,
+        ).where(
+            CharityProject.fully_invested == true()
+        ).order_by(collection_time, CharityProject.id).offset(offset)
+        if limit is not None:
+            query = query.limit(limit)
+        return (await session.execute(query)).all()
+
 
 charity_project_crud = CRUDCharityProject(CharityProject)
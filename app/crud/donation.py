@@ -1,23 +1,58 @@
-from typing import List
+from datetime import datetime
+from typing import List, Optional, Tuple
 
-from sqlalchemy import select
+from sqlalchemy import select, tuple_
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.crud.base import CRUDBase
-from app.models import Donation, User
+from app.crud.base import CRUDBase, decode_cursor, encode_cursor
+from app.models import Donation
 
 
 class CRUDDonation(CRUDBase):
 
-    async def get_by_user(
-        self, user: User, session: AsyncSession,
-    ) -> List[Donation]:
-        donations = await session.execute(
-            select(Donation).where(
-                Donation.user_id == user.id
+    async def get_user_history(
+        self,
+        session: AsyncSession,
+        user_id: int,
+        fields: List[str],
+        limit: Optional[int] = None,
+        cursor: Optional[str] = None,
+        date_from: Optional[datetime] = None,
+        date_to: Optional[datetime] = None,
+        newest_first: bool = False,
+    ) -> Tuple[list, Optional[str]]:
+        """Страница пожертвований пользователя и курсор следующей.
+
+        Строки с колонками fields идут по (create_date, id), как в индексе
+        ix_donation_user_history, поэтому страница читается из индекса
+        без сортировки. date_from включается в выборку, date_to — нет.
+        """
+        key = (Donation.create_date, Donation.id)
+        query = select(
+            *(getattr(Donation, field) for field in fields), *key
+        ).where(Donation.user_id == user_id)
+        if date_from is not None:
+            query = query.where(Donation.create_date >= date_from)
+        if date_to is not None:
+            query = query.where(Donation.create_date < date_to)
+        if cursor is not None:
+            last_key = tuple_(*decode_cursor(cursor, (datetime, int)))
+            query = query.where(
+                tuple_(*key) < last_key if newest_first
+                else tuple_(*key) > last_key
             )
-        )
-        return donations.scalars().all()
+        if newest_first:
+            query = query.order_by(*(column.desc() for column in key))
+        else:
+            query = query.order_by(*key)
+        if limit is not None:
+            query = query.limit(limit + 1)
+        rows = (await session.execute(query)).all()
+        next_cursor = None
+        if limit is not None and len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor(*rows[-1][-2:])
+        return rows, next_cursor
 
 
 donation_crud = CRUDDonation(Donation)
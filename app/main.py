@@ -1,14 +1,30 @@
 from fastapi import FastAPI
 
 from api.routers import main_router
+from app.core.instrumentation import InstrumentationMiddleware
+from app.core.lifecycle import lifecycle
+from app.core.replicas import ReadYourWritesMiddleware
+from app.core.warmup import preload_caches, warm_up
 from core.config import settings
-from core.init_db import create_first_superuser
+from core.init_db import (create_first_superuser, init_ledger,
+                          start_allocation_worker, stop_allocation_worker)
 
 app = FastAPI(title=settings.app_title)
 
 app.include_router(main_router)
+if settings.replica_urls:
+    app.add_middleware(ReadYourWritesMiddleware)
+if settings.instrumentation_enabled:
+    app.add_middleware(InstrumentationMiddleware)
 
+if settings.startup_warmup:
+    lifecycle.add('warmup', warm_up, optional=True)
+lifecycle.add('superuser', create_first_superuser)
+lifecycle.add('allocation_worker', start_allocation_worker,
+              stop_allocation_worker)
+lifecycle.add('ledger', init_ledger)
+if settings.startup_preload_cache:
+    lifecycle.add('response_cache', preload_caches, optional=True)
 
-@app.on_event('startup')
-async def startup():
-    await create_first_superuser()
+app.add_event_handler('startup', lifecycle.startup)
+app.add_event_handler('shutdown', lifecycle.shutdown)
@@ -1,3 +1,5 @@
+from .allocation import Allocation, AllocationLogStart # noqa
 from .charity_project import CharityProject # noqa
 from .donation import Donation # noqa
+from .totals import FundTotals, UserTotals # noqa
 from .user import User # noqa
\ No newline at end of file
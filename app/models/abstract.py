@@ -1,16 +1,33 @@
 from datetime import datetime
 
-from sqlalchemy import Boolean, Column, DateTime, Integer
+from sqlalchemy import BigInteger, Boolean, Column, DateTime, Index, text
+from sqlalchemy.orm import declared_attr
 
 from app.core.db import Base
 
+OPEN_ROWS_CLAUSE = {
+    'sqlite_where': text('fully_invested = 0'),
+    'postgresql_where': text('fully_invested = false'),
+}
+
 
 class Abstract(Base):
 
     __abstract__ = True
 
-    full_amount = Column(Integer, nullable=False)
-    invested_amount = Column(Integer, default=0)
+    # Суммы — целые копейки, как и в API (app/schemas/money.py).
+    full_amount = Column(BigInteger, nullable=False)
+    invested_amount = Column(BigInteger, default=0)
     fully_invested = Column(Boolean, default=False)
     create_date = Column(DateTime, default=datetime.now)
     close_date = Column(DateTime)
+
+    @declared_attr
+    def __table_args__(cls):
+        return (
+            Index(
+                f'ix_{cls.__tablename__}_open_fifo',
+                'fully_invested', 'create_date', 'id',
+                **OPEN_ROWS_CLAUSE,
+            ),
+        )
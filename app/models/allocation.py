@@ -0,0 +1,36 @@
+from datetime import datetime
+
+from sqlalchemy import (BigInteger, Column, DateTime, ForeignKey, Index,
+                        Integer)
+
+from app.core.db import Base
+
+
+class Allocation(Base):
+    """Запись журнала распределения: сумма из пожертвования в проект.
+
+    Журнал только пополняется; суммы invested_amount восстанавливаются
+    из него повторным проходом.
+    """
+
+    donation_id = Column(Integer, ForeignKey('donation.id'), nullable=False)
+    project_id = Column(
+        Integer, ForeignKey('charityproject.id'), nullable=False
+    )
+    amount = Column(BigInteger, nullable=False)
+    ts = Column(DateTime, nullable=False, default=datetime.now)
+
+    __table_args__ = (
+        Index('ix_allocation_donation_id', 'donation_id', 'id'),
+        Index('ix_allocation_project_id', 'project_id', 'id'),
+    )
+
+
+class AllocationLogStart(Base):
+    """Момент начала журнала распределения; в таблице одна строка с id=1.
+
+    Суммы объектов, созданных раньше, могли набраться до журнала,
+    поэтому восстановить их из него нельзя.
+    """
+
+    ts = Column(DateTime, nullable=False)
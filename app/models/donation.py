@@ -1,4 +1,4 @@
-from sqlalchemy import Column, ForeignKey, Integer, Text
+from sqlalchemy import Column, ForeignKey, Index, Integer, Text
 
 from .abstract import Abstract
 
@@ -6,3 +6,16 @@ from .abstract import Abstract
 class Donation(Abstract):
     user_id = Column(Integer, ForeignKey('user.id'))
     comment = Column(Text)
+
+
+# История пожертвований пользователя читается по индексу в порядке
+# дат и продолжается по курсору (create_date, id) без сортировки.
+# full_amount в конце ключа делает индекс покрывающим для истории
+# без комментария: он хранится только в таблице.
+Index(
+    'ix_donation_user_history',
+    Donation.user_id,
+    Donation.create_date.desc(),
+    Donation.id.desc(),
+    Donation.full_amount,
+)
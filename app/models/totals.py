@@ -0,0 +1,24 @@
+from sqlalchemy import BigInteger, Column, ForeignKey, Integer
+
+from app.core.db import Base
+
+
+class FundTotals(Base):
+    """Накопленные итоги фонда по строкам-частям; итог — их сумма."""
+
+    projects_count = Column(Integer, nullable=False, default=0)
+    projects_required = Column(BigInteger, nullable=False, default=0)
+    open_projects = Column(Integer, nullable=False, default=0)
+    donations_count = Column(Integer, nullable=False, default=0)
+    donated = Column(BigInteger, nullable=False, default=0)
+    open_donations = Column(Integer, nullable=False, default=0)
+    invested = Column(BigInteger, nullable=False, default=0)
+
+
+class UserTotals(Base):
+    """Итоги пожертвований пользователя; id совпадает с id пользователя."""
+
+    id = Column(Integer, ForeignKey('user.id'), primary_key=True)
+    donations_count = Column(Integer, nullable=False, default=0)
+    donated = Column(BigInteger, nullable=False, default=0)
+    invested = Column(BigInteger, nullable=False, default=0)
@@ -0,0 +1,14 @@
+from datetime import datetime
+
+from pydantic import BaseModel
+
+
+class AllocationDB(BaseModel):
+    id: int
+    donation_id: int
+    project_id: int
+    amount: int
+    ts: datetime
+
+    class Config:
+        orm_mode = True
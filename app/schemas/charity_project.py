@@ -1,13 +1,17 @@
-from datetime import datetime
+from datetime import datetime, timedelta
 from typing import Optional
 
-from pydantic import BaseModel, Extra, Field, PositiveInt
+from pydantic import BaseModel, Extra, Field
+
+from app.schemas.money import AMOUNT_DESCRIPTION, Amount
 
 
 class CharityProjectBase(BaseModel):
     name: Optional[str] = Field(None, max_length=100)
     description: Optional[str] = Field(None)
-    full_amount: Optional[PositiveInt] = Field(None)
+    full_amount: Optional[Amount] = Field(
+        None, description=AMOUNT_DESCRIPTION
+    )
 
     class Config:
         extra = Extra.forbid
@@ -17,7 +21,7 @@ class CharityProjectBase(BaseModel):
 class CharityProjectCreate(BaseModel):
     name: str = Field(..., max_length=100)
     description: str = Field(...)
-    full_amount: PositiveInt = Field(...)
+    full_amount: Amount = Field(..., description=AMOUNT_DESCRIPTION)
 
     class Config:
         min_anystr_length = 1
@@ -25,7 +29,7 @@ class CharityProjectCreate(BaseModel):
 
 class CharityProjectDB(CharityProjectCreate):
     id: int
-    invested_amount: int = Field(0)
+    invested_amount: int = Field(0, description=AMOUNT_DESCRIPTION)
     fully_invested: bool = Field(False)
     create_date: datetime
     close_date: Optional[datetime]
@@ -36,3 +40,15 @@ class CharityProjectDB(CharityProjectCreate):
 
 class CharityProjectUpdate(CharityProjectBase):
     pass
+
+
+class CharityProjectSpeed(BaseModel):
+    id: int
+    name: str
+    description: str
+    create_date: datetime
+    close_date: datetime
+    collection_time: timedelta
+
+    class Config:
+        orm_mode = True
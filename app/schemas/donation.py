@@ -1,14 +1,22 @@
 from datetime import datetime
-from typing import Optional
+from typing import Literal, Optional
 
-from pydantic import BaseModel, Field, PositiveInt
+from pydantic import BaseModel, Field, conlist
+
+from app.core.config import settings
+from app.schemas.money import AMOUNT_DESCRIPTION, Amount
 
 
 class DonationBase(BaseModel):
-    full_amount: PositiveInt
+    full_amount: Amount = Field(..., description=AMOUNT_DESCRIPTION)
     comment: Optional[str]
 
 
+DonationBatch = conlist(
+    DonationBase, min_items=1, max_items=settings.donation_batch_max_size
+)
+
+
 class DonationCreate(DonationBase):
     id: int
     create_date: datetime
@@ -21,6 +29,13 @@ class DonationDB(DonationCreate):
     id: int
     create_date: datetime
     user_id: int
-    invested_amount: int = Field(0)
+    invested_amount: int = Field(0, description=AMOUNT_DESCRIPTION)
     fully_invested: bool
     close_date: Optional[datetime]
+
+
+class DonationAllocation(BaseModel):
+    id: int
+    status: Literal['pending', 'done', 'failed', 'unknown']
+    invested_amount: int
+    fully_invested: bool
@@ -0,0 +1,11 @@
+from pydantic import conint
+
+# Суммы в API и в БД — целые копейки: 150 рублей 50 копеек передаются
+# как 15050. Одна сумма не больше 10 миллиардов рублей; итоги по всей
+# таблице помещаются в BIGINT, пока в ней меньше ~9 миллионов строк
+# с предельной суммой.
+MAX_AMOUNT = 10 ** 12
+AMOUNT_DESCRIPTION = 'Сумма в копейках.'
+
+# Строгое целое: дробное число не округляется молча, а отклоняется.
+Amount = conint(strict=True, gt=0, le=MAX_AMOUNT)
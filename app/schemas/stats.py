@@ -0,0 +1,26 @@
+from typing import List
+
+from pydantic import BaseModel
+
+
+class FundStats(BaseModel):
+    projects_count: int
+    open_projects: int
+    projects_required: int
+    donations_count: int
+    open_donations: int
+    donated: int
+    invested: int
+    still_needed: int
+    free_donations: int
+
+
+class UserStats(BaseModel):
+    donations_count: int
+    donated: int
+    invested: int
+
+
+class Reconciliation(BaseModel):
+    drift: List[str]
+    fixed: bool
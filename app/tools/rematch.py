@@ -0,0 +1,188 @@
+"""Повторное распределение открытых пожертвований по открытым проектам.
+
+Открытые объекты читаются порциями в порядке FIFO и сливаются двумя
+указателями с той же семантикой, что и invest_money. Изменения
+записываются пакетными UPDATE в одной транзакции; в памяти держится
+не больше одной порции. UPDATE сверяет суммы с прочитанными, поэтому
+запуск рядом с работающим приложением безопасен: при гонке транзакция
+откатывается. Приложение в асинхронном режиме само выполняет rematch
+при запуске (allocation_rematch_on_start) под блокировкой ledger и
+перестраивает пулы. После запуска из командной строки кэш ответов
+и пулы в памяти процессов приложения устаревают до истечения
+response_cache_ttl и до POST /stats/ledger?fix=true соответственно.
+
+    python -m app.tools.rematch --dry-run
+    python -m app.tools.rematch --chunk-size 5000
+"""
+import argparse
+import asyncio
+import sys
+from typing import Callable, List, Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.db import AsyncSessionLocal
+from app.models import CharityProject, Donation
+from app.utils import aggregates
+from app.utils.investing import (OpenObject, apply_allocation,
+                                 get_not_full_invested_objects,
+                                 invest_money, log_allocations)
+from app.utils.response_cache import response_cache
+
+
+class RematchStats:
+    __slots__ = ('donations', 'projects', 'transfers', 'amount')
+
+    def __init__(self):
+        self.donations = 0
+        self.projects = 0
+        self.transfers = 0
+        self.amount = 0
+
+    def __str__(self):
+        return (
+            f'пожертвований: {self.donations}, проектов: {self.projects}, '
+            f'переводов: {self.transfers} на сумму {self.amount}'
+        )
+
+
+def describe(model, obj: OpenObject) -> str:
+    state = 'закрыт' if obj.fully_invested else 'открыт'
+    return (
+        f'{model.__tablename__} {obj.id}: invested_amount '
+        f'{obj.seen_amount} -> {obj.invested_amount} ({state})'
+    )
+
+
+async def anext_or_none(iterator) -> Optional[OpenObject]:
+    try:
+        return await iterator.__anext__()
+    except StopAsyncIteration:
+        return None
+
+
+class Rematch:
+    """Слияние открытых пулов с записью изменений порциями."""
+
+    def __init__(
+        self,
+        session: AsyncSession,
+        dry_run: bool = False,
+        chunk_size: int = 1000,
+        on_diff: Optional[Callable[[str], None]] = None,
+        on_progress: Optional[Callable[[RematchStats], None]] = None,
+    ):
+        self.session = session
+        self.dry_run = dry_run
+        self.chunk_size = chunk_size
+        self.on_diff = on_diff
+        self.on_progress = on_progress
+        self.stats = RematchStats()
+        self.changed = {Donation: [], CharityProject: []}
+        self.transfers = []
+
+    async def write(self) -> None:
+        for model, objs in self.changed.items():
+            if not await apply_allocation(model, objs, self.session):
+                raise RuntimeError(
+                    f'Открытые {model.__tablename__} изменились во время '
+                    'распределения'
+                )
+        await log_allocations(Donation, self.transfers, self.session)
+        aggregates.record_allocation(
+            self.session, Donation, self.changed[Donation],
+            CharityProject, self.changed[CharityProject],
+        )
+
+    async def flush(self) -> None:
+        if self.on_diff is not None:
+            for model, objs in self.changed.items():
+                for obj in objs:
+                    self.on_diff(describe(model, obj))
+        if not self.dry_run:
+            await self.write()
+        self.stats.donations += len(self.changed[Donation])
+        self.stats.projects += len(self.changed[CharityProject])
+        self.changed = {Donation: [], CharityProject: []}
+        self.transfers = []
+        if self.on_progress is not None:
+            self.on_progress(self.stats)
+
+    async def run(self) -> RematchStats:
+        donations = get_not_full_invested_objects(
+            Donation, self.session, batch_size=self.chunk_size
+        )
+        projects = get_not_full_invested_objects(
+            CharityProject, self.session, batch_size=self.chunk_size
+        )
+        donation = await anext_or_none(donations)
+        project = await anext_or_none(projects)
+        while donation is not None and project is not None:
+            amount = min(
+                donation.full_amount - donation.invested_amount,
+                project.full_amount - project.invested_amount,
+            )
+            invest_money(donation, project)
+            self.transfers.append((donation.id, project.id, amount))
+            self.stats.transfers += 1
+            self.stats.amount += amount
+            if donation.fully_invested:
+                self.changed[Donation].append(donation)
+                donation = await anext_or_none(donations)
+            if project.fully_invested:
+                self.changed[CharityProject].append(project)
+                project = await anext_or_none(projects)
+            if len(self.transfers) >= self.chunk_size:
+                await self.flush()
+        for model, obj in ((Donation, donation), (CharityProject, project)):
+            if obj is not None and obj.invested_amount != obj.seen_amount:
+                self.changed[model].append(obj)
+        await self.flush()
+        if self.dry_run:
+            await self.session.rollback()
+        else:
+            await aggregates.flush_totals(self.session)
+            await self.session.commit()
+            if self.stats.transfers:
+                await response_cache.bump(
+                    Donation.__tablename__, CharityProject.__tablename__
+                )
+        return self.stats
+
+
+async def rematch(session: AsyncSession, **options) -> RematchStats:
+    """Распределяет открытые пожертвования по открытым проектам.
+
+    Без dry_run изменения фиксируются одним коммитом в конце; при
+    расхождении с прочитанными суммами транзакция откатывается.
+    """
+    return await Rematch(session, **options).run()
+
+
+async def run(args) -> None:
+    diff: Optional[Callable[[str], None]] = None
+    if args.dry_run:
+        diff = print
+
+    def progress(stats: RematchStats) -> None:
+        print(f'... {stats}', file=sys.stderr)
+
+    async with AsyncSessionLocal() as session:
+        stats = await rematch(
+            session, dry_run=args.dry_run, chunk_size=args.chunk_size,
+            on_diff=diff, on_progress=progress,
+        )
+    action = 'будет изменено' if args.dry_run else 'изменено'
+    print(f'Итого {action}: {stats}')
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--dry-run', action='store_true',
+                        help='только показать изменения')
+    parser.add_argument('--chunk-size', type=int, default=1000)
+    asyncio.run(run(parser.parse_args(argv)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,179 @@
+"""Восстановление сумм проектов и пожертвований из журнала распределения.
+
+Суммы переводов по каждому объекту считаются в БД, и в приложение
+приходят только объекты, расходящиеся с журналом. Объекты, созданные
+до начала журнала (allocationlogstart), не проверяются: их суммы могли
+набраться до него. Без --apply только печатаются расхождения; с --apply
+в той же транзакции пересчитываются итоги фонда и пользователей.
+Исправление из командной строки не видно пулам в памяти (ledger) и кэшу
+ответов работающих процессов: пулы перестраивает
+POST /stats/ledger?fix=true, кэш устаревает за response_cache_ttl.
+
+    python -m app.tools.replay_allocations
+    python -m app.tools.replay_allocations --apply
+"""
+import argparse
+import asyncio
+from datetime import datetime
+from typing import List, Optional, Tuple, Union
+
+from sqlalchemy import (and_, case, false, func, or_, outerjoin, select, true,
+                        update)
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql import Select
+
+from app.core.db import AsyncSessionLocal
+from app.models import (Allocation, AllocationLogStart, CharityProject,
+                        Donation)
+from app.utils.aggregates import money_sum, reconcile_totals
+from app.utils.investing import UPDATE_CHUNK_SIZE
+from app.utils.response_cache import response_cache
+
+# (id, invested_amount, fully_invested, close_date)
+Fix = Tuple[int, int, bool, Union[datetime, None]]
+
+
+# Колонка журнала, по которой переводы относятся к объекту модели.
+LOG_KEYS = {
+    Donation: Allocation.donation_id,
+    CharityProject: Allocation.project_id,
+}
+
+
+def mismatches_query(
+    model: Union[CharityProject, Donation],
+    since: Optional[datetime] = None,
+) -> Select:
+    """Объекты, суммы которых расходятся с журналом.
+
+    Переводы суммируются в БД группировкой по объекту, поэтому
+    в приложение приходят только расходящиеся строки. С since
+    проверяются только объекты, созданные не раньше этого момента.
+    """
+    key = LOG_KEYS[model]
+    log = select(
+        key.label('id'),
+        money_sum(Allocation.amount).label('invested'),
+        func.max(Allocation.ts).label('last_ts'),
+    ).group_by(key).subquery()
+    invested = func.coalesce(log.c.invested, 0)
+    query = select(
+        model.id, invested, model.full_amount, model.close_date,
+        log.c.last_ts,
+    ).select_from(
+        outerjoin(model, log, log.c.id == model.id)
+    ).where(or_(
+        invested != model.invested_amount,
+        and_(invested == model.full_amount,
+             model.fully_invested == false()),
+        and_(invested != model.full_amount,
+             model.fully_invested == true()),
+    )).order_by(model.id)
+    if since is not None:
+        query = query.where(model.create_date >= since)
+    return query
+
+
+async def log_start(session: AsyncSession) -> Optional[datetime]:
+    """Начало журнала; None, если журнал ведётся с создания базы."""
+    return await session.scalar(select(AllocationLogStart.ts))
+
+
+async def find_fixes(
+    model: Union[CharityProject, Donation],
+    session: AsyncSession,
+    chunk_size: int,
+    since: Optional[datetime] = None,
+) -> List[Fix]:
+    fixes = []
+    result = await session.stream(
+        mismatches_query(model, since).execution_options(
+            yield_per=chunk_size
+        )
+    )
+    async for rows in result.partitions(chunk_size):
+        for obj_id, invested, full_amount, close_date, last_ts in rows:
+            fully = invested == full_amount
+            fixes.append((
+                obj_id, invested, fully,
+                (close_date or last_ts) if fully else None,
+            ))
+    return fixes
+
+
+async def apply_fixes(
+    model: Union[CharityProject, Donation],
+    fixes: List[Fix],
+    session: AsyncSession,
+) -> None:
+    for start in range(0, len(fixes), UPDATE_CHUNK_SIZE):
+        chunk = fixes[start:start + UPDATE_CHUNK_SIZE]
+        await session.execute(
+            update(model).where(
+                model.id.in_([fix[0] for fix in chunk])
+            ).values(
+                invested_amount=case(
+                    {fix[0]: fix[1] for fix in chunk}, value=model.id
+                ),
+                fully_invested=case(
+                    {fix[0]: fix[2] for fix in chunk}, value=model.id
+                ),
+                close_date=case(
+                    {fix[0]: fix[3] for fix in chunk}, value=model.id
+                ),
+            ).execution_options(synchronize_session=False)
+        )
+
+
+async def replay_allocations(
+    session: AsyncSession, apply: bool = False, chunk_size: int = 1000
+) -> List[str]:
+    """Расхождения таблиц с журналом; с apply=True суммы исправляются
+    вместе с итогами фонда и пользователей.
+    """
+    since = await log_start(session)
+    problems = []
+    fixes = {}
+    for model in (CharityProject, Donation):
+        fixes[model] = await find_fixes(model, session, chunk_size, since)
+        problems.extend(
+            f'{model.__tablename__} {obj_id}: invested_amount={invested} '
+            f'fully_invested={fully}'
+            for obj_id, invested, fully, _ in fixes[model]
+        )
+    if apply and problems:
+        for model, model_fixes in fixes.items():
+            await apply_fixes(model, model_fixes, session)
+        await reconcile_totals(session, fix=True)
+        await session.commit()
+        await response_cache.bump(
+            CharityProject.__tablename__, Donation.__tablename__
+        )
+    return problems
+
+
+async def run(args):
+    async with AsyncSessionLocal() as session:
+        since = await log_start(session)
+        problems = await replay_allocations(
+            session, args.apply, args.chunk_size
+        )
+    if since is not None:
+        print(f'Объекты, созданные до {since}, не проверяются: '
+              f'журнал ведётся с этого момента')
+    for problem in problems:
+        print(problem)
+    action = 'исправлено' if args.apply else 'найдено'
+    print(f'Расхождений {action}: {len(problems)}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--apply', action='store_true',
+                        help='записать восстановленные суммы')
+    parser.add_argument('--chunk-size', type=int, default=1000)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == '__main__':
+    main()
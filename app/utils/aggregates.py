@@ -0,0 +1,292 @@
+import random
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Union
+
+from sqlalchemy import (BigInteger, case, cast, delete, false, func, insert,
+                        select)
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.models import CharityProject, Donation, FundTotals, UserTotals
+
+TOTALS_ID = 1
+PENDING_KEY = 'pending_totals'
+INVESTED_KEY = 'pending_donation_invested'
+OWNERS_KEY = 'donation_owners'
+OWNERS_CHUNK_SIZE = 500
+
+# Счётчики создаваемых объектов: количество, сумма, открытые.
+COUNTERS = {
+    CharityProject: ('projects_count', 'projects_required', 'open_projects'),
+    Donation: ('donations_count', 'donated', 'open_donations'),
+}
+OPEN_COUNTERS = {model: counters[2] for model, counters in COUNTERS.items()}
+FUND_FIELDS = (
+    'projects_count', 'projects_required', 'open_projects',
+    'donations_count', 'donated', 'open_donations', 'invested',
+)
+USER_FIELDS = ('donations_count', 'donated', 'invested')
+UPSERTS = {'postgresql': postgresql.insert, 'sqlite': sqlite.insert}
+
+
+def pending(session: AsyncSession) -> Dict[Optional[int], Counter]:
+    """Ещё не записанные изменения итогов в транзакции сессии.
+
+    Ключ None — итоги фонда, остальные ключи — id пользователей.
+    """
+    return session.info.setdefault(PENDING_KEY, {})
+
+
+def add(
+    session: AsyncSession, user_id: Optional[int] = None, **deltas: int
+) -> None:
+    pending(session).setdefault(user_id, Counter()).update(deltas)
+
+
+def record_created(
+    session: AsyncSession,
+    model: Union[CharityProject, Donation],
+    amounts: List[int],
+    user_id: Optional[int] = None,
+    ids: Iterable[int] = (),
+) -> None:
+    """Учитывает созданные объекты; ids пожертвований запоминаются
+    вместе с владельцем, чтобы не искать его при распределении."""
+    count, amount, open_count = COUNTERS[model]
+    deltas = {count: len(amounts), amount: sum(amounts)}
+    add(session, **deltas, **{open_count: len(amounts)})
+    if user_id is not None:
+        add(session, user_id, **deltas)
+        if model is Donation:
+            session.info.setdefault(OWNERS_KEY, {}).update(
+                dict.fromkeys(ids, user_id)
+            )
+
+
+def record_updated(session: AsyncSession, obj, old: dict) -> None:
+    """Учитывает изменение требуемой суммы проекта."""
+    if isinstance(obj, CharityProject) and 'full_amount' in old:
+        add(session, projects_required=obj.full_amount - old['full_amount'])
+
+
+def record_removed(session: AsyncSession, obj) -> None:
+    count, amount, open_count = COUNTERS[type(obj)]
+    add(
+        session,
+        **{count: -1, amount: -obj.full_amount,
+           open_count: -(not obj.fully_invested)},
+        invested=-obj.invested_amount,
+    )
+    if isinstance(obj, Donation) and obj.user_id is not None:
+        add(session, obj.user_id, donations_count=-1,
+            donated=-obj.full_amount, invested=-obj.invested_amount)
+
+
+def record_allocation(
+    session: AsyncSession,
+    model_in: Union[CharityProject, Donation],
+    incoming: Iterable,
+    model_add: Union[CharityProject, Donation],
+    touched: Iterable,
+) -> None:
+    """Учитывает распределение incoming по объектам пула touched.
+
+    Суммы, вложенные из пожертвований, копятся по id пожертвования и
+    переносятся в итоги владельцев при записи.
+    """
+    incoming = list(incoming)
+    touched = list(touched)
+    donations = incoming if model_in is Donation else touched
+    invested = session.info.setdefault(INVESTED_KEY, Counter())
+    invested.update({
+        obj.id: obj.invested_amount - obj.seen_amount for obj in donations
+    })
+    add(
+        session,
+        invested=sum(obj.invested_amount - obj.seen_amount
+                     for obj in incoming),
+        **{
+            OPEN_COUNTERS[model_in]: -sum(
+                obj.fully_invested for obj in incoming
+            ),
+            OPEN_COUNTERS[model_add]: -sum(
+                obj.fully_invested for obj in touched
+            ),
+        },
+    )
+
+
+def money_sum(column):
+    """SUM денежной колонки как BIGINT, 0 для пустой выборки.
+
+    В PostgreSQL SUM(bigint) возвращает numeric, то есть Decimal
+    в Python; приведение оставляет суммы целыми и даёт ошибку
+    переполнения в БД вместо неточного результата.
+    """
+    return func.coalesce(cast(func.sum(column), BigInteger), 0)
+
+
+def upsert(dialect: str, model, obj_id: int, deltas: Counter):
+    """INSERT ... ON CONFLICT, прибавляющий deltas к существующей строке."""
+    statement = UPSERTS[dialect](model).values(id=obj_id, **deltas)
+    return statement.on_conflict_do_update(
+        index_elements=[model.id],
+        set_={
+            field: getattr(model, field) + statement.excluded[field]
+            for field in deltas
+        },
+    )
+
+
+async def record_user_invested(session: AsyncSession) -> None:
+    """Переносит вложенные суммы пожертвований в итоги их владельцев.
+
+    Владельцы пожертвований, созданных в этой же транзакции, уже
+    известны; остальные читаются одним запросом на порцию id.
+    """
+    invested = session.info.pop(INVESTED_KEY, None)
+    owners = session.info.pop(OWNERS_KEY, {})
+    if not invested:
+        return
+    unknown = [
+        donation_id for donation_id, delta in invested.items()
+        if delta and donation_id not in owners
+    ]
+    for start in range(0, len(unknown), OWNERS_CHUNK_SIZE):
+        rows = await session.execute(
+            select(Donation.id, Donation.user_id).where(
+                Donation.id.in_(unknown[start:start + OWNERS_CHUNK_SIZE])
+            )
+        )
+        owners.update(rows.all())
+    for donation_id, delta in invested.items():
+        user_id = owners.get(donation_id)
+        if delta and user_id is not None:
+            add(session, user_id, invested=delta)
+
+
+async def flush_totals(session: AsyncSession) -> None:
+    """Записывает накопленные изменения итогов; вызывается до коммита.
+
+    Итоги фонда разбиты на totals_shards строк, транзакция прибавляет
+    изменения к случайной из них: параллельные записи в PostgreSQL
+    не ждут блокировки одной общей строки. Итог — сумма строк.
+    """
+    await record_user_invested(session)
+    changes = session.info.pop(PENDING_KEY, None)
+    if not changes:
+        return
+    dialect = (await session.connection()).dialect.name
+    for user_id, deltas in changes.items():
+        deltas = Counter({
+            field: value for field, value in deltas.items() if value
+        })
+        if not deltas:
+            continue
+        if user_id is None:
+            await session.execute(upsert(
+                dialect, FundTotals,
+                random.randint(1, settings.totals_shards), deltas,
+            ))
+        else:
+            await session.execute(upsert(
+                dialect, UserTotals, user_id, deltas
+            ))
+
+
+async def read_totals(session: AsyncSession) -> Dict[str, int]:
+    """Итоги фонда: суммы по всем строкам FundTotals."""
+    row = (await session.execute(select(*(
+        money_sum(getattr(FundTotals, field)) for field in FUND_FIELDS
+    )))).one()
+    return dict(zip(FUND_FIELDS, row))
+
+
+async def read_user_totals(
+    session: AsyncSession, user_id: int
+) -> Dict[str, int]:
+    totals = await session.get(UserTotals, user_id)
+    return {
+        field: getattr(totals, field) if totals is not None else 0
+        for field in USER_FIELDS
+    }
+
+
+async def compute_totals(session: AsyncSession) -> Dict[str, int]:
+    """Итоги фонда, пересчитанные агрегатами SQL."""
+    totals = {}
+    for model, (count, amount, open_count) in COUNTERS.items():
+        row = (await session.execute(select(
+            func.count(model.id),
+            money_sum(model.full_amount),
+            func.coalesce(func.sum(
+                case((model.fully_invested == false(), 1), else_=0)
+            ), 0),
+            money_sum(model.invested_amount),
+        ))).one()
+        totals[count], totals[amount], totals[open_count] = row[:3]
+        if model is Donation:
+            totals['invested'] = row[3]
+    return totals
+
+
+async def compute_user_totals(
+    session: AsyncSession,
+) -> Dict[int, Dict[str, int]]:
+    rows = await session.execute(
+        select(
+            Donation.user_id,
+            func.count(Donation.id),
+            money_sum(Donation.full_amount),
+            money_sum(Donation.invested_amount),
+        ).where(Donation.user_id.isnot(None)).group_by(Donation.user_id)
+    )
+    return {
+        user_id: dict(zip(USER_FIELDS, values))
+        for user_id, *values in rows
+    }
+
+
+async def reconcile_totals(
+    session: AsyncSession, fix: bool = False
+) -> List[str]:
+    """Сверяет накопленные итоги с пересчитанными через SUM.
+
+    Возвращает расхождения; с fix=True заменяет итоги пересчитанными.
+    """
+    drift = []
+    stored = await read_totals(session)
+    actual = await compute_totals(session)
+    drift.extend(
+        f'{field}: stored={stored[field]} actual={actual[field]}'
+        for field in FUND_FIELDS if stored[field] != actual[field]
+    )
+    stored_users = {
+        row.id: {field: getattr(row, field) for field in USER_FIELDS}
+        for row in (await session.scalars(select(UserTotals))).all()
+    }
+    actual_users = await compute_user_totals(session)
+    empty = dict.fromkeys(USER_FIELDS, 0)
+    for user_id in sorted(stored_users.keys() | actual_users.keys()):
+        stored_user = stored_users.get(user_id, empty)
+        actual_user = actual_users.get(user_id, empty)
+        drift.extend(
+            f'user {user_id} {field}: stored={stored_user[field]} '
+            f'actual={actual_user[field]}'
+            for field in USER_FIELDS
+            if stored_user[field] != actual_user[field]
+        )
+    if fix and drift:
+        await session.execute(delete(FundTotals))
+        await session.execute(insert(FundTotals).values(
+            id=TOTALS_ID, **actual
+        ))
+        await session.execute(delete(UserTotals))
+        if actual_users:
+            await session.execute(insert(UserTotals), [
+                {'id': user_id, **values}
+                for user_id, values in actual_users.items()
+            ])
+        await session.commit()
+    return drift
@@ -0,0 +1,193 @@
+import asyncio
+import logging
+from itertools import groupby
+from typing import Dict, List, Optional, Set, Tuple, Union
+
+from sqlalchemy.orm import sessionmaker
+
+from app.core.config import settings
+from app.core.db import AsyncSessionLocal
+from app.models import CharityProject, Donation
+from app.tools.rematch import rematch
+from app.utils.cache import TTLCache
+from app.utils.investing import (OpenObject, investing_process_many,
+                                 load_ledger)
+from app.utils.ledger import ledger
+
+POOLS = {Donation: CharityProject, CharityProject: Donation}
+
+PENDING = 'pending'
+DONE = 'done'
+FAILED = 'failed'
+UNKNOWN = 'unknown'
+
+
+class AllocationWorker:
+    """Распределение средств после коммита в фоновой задаче процесса.
+
+    Эндпоинт сохраняет объект и ставит его в очередь; задача забирает
+    всё накопившееся и распределяет подряд идущие объекты одной модели
+    одним вызовом investing_process_many. Неудачное распределение
+    повторяется с растущей задержкой, после последней попытки объект
+    помечается failed. Очередь живёт в памяти процесса: объекты,
+    не распределённые до остановки, подбираются повторным распределением
+    открытых пулов (rematch). При запуске оно выполняется в фоне, если
+    включено allocation_rematch_on_start; при нескольких процессах его
+    стоит оставить одному из них или запускать python -m app.tools.rematch.
+    """
+
+    def __init__(
+        self,
+        session_factory: sessionmaker = AsyncSessionLocal,
+        batch_size: int = settings.allocation_batch_max_size,
+    ):
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+        self.queue: Optional[asyncio.Queue] = None
+        self.task: Optional[asyncio.Task] = None
+        self.recovery: Optional[asyncio.Task] = None
+        self.pending: Set[Tuple[type, int]] = set()
+        self.attempts: Dict[Tuple[type, int], int] = {}
+        self.retries: Set[asyncio.TimerHandle] = set()
+        # Итоги недавних распределений: (модель, id) -> done или failed.
+        self.results = TTLCache(
+            settings.allocation_status_size, settings.allocation_status_ttl
+        )
+
+    @property
+    def running(self) -> bool:
+        return self.task is not None and not self.task.done()
+
+    async def start(self) -> None:
+        self.queue = asyncio.Queue()
+        self.task = asyncio.create_task(self.run())
+        if settings.allocation_rematch_on_start:
+            self.recovery = asyncio.create_task(self.recover())
+
+    async def recover(self) -> None:
+        """Распределяет объекты, оставшиеся открытыми с прошлого запуска."""
+        try:
+            async with ledger.lock:
+                async with self.session_factory() as session:
+                    stats = await rematch(session)
+                    if stats.transfers and ledger.loaded:
+                        await load_ledger(session)
+        except Exception:
+            logging.exception('Не удалось распределить средства '
+                              'из прошлого запуска')
+            return
+        if stats.transfers:
+            logging.warning('Распределены средства из прошлого запуска: %s',
+                            stats)
+
+    async def stop(self) -> None:
+        """Дожидается распределения всего, что уже в очереди.
+
+        Отложенные повторы отменяются: их подберёт rematch.
+        """
+        if self.recovery is not None:
+            await self.recovery
+            self.recovery = None
+        for handle in self.retries:
+            handle.cancel()
+        self.retries.clear()
+        if not self.running:
+            return
+        await self.queue.join()
+        self.task.cancel()
+        try:
+            await self.task
+        except asyncio.CancelledError:
+            pass
+        self.task = None
+
+    def submit(
+        self,
+        model: Union[CharityProject, Donation],
+        objs: List[OpenObject],
+    ) -> None:
+        for obj in objs:
+            self.pending.add((model, obj.id))
+            self.queue.put_nowait((model, obj))
+
+    def status(
+        self,
+        model: Union[CharityProject, Donation],
+        obj_id: int,
+        fully_invested: bool = False,
+    ) -> str:
+        """Состояние распределения по сведениям этого процесса.
+
+        Объект, о котором процесс не знает (поставлен в очередь другим
+        процессом или до перезапуска), считается распределённым, только
+        если он закрыт в БД (fully_invested).
+        """
+        key = (model, obj_id)
+        if key in self.pending:
+            return PENDING
+        result = self.results.get(key)
+        if result is not None:
+            return result
+        return DONE if fully_invested else UNKNOWN
+
+    async def run(self) -> None:
+        while True:
+            items = [await self.queue.get()]
+            while len(items) < self.batch_size and not self.queue.empty():
+                items.append(self.queue.get_nowait())
+            try:
+                await self.process(items)
+            finally:
+                for _ in items:
+                    self.queue.task_done()
+
+    def retry(self, model: type, obj: OpenObject) -> None:
+        key = (model, obj.id)
+        self.attempts[key] = attempt = self.attempts.get(key, 0) + 1
+        if attempt >= settings.allocation_retry_attempts:
+            logging.error('Распределение %s %s не удалось после %s попыток',
+                          model.__tablename__, obj.id, attempt)
+            del self.attempts[key]
+            self.pending.discard(key)
+            self.results.set(key, FAILED)
+            return
+
+        # allocate() меняет копию на месте, а запись не состоялась:
+        # повтор начинается с сумм, прочитанных из БД.
+        fresh = OpenObject(
+            obj.id, obj.full_amount, obj.seen_amount, obj.create_date
+        )
+
+        def resubmit():
+            self.retries.discard(handle)
+            self.queue.put_nowait((model, fresh))
+
+        handle = asyncio.get_running_loop().call_later(
+            settings.allocation_retry_delay * 2 ** (attempt - 1), resubmit
+        )
+        self.retries.add(handle)
+
+    async def process(self, items: List[Tuple[type, OpenObject]]) -> None:
+        for model, group in groupby(items, key=lambda item: item[0]):
+            objs = [obj for _, obj in group]
+            try:
+                async with self.session_factory() as session:
+                    await investing_process_many(
+                        objs, model, POOLS[model], session
+                    )
+            except Exception:
+                logging.exception(
+                    'Не удалось распределить %s: %s', model.__tablename__,
+                    sorted(obj.id for obj in objs),
+                )
+                for obj in objs:
+                    self.retry(model, obj)
+                continue
+            for obj in objs:
+                key = (model, obj.id)
+                self.attempts.pop(key, None)
+                self.pending.discard(key)
+                self.results.set(key, DONE)
+
+
+allocation_worker = AllocationWorker()
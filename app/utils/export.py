@@ -0,0 +1,63 @@
+import csv
+import io
+from datetime import datetime
+from enum import Enum
+from typing import AsyncIterator, List, Union
+
+from app.api.responses import dumps
+
+
+class ExportFormat(str, Enum):
+    ndjson = 'ndjson'
+    csv = 'csv'
+
+
+MEDIA_TYPES = {
+    ExportFormat.ndjson: 'application/x-ndjson',
+    ExportFormat.csv: 'text/csv',
+}
+
+
+async def to_ndjson(
+    fields: List[str], chunks: AsyncIterator[list],
+) -> AsyncIterator[bytes]:
+    async for rows in chunks:
+        yield b''.join(
+            dumps(
+                {field: value for field, value in zip(fields, row)
+                 if value is not None}
+            ) + b'\n'
+            for row in rows
+        )
+
+
+async def to_csv(
+    fields: List[str], chunks: AsyncIterator[list],
+) -> AsyncIterator[str]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(fields)
+    async for rows in chunks:
+        writer.writerows(
+            [value.isoformat() if isinstance(value, datetime) else value
+             for value in row]
+            for row in rows
+        )
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue()
+
+
+ENCODERS = {
+    ExportFormat.ndjson: to_ndjson,
+    ExportFormat.csv: to_csv,
+}
+
+
+def export_rows(
+    export_format: ExportFormat,
+    fields: List[str],
+    chunks: AsyncIterator[list],
+) -> AsyncIterator[Union[bytes, str]]:
+    return ENCODERS[export_format](fields, chunks)
@@ -1,64 +1,383 @@
+import logging
+import time
 from datetime import datetime
-from typing import List, Union
+from typing import AsyncIterator, Dict, List, Optional, Tuple, Union
 
-from sqlalchemy import select
+from sqlalchemy import case, false, insert, select, tuple_, update
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlalchemy.sql import Select
 
-from app.models import CharityProject, Donation
+from app.core.config import settings
+from app.models import Allocation, CharityProject, Donation
+from app.utils import aggregates
+from app.utils.ledger import PoolItem, ledger
+from app.utils.metrics import observe_investing
+from app.utils.response_cache import response_cache
+
+UPDATE_CHUNK_SIZE = 500
+
+
+class OpenObject:
+    """Лёгкая копия открытого объекта для расчёта распределения."""
+
+    __slots__ = ('id', 'full_amount', 'invested_amount', 'create_date',
+                 'seen_amount', 'fully_invested', 'close_date')
+
+    def __init__(
+        self,
+        id: int,
+        full_amount: int,
+        invested_amount: int,
+        create_date: Optional[datetime] = None,
+        fully_invested: bool = False,
+        close_date: Optional[datetime] = None,
+    ):
+        self.id = id
+        self.full_amount = full_amount
+        self.invested_amount = invested_amount
+        self.create_date = create_date
+        self.seen_amount = invested_amount
+        self.fully_invested = fully_invested
+        self.close_date = close_date
+
+
+def open_objects_query(
+    model: Union[CharityProject, Donation],
+    batch_size: int,
+    last_key: Optional[Tuple[datetime, int]] = None,
+) -> Select:
+    """Порция открытых объектов; условие совпадает с частичным индексом.
+
+    С last_key порция начинается после объекта с этим ключом
+    (create_date, id).
+    """
+    order = (model.create_date, model.id)
+    query = select(
+        model.id, model.full_amount, model.invested_amount, model.create_date
+    ).where(model.fully_invested == false()).order_by(*order).limit(batch_size)
+    if last_key is not None:
+        query = query.where(tuple_(*order) > tuple_(*last_key))
+    return query
 
 
 async def get_not_full_invested_objects(
-    obj_in: Union[CharityProject, Donation],
-    session: AsyncSession
-) -> List[Union[CharityProject, Donation]]:
-    objects = await session.execute(
-        select(obj_in).where(obj_in.fully_invested == 0
-                             ).order_by(obj_in.create_date)
-    )
-    return objects.scalars().all()
+    model: Union[CharityProject, Donation],
+    session: AsyncSession,
+    amount: Optional[int] = None,
+    batch_size: int = settings.investing_batch_size,
+) -> AsyncIterator[OpenObject]:
+    """Открытые объекты в порядке FIFO, порциями по batch_size.
+
+    Порции выбираются по ключу (create_date, id), поэтому каждый запрос
+    продолжает с места предыдущего. Если передан amount, выборка
+    останавливается, как только свободных сумм хватает на его покрытие.
+    """
+    last_key = None
+    covered = 0
+    while True:
+        rows = (await session.execute(
+            open_objects_query(model, batch_size, last_key)
+        )).all()
+        for row in rows:
+            yield OpenObject(*row)
+            covered += row.full_amount - row.invested_amount
+            if amount is not None and covered >= amount:
+                return
+        if len(rows) < batch_size:
+            return
+        last_key = (rows[-1].create_date, rows[-1].id)
 
 
-async def close_donation_for_obj(obj_in: Union[CharityProject, Donation]):
+def close_donation_for_obj(obj_in: Union[CharityProject, Donation]):
     obj_in.invested_amount = obj_in.full_amount
     obj_in.fully_invested = True
     obj_in.close_date = datetime.now()
     return obj_in
 
 
-async def invest_money(
+def invest_money(
     obj_in: Union[CharityProject, Donation],
     obj_model: Union[CharityProject, Donation],
-) -> Union[CharityProject, Donation]:
+) -> Tuple[Union[CharityProject, Donation], Union[CharityProject, Donation]]:
     free_amount_in = obj_in.full_amount - obj_in.invested_amount
     free_amount_in_model = obj_model.full_amount - obj_model.invested_amount
 
     if free_amount_in > free_amount_in_model:
         obj_in.invested_amount += free_amount_in_model
-        await close_donation_for_obj(obj_model)
+        close_donation_for_obj(obj_model)
 
     elif free_amount_in == free_amount_in_model:
-        await close_donation_for_obj(obj_in)
-        await close_donation_for_obj(obj_model)
+        close_donation_for_obj(obj_in)
+        close_donation_for_obj(obj_model)
 
     else:
         obj_model.invested_amount += free_amount_in
-        await close_donation_for_obj(obj_in)
+        close_donation_for_obj(obj_in)
 
     return obj_in, obj_model
 
 
+async def allocate(
+    incoming: List[OpenObject],
+    pool: AsyncIterator[OpenObject],
+    transfers: Optional[List[Tuple[int, int, int]]] = None,
+) -> List[OpenObject]:
+    """Распределяет объекты incoming по пулу в порядке FIFO.
+
+    Результат совпадает с поочерёдным распределением каждого объекта.
+    Возвращает изменённые объекты пула; incoming меняются на месте.
+    В transfers добавляются переводы (id из incoming, id из пула, сумма).
+    """
+    touched = []
+    for obj_in in incoming:
+        while not obj_in.fully_invested:
+            if not touched or touched[-1].fully_invested:
+                try:
+                    touched.append(await pool.__anext__())
+                except StopAsyncIteration:
+                    return touched
+            obj_add = touched[-1]
+            amount = min(
+                obj_in.full_amount - obj_in.invested_amount,
+                obj_add.full_amount - obj_add.invested_amount,
+            )
+            invest_money(obj_in, obj_add)
+            if transfers is not None:
+                transfers.append((obj_in.id, obj_add.id, amount))
+    return touched
+
+
+async def apply_allocation(
+    model: Union[CharityProject, Donation],
+    touched: List[OpenObject],
+    session: AsyncSession,
+) -> bool:
+    """Записывает результат распределения пакетными UPDATE.
+
+    Каждая строка обновляется, только если её суммы в БД остались
+    такими же, какими были прочитаны. Возвращает False, если хотя бы
+    одна строка успела измениться или исчезнуть.
+    """
+    updated = 0
+    close_date = datetime.now()
+    closed = [obj for obj in touched if obj.fully_invested]
+    for start in range(0, len(closed), UPDATE_CHUNK_SIZE):
+        chunk = closed[start:start + UPDATE_CHUNK_SIZE]
+        result = await session.execute(
+            update(model).where(
+                model.id.in_([obj.id for obj in chunk]),
+                model.fully_invested == false(),
+                model.invested_amount == case(
+                    {obj.id: obj.seen_amount for obj in chunk},
+                    value=model.id,
+                ),
+                model.full_amount == case(
+                    {obj.id: obj.full_amount for obj in chunk},
+                    value=model.id,
+                ),
+            ).values(
+                invested_amount=model.full_amount,
+                fully_invested=True,
+                close_date=close_date,
+            ).execution_options(synchronize_session=False)
+        )
+        updated += result.rowcount
+        for obj in chunk:
+            obj.close_date = close_date
+    for obj in touched:
+        if not obj.fully_invested:
+            result = await session.execute(
+                update(model).where(
+                    model.id == obj.id,
+                    model.invested_amount == obj.seen_amount,
+                    model.full_amount == obj.full_amount,
+                ).values(
+                    invested_amount=obj.invested_amount,
+                ).execution_options(synchronize_session=False)
+            )
+            updated += result.rowcount
+    return updated == len(touched)
+
+
+async def log_allocations(
+    model_in: Union[CharityProject, Donation],
+    transfers: List[Tuple[int, int, int]],
+    session: AsyncSession,
+) -> None:
+    """Добавляет переводы в журнал распределения одним пакетом."""
+    if not transfers:
+        return
+    ts = datetime.now()
+    if model_in is Donation:
+        rows = [
+            {'donation_id': obj_in_id, 'project_id': obj_add_id,
+             'amount': amount, 'ts': ts}
+            for obj_in_id, obj_add_id, amount in transfers
+        ]
+    else:
+        rows = [
+            {'donation_id': obj_add_id, 'project_id': obj_in_id,
+             'amount': amount, 'ts': ts}
+            for obj_in_id, obj_add_id, amount in transfers
+        ]
+    await session.execute(insert(Allocation), rows)
+
+
+async def read_open_pools(
+    session: AsyncSession,
+) -> Dict[type, List[PoolItem]]:
+    return {
+        model: [
+            (obj.id, obj.full_amount, obj.invested_amount, obj.create_date)
+            async for obj in get_not_full_invested_objects(model, session)
+        ]
+        for model in ledger.pools
+    }
+
+
+async def load_ledger(session: AsyncSession) -> None:
+    ledger.load(await read_open_pools(session))
+
+
+async def check_ledger(session: AsyncSession) -> List[str]:
+    """Расхождения пулов в памяти с БД; пулы читаются под блокировкой."""
+    async with ledger.lock:
+        return ledger.diff(await read_open_pools(session))
+
+
+async def rebuild_ledger(session: AsyncSession) -> None:
+    async with ledger.lock:
+        await load_ledger(session)
+
+
+async def iter_ledger_pool(
+    model: Union[CharityProject, Donation],
+) -> AsyncIterator[OpenObject]:
+    for item in ledger.pools[model]:
+        yield OpenObject(*item)
+
+
+async def read_objects(
+    model: Union[CharityProject, Donation],
+    ids: List[int],
+    session: AsyncSession,
+) -> List[OpenObject]:
+    """Свежие копии объектов; закрытые в БД приходят закрытыми."""
+    order = (model.create_date, model.id)
+    rows = await session.execute(
+        select(
+            model.id, model.full_amount, model.invested_amount,
+            model.create_date, model.fully_invested, model.close_date,
+        ).where(model.id.in_(ids)).order_by(*order)
+    )
+    return [OpenObject(*row) for row in rows]
+
+
+async def invest(
+    incoming: List[OpenObject],
+    model_in: Union[CharityProject, Donation],
+    model_add: Union[CharityProject, Donation],
+    session: AsyncSession,
+    use_ledger: bool = False,
+) -> List[OpenObject]:
+    """Распределяет incoming и фиксирует транзакцию сессии.
+
+    Запись выполняется в точке сохранения: если конкурирующий запрос
+    успел изменить суммы, откатывается только она, и распределение
+    повторяется по свежим данным. Объекты incoming, которые к повтору
+    уже закрыты в БД, возвращаются как есть и не распределяются.
+    """
+    for attempt in range(settings.investing_attempts):
+        if attempt:
+            incoming = await read_objects(
+                model_in, [obj.id for obj in incoming], session
+            )
+        open_incoming = [obj for obj in incoming if not obj.fully_invested]
+        if use_ledger:
+            pool = iter_ledger_pool(model_add)
+        else:
+            pool = get_not_full_invested_objects(
+                model_add, session, sum(
+                    obj.full_amount - obj.invested_amount
+                    for obj in open_incoming
+                )
+            )
+        transfers = []
+        touched = await allocate(open_incoming, pool, transfers)
+        if touched:
+            changed = [
+                obj for obj in open_incoming
+                if obj.invested_amount != obj.seen_amount
+            ]
+            savepoint = await session.begin_nested()
+            if not (
+                await apply_allocation(model_add, touched, session) and
+                await apply_allocation(model_in, changed, session)
+            ):
+                logging.warning(
+                    'Открытые %s изменились во время распределения, повтор',
+                    model_add.__tablename__,
+                )
+                await savepoint.rollback()
+                if use_ledger:
+                    await load_ledger(session)
+                continue
+            await log_allocations(model_in, transfers, session)
+            await savepoint.commit()
+            aggregates.record_allocation(
+                session, model_in, open_incoming, model_add, touched
+            )
+        await aggregates.flush_totals(session)
+        await session.commit()
+        await response_cache.bump(model_in.__tablename__)
+        if touched:
+            await response_cache.bump(model_add.__tablename__)
+        if use_ledger:
+            ledger.apply(model_add, touched)
+            for obj in open_incoming:
+                ledger.add(model_in, obj)
+        return incoming
+    raise RuntimeError('Не удалось распределить средства')
+
+
+async def investing_process_many(
+    incoming: List[OpenObject],
+    model_in: Union[CharityProject, Donation],
+    model_add: Union[CharityProject, Donation],
+    session: AsyncSession,
+) -> List[OpenObject]:
+    """Распределения внутри процесса выполняются по одному под ledger.lock,
+    а сравнение сумм в UPDATE защищает от гонок между процессами.
+    Замер в метриках включает ожидание блокировки.
+    """
+    started = time.perf_counter()
+    try:
+        async with ledger.lock:
+            return await invest(
+                incoming, model_in, model_add, session,
+                use_ledger=ledger.loaded,
+            )
+    finally:
+        observe_investing(
+            model_in.__tablename__, time.perf_counter() - started
+        )
+
+
 async def investing_process(
     obj_in: Union[CharityProject, Donation],
     model_add: Union[CharityProject, Donation],
     session: AsyncSession,
 ) -> Union[CharityProject, Donation]:
-    objects_model = await get_not_full_invested_objects(model_add, session)
-
-    for model in objects_model:
-        obj_in, model = await invest_money(obj_in, model)
-        session.add(obj_in)
-        session.add(model)
+    """Распределяет obj_in и фиксирует транзакцию.
 
-    await session.commit()
-    await session.refresh(obj_in)
+    Итоговые суммы переносятся в obj_in без повторного чтения из БД.
+    """
+    incoming, = await investing_process_many(
+        [OpenObject(obj_in.id, obj_in.full_amount, obj_in.invested_amount,
+                    obj_in.create_date)],
+        type(obj_in), model_add, session,
+    )
+    for field in ('invested_amount', 'fully_invested', 'close_date'):
+        set_committed_value(obj_in, field, getattr(incoming, field))
     return obj_in
@@ -0,0 +1,101 @@
+import asyncio
+from collections import deque
+from typing import Dict, Iterable, List, Tuple
+
+from app.models import CharityProject, Donation
+
+# (id, full_amount, invested_amount, create_date)
+PoolItem = Tuple[int, int, int, object]
+
+
+class Ledger:
+    """Открытые пулы проектов и пожертвований в памяти процесса.
+
+    Каждый пул — очередь кортежей PoolItem в порядке FIFO. Очередь
+    меняется только после успешного коммита в БД и только под
+    блокировкой, поэтому подбор средств не читает открытые объекты из БД.
+    Подходит только для одного процесса приложения.
+    """
+
+    def __init__(self, *models):
+        self.pools: Dict[type, deque] = {model: deque() for model in models}
+        self.lock = asyncio.Lock()
+        self.loaded = False
+
+    def load(self, pools: Dict[type, Iterable[PoolItem]]) -> None:
+        self.pools = {model: deque(pools[model]) for model in self.pools}
+        self.loaded = True
+
+    def diff(self, pools: Dict[type, Iterable[PoolItem]]) -> List[str]:
+        """Расхождения между пулами в памяти и переданными из БД."""
+        problems = []
+        for model, pool in self.pools.items():
+            expected = list(pools[model])
+            if list(pool) == expected:
+                continue
+            in_db = {item[0]: item for item in expected}
+            in_ledger = {item[0]: item for item in pool}
+            mismatched = [
+                obj_id for obj_id in sorted(in_db.keys() | in_ledger.keys())
+                if in_db.get(obj_id) != in_ledger.get(obj_id)
+            ]
+            problems.extend(
+                f'{model.__tablename__} {obj_id}: '
+                f'ledger={in_ledger.get(obj_id)} db={in_db.get(obj_id)}'
+                for obj_id in mismatched
+            )
+            if not mismatched:
+                problems.append(f'{model.__tablename__}: order differs')
+        return problems
+
+    def apply(self, model: type, touched: Iterable) -> None:
+        """Переносит результат распределения: touched — начало пула."""
+        pool = self.pools[model]
+        for obj in touched:
+            obj_id, full_amount, _, create_date = pool[0]
+            if obj_id != obj.id:
+                raise RuntimeError(
+                    f'Пул {model.__tablename__} разошёлся с распределением'
+                )
+            if obj.fully_invested:
+                pool.popleft()
+            else:
+                pool[0] = (obj_id, full_amount, obj.invested_amount,
+                           create_date)
+
+    def add(self, model: type, obj) -> None:
+        """Ставит открытый объект в пул по ключу (create_date, id).
+
+        Обычно объект новее всех и встаёт в конец; объект, который
+        дошёл до блокировки позже более нового, вставляется на своё место.
+        """
+        if obj.fully_invested:
+            return
+        pool = self.pools[model]
+        item = (obj.id, obj.full_amount, obj.invested_amount, obj.create_date)
+        index = len(pool)
+        while index and (pool[index - 1][3], pool[index - 1][0]) > (
+            item[3], item[0]
+        ):
+            index -= 1
+        pool.insert(index, item)
+
+    async def update(self, obj) -> None:
+        async with self.lock:
+            pool = self.pools[type(obj)]
+            for index, item in enumerate(pool):
+                if item[0] == obj.id:
+                    pool[index] = (obj.id, obj.full_amount,
+                                   obj.invested_amount, obj.create_date)
+                    return
+
+    async def discard(self, obj) -> None:
+        async with self.lock:
+            pool = self.pools[type(obj)]
+            for item in pool:
+                if item[0] == obj.id:
+                    pool.remove(item)
+                    return
+
+
+ledger = Ledger(CharityProject, Donation)
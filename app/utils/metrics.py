@@ -0,0 +1,166 @@
+import heapq
+import time
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+DURATION_BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10,
+)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+SLOWEST_STATEMENTS = 3
+
+
+class Histogram:
+    """Гистограмма в текстовом формате Prometheus."""
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labels: Sequence[str],
+        buckets: Sequence[float] = DURATION_BUCKETS,
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        self.series: Dict[tuple, list] = {}
+
+    def observe(self, value: float, *label_values: str) -> None:
+        series = self.series.get(label_values)
+        if series is None:
+            series = self.series[label_values] = [
+                [0] * len(self.buckets), 0.0, 0
+            ]
+        counts = series[0]
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                counts[index] += 1
+        series[1] += value
+        series[2] += 1
+
+    def render(self) -> List[str]:
+        lines = [
+            f'# HELP {self.name} {self.documentation}',
+            f'# TYPE {self.name} histogram',
+        ]
+        for label_values, (counts, total, count) in sorted(
+            self.series.items()
+        ):
+            labels = ','.join(
+                f'{name}="{escape(value)}"'
+                for name, value in zip(self.labels, label_values)
+            )
+            prefix = f'{labels},' if labels else ''
+            suffix = f'{{{labels}}}' if labels else ''
+            for bound, bucket_count in zip(self.buckets, counts):
+                lines.append(
+                    f'{self.name}_bucket{{{prefix}le="{bound}"}} '
+                    f'{bucket_count}'
+                )
+            lines.append(f'{self.name}_bucket{{{prefix}le="+Inf"}} {count}')
+            lines.append(f'{self.name}_sum{suffix} {total}')
+            lines.append(f'{self.name}_count{suffix} {count}')
+        return lines
+
+
+def escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"')
+
+
+REQUEST_DURATION = Histogram(
+    'http_request_duration_seconds',
+    'Время обработки запроса до начала ответа.',
+    ('method', 'route'),
+)
+REQUEST_SQL_STATEMENTS = Histogram(
+    'http_request_sql_statements',
+    'Число SQL-запросов за один HTTP-запрос.',
+    ('method', 'route'),
+    COUNT_BUCKETS,
+)
+REQUEST_SQL_DURATION = Histogram(
+    'http_request_sql_duration_seconds',
+    'Суммарное время SQL-запросов за один HTTP-запрос.',
+    ('method', 'route'),
+)
+INVESTING_DURATION = Histogram(
+    'investing_process_duration_seconds',
+    'Время распределения средств, включая ожидание блокировки.',
+    ('model',),
+)
+HISTOGRAMS = (
+    REQUEST_DURATION, REQUEST_SQL_STATEMENTS, REQUEST_SQL_DURATION,
+    INVESTING_DURATION,
+)
+
+
+class RequestStats:
+    """Замеры одного запроса: SQL и именованные участки обработки."""
+
+    __slots__ = ('sql_count', 'sql_time', 'slowest', 'spans')
+
+    def __init__(self):
+        self.sql_count = 0
+        self.sql_time = 0.0
+        self.slowest: List[Tuple[float, str]] = []
+        self.spans: Dict[str, float] = {}
+
+    def add_statement(self, duration: float, statement: str) -> None:
+        self.sql_count += 1
+        self.sql_time += duration
+        if len(self.slowest) < SLOWEST_STATEMENTS:
+            heapq.heappush(self.slowest, (duration, statement))
+        elif duration > self.slowest[0][0]:
+            heapq.heapreplace(self.slowest, (duration, statement))
+
+    def add_span(self, name: str, duration: float) -> None:
+        self.spans[name] = self.spans.get(name, 0.0) + duration
+
+
+current_stats: ContextVar[Optional[RequestStats]] = ContextVar(
+    'current_stats', default=None
+)
+
+
+def before_cursor_execute(conn, cursor, statement, parameters, context,
+                          executemany):
+    if current_stats.get() is not None:
+        context.instrumentation_started = time.perf_counter()
+
+
+def after_cursor_execute(conn, cursor, statement, parameters, context,
+                         executemany):
+    stats = current_stats.get()
+    if stats is not None:
+        stats.add_statement(
+            time.perf_counter() - context.instrumentation_started, statement
+        )
+
+
+def instrument_engine(engine: Engine) -> None:
+    """Подключает учёт SQL-запросов к синхронному движку."""
+    for name, listener in (
+        ('before_cursor_execute', before_cursor_execute),
+        ('after_cursor_execute', after_cursor_execute),
+    ):
+        if not event.contains(engine, name, listener):
+            event.listen(engine, name, listener)
+
+
+def observe_investing(model_name: str, duration: float) -> None:
+    INVESTING_DURATION.observe(duration, model_name)
+    stats = current_stats.get()
+    if stats is not None:
+        stats.add_span('investing', duration)
+
+
+def render_metrics(extra: Sequence[str] = ()) -> str:
+    lines = []
+    for histogram in HISTOGRAMS:
+        lines.extend(histogram.render())
+    lines.extend(extra)
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,114 @@
+"""Кэш сериализованных ответов списков.
+
+Встроенный бэкенд хранит записи и версии в памяти процесса. Запись
+в одном воркере увеличивает версию только у него, остальные воркеры
+отдают прежний список, пока не истечёт response_cache_ttl, поэтому
+время жизни по умолчанию короткое. Для нескольких воркеров без такой
+задержки нужен общий бэкенд (CacheBackend поверх Redis и т. п.).
+"""
+import hashlib
+from abc import ABC, abstractmethod
+from typing import Dict, NamedTuple, Optional
+
+from app.core.config import settings
+from app.utils.cache import TTLCache
+
+
+class CachedResponse(NamedTuple):
+    body: bytes
+    etag: str
+    headers: Dict[str, str]
+
+
+class CacheBackend(ABC):
+    """Хранилище кэша ответов и версий пространств имён.
+
+    Общий для нескольких процессов бэкенд (например, Redis) реализует
+    эти же методы: версия должна увеличиваться атомарно.
+    """
+
+    @abstractmethod
+    async def get(self, key: str) -> Optional[CachedResponse]:
+        ...
+
+    @abstractmethod
+    async def set(self, key: str, value: CachedResponse) -> None:
+        ...
+
+    @abstractmethod
+    async def version(self, namespace: str) -> int:
+        ...
+
+    @abstractmethod
+    async def bump(self, namespace: str) -> None:
+        ...
+
+    @abstractmethod
+    async def clear(self) -> None:
+        ...
+
+
+class MemoryCacheBackend(CacheBackend):
+    """Кэш в памяти процесса."""
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.entries = TTLCache(maxsize, ttl)
+        self.versions: Dict[str, int] = {}
+
+    async def get(self, key: str) -> Optional[CachedResponse]:
+        return self.entries.get(key)
+
+    async def set(self, key: str, value: CachedResponse) -> None:
+        self.entries.set(key, value)
+
+    async def version(self, namespace: str) -> int:
+        return self.versions.get(namespace, 0)
+
+    async def bump(self, namespace: str) -> None:
+        self.versions[namespace] = self.versions.get(namespace, 0) + 1
+
+    async def clear(self) -> None:
+        self.entries.clear()
+        self.versions.clear()
+
+
+class ResponseCache:
+    """Кэш сериализованных ответов, разделённый на пространства имён.
+
+    Ключ записи содержит версию пространства имён, поэтому запись
+    изменений сбрасывает кэш одним увеличением версии. Версия
+    увеличивается после коммита: ответ, собранный по старым данным,
+    попадает в кэш только под старой версией.
+    """
+
+    def __init__(self, backend: CacheBackend):
+        self.backend = backend
+
+    async def key(self, namespace: str, query: str) -> str:
+        version = await self.backend.version(namespace)
+        return f'{namespace}:{version}:{query}'
+
+    async def get(self, key: str) -> Optional[CachedResponse]:
+        return await self.backend.get(key)
+
+    async def set(
+        self, key: str, body: bytes, headers: Dict[str, str]
+    ) -> CachedResponse:
+        entry = CachedResponse(
+            body, f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"',
+            headers,
+        )
+        await self.backend.set(key, entry)
+        return entry
+
+    async def bump(self, *namespaces: str) -> None:
+        for namespace in namespaces:
+            await self.backend.bump(namespace)
+
+    async def clear(self) -> None:
+        await self.backend.clear()
+
+
+response_cache = ResponseCache(MemoryCacheBackend(
+    settings.response_cache_size, settings.response_cache_ttl
+))
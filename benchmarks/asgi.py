@@ -0,0 +1,42 @@
+"""Вызов ASGI-приложения в текущем цикле событий без HTTP-сервера."""
+import asyncio
+from typing import Iterable, Tuple
+
+
+async def call(
+    app,
+    method: str,
+    path: str,
+    body: bytes = b'',
+    content_type: str = 'application/json',
+    headers: Iterable[Tuple[bytes, bytes]] = (),
+    query_string: bytes = b'',
+) -> Tuple[int, bytes]:
+    """Выполняет запрос и возвращает статус-код и тело ответа."""
+    scope = {
+        'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1',
+        'method': method, 'scheme': 'http', 'path': path, 'raw_path':
+        path.encode(), 'root_path': '', 'query_string': query_string,
+        'headers': [(b'content-type', content_type.encode()),
+                    (b'content-length', str(len(body)).encode()),
+                    *headers],
+        'client': ('127.0.0.1', 0), 'server': ('testserver', 80),
+    }
+    messages = [{'type': 'http.request', 'body': body, 'more_body': False}]
+    status = None
+    chunks = []
+
+    async def receive():
+        if messages:
+            return messages.pop()
+        await asyncio.sleep(3600)
+
+    async def send(message):
+        nonlocal status
+        if message['type'] == 'http.response.start':
+            status = message['status']
+        elif message['type'] == 'http.response.body':
+            chunks.append(message.get('body', b''))
+
+    await app(scope, receive, send)
+    return status, b''.join(chunks)
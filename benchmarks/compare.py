@@ -0,0 +1,77 @@
+"""Сравнение двух файлов результатов benchmarks.hot_path.
+
+Для каждой пары (размер, сценарий) печатает пропускную способность и
+p50/p99 до и после. Код возврата 1, если хоть одна метрика ухудшилась
+больше чем на --threshold.
+
+    python -m benchmarks.compare results/abc123-sqlite.json \\
+        results/def456-sqlite.json --threshold 0.15
+"""
+import argparse
+import json
+import sys
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+# Метрика и направление: 1 — больше лучше, -1 — меньше лучше.
+METRICS = (('throughput', 1), ('p50_ms', -1), ('p99_ms', -1))
+
+
+def load(path: Path) -> Tuple[dict, Dict[Tuple[int, str], dict]]:
+    report = json.loads(path.read_text())
+    return report['meta'], {
+        (result['size'], result['scenario']): result
+        for result in report['results']
+    }
+
+
+def change(before: float, after: float, direction: int) -> float:
+    """Относительное ухудшение: положительное — стало хуже."""
+    if not before:
+        return 0.0
+    return (before - after) / before * direction
+
+
+def compare(base: Path, head: Path, threshold: float) -> List[str]:
+    base_meta, base_results = load(base)
+    head_meta, head_results = load(head)
+    print(
+        f'{base_meta["commit"]} ({base_meta["database"]}) -> '
+        f'{head_meta["commit"]} ({head_meta["database"]})'
+    )
+    regressions = []
+    for key in sorted(base_results.keys() & head_results.keys()):
+        size, scenario = key
+        cells = []
+        for metric, direction in METRICS:
+            before = base_results[key][metric]
+            after = head_results[key][metric]
+            delta = change(before, after, direction)
+            mark = ''
+            if delta > threshold:
+                mark = ' !'
+                regressions.append(
+                    f'{size} {scenario} {metric}: {before} -> {after}'
+                )
+            cells.append(f'{metric} {before:>9.2f} -> {after:>9.2f}{mark}')
+        print(f'{size:>8} {scenario:<18} ' + '  '.join(cells))
+    for key in sorted(base_results.keys() ^ head_results.keys()):
+        print(f'{key[0]:>8} {key[1]:<18} есть только в одном из файлов')
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('base', type=Path)
+    parser.add_argument('head', type=Path)
+    parser.add_argument('--threshold', type=float, default=0.1,
+                        help='допустимое ухудшение, доля')
+    args = parser.parse_args()
+    regressions = compare(args.base, args.head, args.threshold)
+    if regressions:
+        print('Ухудшения:', *regressions, sep='\n  ')
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,29 @@
+"""Защита чужих данных в базах, которые бенчмарки пересоздают."""
+from sqlalchemy import func, inspect, select
+from sqlalchemy.engine import Connection
+
+WIPE_HELP = ('схема в --database-url удаляется и создаётся заново; '
+             'без этого флага база с данными не трогается')
+
+
+def check_disposable(connection: Connection, wipe: bool = False) -> None:
+    """Останавливает бенчмарк, если в таблицах приложения есть строки.
+
+    Бенчмарк удаляет и пересоздаёт схему; непустую базу он трогает
+    только с явным разрешением wipe.
+    """
+    # Импорт здесь: hot_path задаёт DATABASE_URL до импорта приложения.
+    from app.core.base import Base
+
+    existing = set(inspect(connection).get_table_names())
+    filled = [
+        table.name for table in Base.metadata.sorted_tables
+        if table.name in existing and connection.execute(
+            select(func.count()).select_from(table)
+        ).scalar()
+    ]
+    if filled and not wipe:
+        raise SystemExit(
+            f'В базе есть данные ({", ".join(filled)}); бенчмарк удалит '
+            'их вместе со схемой. Укажите пустую базу или --wipe-database.'
+        )
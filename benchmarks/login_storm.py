@@ -0,0 +1,117 @@
+"""Задержка чтения списка проектов во время шквала входов.
+
+Приложение вызывается напрямую через ASGI в одном цикле событий,
+поэтому любая синхронная работа в обработчике входа видна как рост
+задержки GET /charity_project/. Сравнение с расчётом bcrypt в цикле
+событий — запуск с --workers 0.
+
+    python -m benchmarks.login_storm --logins 16 --duration 5
+    python -m benchmarks.login_storm --workers 0
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from urllib.parse import urlencode
+
+from benchmarks.asgi import call
+
+APP_DIR = Path(__file__).resolve().parent.parent / 'app'
+
+EMAIL = 'storm@example.com'
+PASSWORD = 'chimichangas4life'
+
+
+async def read_latencies(app, stop: asyncio.Event) -> list:
+    latencies = []
+    while not stop.is_set():
+        started = time.perf_counter()
+        status, _ = await call(app, 'GET', '/charity_project/')
+        assert status == 200, status
+        latencies.append((time.perf_counter() - started) * 1000)
+    return latencies
+
+
+async def login_loop(app, stop: asyncio.Event) -> int:
+    body = urlencode({'username': EMAIL, 'password': PASSWORD}).encode()
+    logins = 0
+    while not stop.is_set():
+        status, _ = await call(app, 'POST', '/auth/jwt/login', body,
+                               'application/x-www-form-urlencoded')
+        assert status == 200, status
+        logins += 1
+    return logins
+
+
+def report(name: str, latencies: list, duration: float, logins: int = 0):
+    quantiles = statistics.quantiles(latencies, n=100)
+    print(
+        f'{name:>6}: {len(latencies)} GET, p50 {quantiles[49]:.2f} ms, '
+        f'p99 {quantiles[98]:.2f} ms, max {max(latencies):.2f} ms, '
+        f'{logins / duration:.1f} входов/с'
+    )
+
+
+async def run(args):
+    from app.core.db import Base, engine
+    from app.core.password import password_helper
+    from app.main import app
+    from app.models import CharityProject, User
+
+    async with engine.begin() as connection:
+        await connection.run_sync(Base.metadata.create_all)
+        await connection.execute(User.__table__.insert(), [{
+            'email': EMAIL, 'is_active': True, 'is_superuser': False,
+            'is_verified': True,
+            'hashed_password': password_helper.hash(PASSWORD),
+        }])
+        await connection.execute(CharityProject.__table__.insert(), [
+            {'name': f'project {i}', 'description': '-', 'full_amount': 1000,
+             'invested_amount': 0, 'fully_invested': False}
+            for i in range(args.projects)
+        ])
+
+    stop = asyncio.Event()
+    reader = asyncio.create_task(read_latencies(app, stop))
+    await asyncio.sleep(args.duration)
+    stop.set()
+    report('idle', await reader, args.duration)
+
+    stop = asyncio.Event()
+    storm = [
+        asyncio.create_task(login_loop(app, stop)) for _ in range(args.logins)
+    ]
+    reader = asyncio.create_task(read_latencies(app, stop))
+    await asyncio.sleep(args.duration)
+    stop.set()
+    logins = sum(await asyncio.gather(*storm))
+    report('storm', await reader, args.duration, logins)
+    await engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--logins', type=int, default=16,
+                        help='одновременных входов')
+    parser.add_argument('--duration', type=float, default=5,
+                        help='длительность фазы, с')
+    parser.add_argument('--projects', type=int, default=50)
+    parser.add_argument('--rounds', type=int, default=12)
+    parser.add_argument('--workers', type=int, default=4)
+    args = parser.parse_args()
+
+    os.environ['DATABASE_URL'] = (
+        f'sqlite+aiosqlite:///{tempfile.mkdtemp()}/storm.db'
+    )
+    os.environ['BCRYPT_ROUNDS'] = str(args.rounds)
+    os.environ['PASSWORD_HASH_WORKERS'] = str(args.workers)
+    sys.path.insert(0, str(APP_DIR))
+    asyncio.run(run(args))
+
+
+if __name__ == '__main__':
+    main()
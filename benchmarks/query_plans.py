@@ -0,0 +1,110 @@
+"""План запросов FIFO-пула и истории пожертвований.
+
+Заполняет базу синтетическими данными и показывает, какие индексы
+выбирает планировщик, а также время выборки первой порции.
+
+    python -m benchmarks.query_plans --rows 100000
+    python -m benchmarks.query_plans --database-url postgresql://...
+"""
+import argparse
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine, insert, select, text
+
+from app.core.base import Base
+from app.core.config import settings
+from app.models import CharityProject, Donation, User
+from app.utils.investing import open_objects_query
+from benchmarks.database import WIPE_HELP, check_disposable
+
+
+def fill(connection, rows: int, open_share: float = 0.05):
+    start = datetime(2020, 1, 1)
+    connection.execute(insert(User), [
+        {'email': f'user{i}@example.com', 'hashed_password': '-',
+         'is_active': True, 'is_superuser': False, 'is_verified': True}
+        for i in range(1, 101)
+    ])
+    for model, extra in (
+        (CharityProject, lambda i: {'name': f'project {i}',
+                                    'description': '-'}),
+        (Donation, lambda i: {'user_id': random.randint(1, 100)}),
+    ):
+        data = []
+        for i in range(rows):
+            is_open = i >= rows * (1 - open_share)
+            data.append({
+                'full_amount': 1000,
+                'invested_amount': 0 if is_open else 1000,
+                'fully_invested': not is_open,
+                'create_date': start + timedelta(minutes=i),
+                **extra(i),
+            })
+        connection.execute(insert(model), data)
+
+
+def explain(connection, statement) -> str:
+    compiled = statement.compile(
+        connection, compile_kwargs={'literal_binds': True}
+    )
+    prefix = (
+        'EXPLAIN QUERY PLAN' if connection.dialect.name == 'sqlite'
+        else 'EXPLAIN'
+    )
+    plan = connection.execute(text(f'{prefix} {compiled}')).all()
+    return '\n'.join(' '.join(str(part) for part in row) for row in plan)
+
+
+def timed(connection, statement, repeat: int = 20) -> float:
+    started = time.perf_counter()
+    for _ in range(repeat):
+        connection.execute(statement).all()
+    return (time.perf_counter() - started) / repeat * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--database-url')
+    parser.add_argument('--wipe-database', action='store_true',
+                        help=WIPE_HELP)
+    args = parser.parse_args()
+
+    url = args.database_url
+    if url is None:
+        url = f'sqlite:///{tempfile.mkdtemp()}/bench.db'
+    engine = create_engine(url)
+    with engine.connect() as connection:
+        check_disposable(connection, args.wipe_database)
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    with engine.begin() as connection:
+        fill(connection, args.rows)
+        connection.execute(text('ANALYZE'))
+
+    statements = {
+        'open charityproject': open_objects_query(
+            CharityProject, settings.investing_batch_size
+        ),
+        'open donation': open_objects_query(
+            Donation, settings.investing_batch_size
+        ),
+        'donation history page': select(
+            Donation.full_amount, Donation.comment, Donation.id,
+            Donation.create_date,
+        ).where(Donation.user_id == 7).order_by(
+            Donation.create_date.desc(), Donation.id.desc()
+        ).limit(51),
+    }
+    with engine.connect() as connection:
+        for name, statement in statements.items():
+            print(f'== {name}: {timed(connection, statement):.3f} ms')
+            print(explain(connection, statement))
+    Base.metadata.drop_all(engine)
+
+
+if __name__ == '__main__':
+    main()
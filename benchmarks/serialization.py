@@ -0,0 +1,97 @@
+"""Сериализация списков: схема pydantic против словарей из строк.
+
+Сравнивает прежний путь ответа списка (выборка ORM-объектов,
+schema.from_orm, jsonable_encoder, JSONResponse) с нынешним (выборка
+колонок, row_dicts, FastJSONResponse) на одних и тех же данных.
+Время включает чтение из БД.
+
+    python -m benchmarks.serialization --rows 1000 10000 100000
+"""
+import argparse
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from sqlalchemy import create_engine, insert, select
+from sqlalchemy.orm import Session
+
+from app.api.responses import FastJSONResponse, row_dicts
+from app.core.base import Base
+from app.models import Donation, User
+from app.schemas.donation import DonationDB
+
+
+def fill(engine, rows: int) -> None:
+    start = datetime(2020, 1, 1)
+    with engine.begin() as connection:
+        connection.execute(insert(User), [{
+            'email': 'user@example.com', 'hashed_password': '-',
+            'is_active': True, 'is_superuser': False, 'is_verified': True,
+        }])
+        connection.execute(insert(Donation), [
+            {'user_id': 1, 'full_amount': 100,
+             'invested_amount': 100 if i % 2 else 0,
+             'fully_invested': bool(i % 2),
+             'comment': f'comment {i}' if i % 3 else None,
+             'create_date': start + timedelta(seconds=i),
+             'close_date': start + timedelta(seconds=i) if i % 2 else None}
+            for i in range(rows)
+        ])
+
+
+def schema_path(engine) -> bytes:
+    with Session(engine) as session:
+        objs = session.scalars(select(Donation).order_by(Donation.id)).all()
+        content = [
+            jsonable_encoder(DonationDB.from_orm(obj), exclude_none=True)
+            for obj in objs
+        ]
+    return JSONResponse(content).body
+
+
+def rows_path(engine) -> bytes:
+    fields = list(DonationDB.__fields__)
+    with Session(engine) as session:
+        rows = session.execute(select(
+            *(getattr(Donation, field) for field in fields)
+        ).order_by(Donation.id)).all()
+    return FastJSONResponse(row_dicts(fields, rows)).body
+
+
+def timed(path, engine, repeat: int) -> float:
+    started = time.perf_counter()
+    for _ in range(repeat):
+        path(engine)
+    return (time.perf_counter() - started) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, nargs='+',
+                        default=[1000, 10000, 100000])
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    for rows in args.rows:
+        engine = create_engine(
+            f'sqlite:///{tempfile.mkdtemp()}/serialization.db'
+        )
+        Base.metadata.create_all(engine)
+        fill(engine, rows)
+        assert schema_path(engine) == rows_path(engine), (
+            'Ответы должны совпадать байт в байт'
+        )
+        before = timed(schema_path, engine, args.repeat)
+        after = timed(rows_path, engine, args.repeat)
+        print(
+            f'{rows:>8} строк: схема {rows / before:>10.0f} строк/с, '
+            f'строки {rows / after:>10.0f} строк/с, '
+            f'ускорение x{before / after:.1f}'
+        )
+        engine.dispose()
+
+
+if __name__ == '__main__':
+    main()
@@ -1,3 +1,4 @@
+import os
 from pathlib import Path
 
 import pytest
@@ -7,6 +8,10 @@ from sqlalchemy import create_engine
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
 from sqlalchemy.orm import sessionmaker
 
+# Хуки запуска TestClient работают с основной БД из настроек,
+# а не с тестовой: прогрев её бы менял.
+os.environ['STARTUP_WARMUP'] = 'false'
+
 try:
     from app.main import app
 except (NameError, ImportError):
@@ -40,6 +45,9 @@ except (NameError, ImportError):
     )
 
 
+from app.utils.metrics import instrument_engine
+from app.utils.response_cache import response_cache
+
 BASE_DIR = Path(__file__).resolve(strict=True).parent.parent
 
 pytest_plugins = [
@@ -53,8 +61,10 @@ engine = create_async_engine(
     SQLALCHEMY_DATABASE_URL,
     connect_args={"check_same_thread": False},
 )
+instrument_engine(engine.sync_engine)
 TestingSessionLocal = sessionmaker(
     class_=AsyncSession, autocommit=False, autoflush=False, bind=engine,
+    expire_on_commit=False,
 )
 
 
@@ -70,6 +80,7 @@ async def init_db():
     yield
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.drop_all)
+    await response_cache.clear()
 
 
 @pytest.fixture
@@ -4,6 +4,7 @@ from conftest import (
 )
 from fastapi.testclient import TestClient
 
+from app.core.replicas import get_read_session
 from app.models.user import User
 
 superuser = User(
@@ -32,6 +33,7 @@ not_auth_user = User(
 def user_client():
     app.dependency_overrides = {}
     app.dependency_overrides[get_async_session] = override_db
+    app.dependency_overrides[get_read_session] = override_db
     app.dependency_overrides[current_user] = lambda: user
     with TestClient(app) as client:
         yield client
@@ -41,6 +43,7 @@ def user_client():
 def test_client():
     app.dependency_overrides = {}
     app.dependency_overrides[get_async_session] = override_db
+    app.dependency_overrides[get_read_session] = override_db
     app.dependency_overrides[current_user] = lambda: not_auth_user
     with TestClient(app) as client:
         yield client
@@ -50,6 +53,7 @@ def test_client():
 def superuser_client():
     app.dependency_overrides = {}
     app.dependency_overrides[get_async_session] = override_db
+    app.dependency_overrides[get_read_session] = override_db
     app.dependency_overrides[current_superuser] = lambda: superuser
     with TestClient(app) as client:
         yield client
@@ -0,0 +1,157 @@
+import asyncio
+import time
+from datetime import datetime
+
+import pytest
+from conftest import TestingSessionLocal
+from sqlalchemy import select
+
+from app.core.config import settings
+from app.models import Allocation, CharityProject, Donation
+from app.utils import allocation_worker as worker_module
+from app.utils import investing
+from app.utils.allocation_worker import AllocationWorker, allocation_worker
+from app.utils.investing import OpenObject
+
+
+@pytest.fixture
+def async_allocation(monkeypatch):
+    monkeypatch.setattr(settings, 'allocation_async', True)
+    monkeypatch.setattr(allocation_worker, 'session_factory', TestingSessionLocal)
+    yield allocation_worker
+    allocation_worker.results.clear()
+
+
+def wait_allocated(client, donation_id):
+    for _ in range(100):
+        response = client.get(f'/donation/{donation_id}/allocation')
+        if response.json()['status'] not in ('pending', 'unknown'):
+            return response.json()
+        time.sleep(0.02)
+    raise AssertionError('Пожертвование не распределено фоновой задачей.')
+
+
+def test_async_allocation(async_allocation, user_client, charity_project, charity_project_nunchaku):
+    assert async_allocation.running, 'Фоновая задача должна запускаться при старте приложения.'
+    response = user_client.post('/donation/', json={'full_amount': 1500000})
+    assert response.status_code == 200
+    assert sorted(response.json()) == ['create_date', 'full_amount', 'id'], (
+        'Ответ на пожертвование не должен зависеть от режима распределения.'
+    )
+    user_client.post('/donation/batch', json=[{'full_amount': 100}, {'full_amount': 200}])
+    assert wait_allocated(user_client, 1) == {
+        'id': 1, 'status': 'done', 'invested_amount': 1500000, 'fully_invested': True,
+    }
+    assert wait_allocated(user_client, 3)['invested_amount'] == 200
+    projects = user_client.get('/charity_project/').json()
+    assert [project['invested_amount'] for project in projects] == [1000000, 500300], (
+        'Фоновое распределение должно давать тот же результат, что и синхронное.'
+    )
+
+
+def test_async_allocation_status_not_found(async_allocation, user_client):
+    response = user_client.get('/donation/42/allocation')
+    assert response.status_code == 404
+
+
+def test_async_allocation_recovers_on_start(async_allocation, charity_project, donation, user_client):
+    assert wait_allocated(user_client, 1)['fully_invested'], (
+        'При запуске фоновая задача должна распределить оставшиеся открытые пожертвования.'
+    )
+
+
+def test_status_of_unknown_objects():
+    worker = AllocationWorker(TestingSessionLocal)
+    assert worker.status(Donation, 1) == 'unknown', (
+        'Открытый объект, о котором процесс не знает, не должен считаться распределённым.'
+    )
+    assert worker.status(Donation, 1, fully_invested=True) == 'done'
+
+
+@pytest.fixture
+def quick_retries(monkeypatch):
+    monkeypatch.setattr(settings, 'allocation_retry_delay', 0)
+    monkeypatch.setattr(settings, 'allocation_retry_attempts', 3)
+    monkeypatch.setattr(settings, 'allocation_rematch_on_start', False)
+
+
+async def wait_status(worker, obj_id):
+    for _ in range(100):
+        if worker.status(Donation, obj_id) != 'pending':
+            return worker.status(Donation, obj_id)
+        await asyncio.sleep(0.01)
+    raise AssertionError('Распределение не завершилось.')
+
+
+async def test_failed_allocation_is_retried(quick_retries, monkeypatch, mixer):
+    # Фикстуры с freezer останавливают часы цикла событий и отложенные повторы.
+    charity_project = mixer.blend(
+        CharityProject, name='retry', description='retry',
+        full_amount=1000, invested_amount=0, fully_invested=False,
+        create_date=datetime.now(), close_date=None,
+    )
+    donation = mixer.blend(
+        Donation, user_id=None, full_amount=100, invested_amount=0,
+        fully_invested=False, create_date=datetime.now(), close_date=None,
+    )
+    log_allocations = investing.log_allocations
+    calls = []
+
+    async def flaky(*args):
+        calls.append(args)
+        if len(calls) == 1:
+            raise RuntimeError('conflict')
+        await log_allocations(*args)
+
+    monkeypatch.setattr(investing, 'log_allocations', flaky)
+    worker = AllocationWorker(TestingSessionLocal)
+    await worker.start()
+    worker.submit(Donation, [OpenObject(
+        donation.id, donation.full_amount, 0, donation.create_date
+    )])
+    assert await wait_status(worker, donation.id) == 'done', (
+        'Неудачное распределение должно повторяться.'
+    )
+    await worker.stop()
+    assert len(calls) == 2 and worker.attempts == {}
+    async with TestingSessionLocal() as session:
+        saved = await session.get(Donation, donation.id)
+        project = await session.get(CharityProject, charity_project.id)
+        allocations = (await session.scalars(select(Allocation))).all()
+    assert (saved.invested_amount, saved.fully_invested) == (100, True), (
+        'Повтор должен распределять объект заново, а не по изменённой '
+        'копии из неудачной попытки.'
+    )
+    assert project.invested_amount == 100
+    assert [(row.donation_id, row.amount) for row in allocations] == [
+        (donation.id, 100)
+    ]
+
+
+async def test_failed_allocation_gives_up(quick_retries, monkeypatch):
+    async def broken(*args):
+        raise RuntimeError('broken')
+
+    monkeypatch.setattr(worker_module, 'investing_process_many', broken)
+    worker = AllocationWorker(TestingSessionLocal)
+    await worker.start()
+    worker.submit(Donation, [OpenObject(1, 100, 0)])
+    assert await wait_status(worker, 1) == 'failed', (
+        'После последней попытки объект должен получить статус failed.'
+    )
+    await worker.stop()
+    assert worker.attempts == {} and worker.pending == set(), (
+        'Сведения о попытках не должны копиться после отказа.'
+    )
+
+
+async def test_recovery_error_does_not_stop_start(monkeypatch):
+    async def conflict(session):
+        raise RuntimeError('conflict')
+
+    monkeypatch.setattr(worker_module, 'rematch', conflict)
+    monkeypatch.setattr(settings, 'allocation_rematch_on_start', True)
+    worker = AllocationWorker(TestingSessionLocal)
+    await worker.start()
+    await worker.stop()
+    assert worker.recovery is None
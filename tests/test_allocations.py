@@ -0,0 +1,99 @@
+from conftest import TestingSessionLocal, app, current_user
+from fixtures.user import user
+from datetime import datetime
+
+from sqlalchemy import insert, update
+
+from app.models import AllocationLogStart, Donation
+from app.tools.replay_allocations import replay_allocations
+from app.utils.aggregates import read_totals, reconcile_totals
+
+
+def fund(client):
+    app.dependency_overrides[current_user] = lambda: user
+    client.post('/charity_project/', json={
+        'name': 'first', 'description': 'first', 'full_amount': 100,
+    })
+    client.post('/donation/batch', json=[{'full_amount': 60}, {'full_amount': 70}])
+    client.post('/charity_project/', json={
+        'name': 'second', 'description': 'second', 'full_amount': 50,
+    })
+
+
+def test_allocation_log(superuser_client):
+    fund(superuser_client)
+    response = superuser_client.get('/charity_project/1/allocations')
+    assert response.status_code == 200
+    assert [
+        (item['donation_id'], item['amount']) for item in response.json()
+    ] == [(1, 60), (2, 40)], 'В журнале должны быть все поступления в проект.'
+    response = superuser_client.get('/donation/2/allocations')
+    assert [
+        (item['project_id'], item['amount']) for item in response.json()
+    ] == [(1, 40), (2, 30)], 'В журнале должны быть все переводы пожертвования.'
+    response = superuser_client.get('/donation/2/allocations', params={'limit': 1})
+    assert [item['project_id'] for item in response.json()] == [1]
+    assert 'X-Next-Cursor' in response.headers
+
+
+def test_allocation_log_superuser_only(user_client):
+    assert user_client.get('/donation/1/allocations').status_code == 401
+
+
+async def test_replay_allocations(superuser_client):
+    fund(superuser_client)
+    async with TestingSessionLocal() as session:
+        assert await replay_allocations(session) == [], (
+            'Суммы, восстановленные из журнала, должны совпадать с таблицами.'
+        )
+        await session.execute(
+            update(Donation).where(Donation.id == 1).values(
+                invested_amount=0, fully_invested=False, close_date=None,
+            )
+        )
+        await session.commit()
+        assert await replay_allocations(session, apply=True) == [
+            'donation 1: invested_amount=60 fully_invested=True',
+        ]
+        assert await replay_allocations(session) == []
+        donation = await session.get(Donation, 1)
+        await session.refresh(donation)
+        assert donation.close_date is not None, (
+            'Восстановленное закрытое пожертвование должно получить дату закрытия.'
+        )
+
+
+async def zero_first_donation(session):
+    await session.execute(
+        update(Donation).where(Donation.id == 1).values(
+            invested_amount=0, fully_invested=False, close_date=None,
+        )
+    )
+    await reconcile_totals(session, fix=True)
+
+
+async def test_replay_allocations_fixes_totals(superuser_client):
+    fund(superuser_client)
+    async with TestingSessionLocal() as session:
+        await zero_first_donation(session)
+        assert (await read_totals(session))['open_donations'] == 1
+        await replay_allocations(session, apply=True)
+        assert await reconcile_totals(session) == [], (
+            'Вместе с суммами должны исправляться итоги фонда и пользователей.'
+        )
+        assert (await read_totals(session))['open_donations'] == 0
+
+
+async def test_replay_allocations_skips_objects_before_log(superuser_client):
+    fund(superuser_client)
+    async with TestingSessionLocal() as session:
+        await zero_first_donation(session)
+        await session.execute(insert(AllocationLogStart).values(
+            id=1, ts=datetime(2100, 1, 1),
+        ))
+        await session.commit()
+        assert await replay_allocations(session, apply=True) == [], (
+            'Объекты, созданные до начала журнала, не должны сверяться с ним.'
+        )
+        donation = await session.get(Donation, 1)
+        assert donation.invested_amount == 0
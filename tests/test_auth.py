@@ -1,3 +1,10 @@
+from conftest import TestingSessionLocal, engine
+from fastapi_users_db_sqlalchemy import SQLAlchemyUserDatabase
+from sqlalchemy import event
+
+from app.core.user import UserManager, get_jwt_strategy, user_cache
+from app.models.user import User
+from app.schemas.user import UserUpdate
 
 
 def test_register(test_client):
@@ -40,3 +47,68 @@ def test_register_invalid_pass(user_client):
             'reason': 'Password should be at least 3 characters',
         },
     }, 'При некорректной регистрации пользователя тело ответа API отличается от ожидаемого.'
+
+
+async def test_jwt_user_cache():
+    user_cache.clear()
+    strategy = get_jwt_strategy()
+    assert strategy is get_jwt_strategy(), (
+        'JWT-стратегия должна создаваться один раз.'
+    )
+    async with TestingSessionLocal() as session:
+        user = User(email='dead@pool.com', hashed_password='x', is_active=True)
+        session.add(user)
+        await session.commit()
+        token = await strategy.write_token(user)
+
+    executed = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        executed.append(statement)
+
+    event.listen(engine.sync_engine, 'before_cursor_execute', record)
+    try:
+        for _ in range(3):
+            async with TestingSessionLocal() as session:
+                manager = UserManager(SQLAlchemyUserDatabase(session, User))
+                cached = await strategy.read_token(token, manager)
+                assert cached.email == 'dead@pool.com'
+        assert len(executed) == 1, (
+            'Пользователь по тому же токену должен читаться из БД один раз.'
+        )
+        async with TestingSessionLocal() as session:
+            manager = UserManager(SQLAlchemyUserDatabase(session, User))
+            cached = await strategy.read_token(token, manager)
+            await manager.update(UserUpdate(is_active=False), cached, safe=False)
+        async with TestingSessionLocal() as session:
+            manager = UserManager(SQLAlchemyUserDatabase(session, User))
+            assert not (await strategy.read_token(token, manager)).is_active, (
+                'После изменения пользователя кэш токенов должен сбрасываться.'
+            )
+            assert await strategy.read_token('broken', manager) is None
+    finally:
+        event.remove(engine.sync_engine, 'before_cursor_execute', record)
+        user_cache.clear()
+
+
+def test_login_with_pooled_hashing(test_client):
+    test_client.post('/auth/register', json={
+        'email': 'dead@pool.com',
+        'password': 'chimichangas4life',
+    })
+    response = test_client.post('/auth/jwt/login', data={
+        'username': 'dead@pool.com', 'password': 'chimichangas4life',
+    })
+    assert response.status_code == 200, (
+        'Вход с верным паролем должен возвращать статус-код 200.'
+    )
+    assert 'access_token' in response.json()
+    for username, password in (
+        ('dead@pool.com', 'wrong'), ('nobody@pool.com', 'chimichangas4life'),
+    ):
+        response = test_client.post('/auth/jwt/login', data={
+            'username': username, 'password': password,
+        })
+        assert response.status_code == 400, (
+            'Вход с неверными данными должен возвращать статус-код 400.'
+        )
@@ -1,6 +1,10 @@
-from datetime import datetime
+from datetime import datetime, timedelta
+from types import SimpleNamespace
 
 import pytest
+from sqlalchemy.exc import IntegrityError
+
+from app.api.validators import NAME_CONSTRAINT, is_name_duplicate
 
 
 @pytest.mark.parametrize(
@@ -69,6 +73,10 @@ def test_create_project_with_autofilling_fields(superuser_client, json):
         0.0,
         '',
         None,
+        '100',
+        100.0,
+        True,
+        10 ** 12 + 1,
     ],
 )
 def test_create_invalid_full_amount_value(superuser_client, invalid_full_amount):
@@ -621,3 +629,104 @@ def test_get_all_charity_project_not_auth_user(test_client, charity_project, cha
             'name': 'nunchaku'
         }
     ]
+
+
+def test_get_charity_projects_paginated(user_client, charity_project, charity_project_nunchaku):
+    response = user_client.get('/charity_project/', params={'limit': 1})
+    assert response.status_code == 200
+    assert [project['id'] for project in response.json()] == [1], (
+        'Параметр `limit` должен ограничивать размер страницы.'
+    )
+    cursor = response.headers.get('X-Next-Cursor')
+    assert cursor, 'Если есть следующая страница, в ответе должен быть заголовок `X-Next-Cursor`.'
+    response = user_client.get('/charity_project/', params={'limit': 1, 'cursor': cursor})
+    assert [project['id'] for project in response.json()] == [2], (
+        'Курсор должен продолжать выдачу со следующего проекта.'
+    )
+    assert 'X-Next-Cursor' not in response.headers, (
+        'На последней странице заголовка `X-Next-Cursor` быть не должно.'
+    )
+
+
+def test_get_charity_projects_fields(user_client, charity_project, charity_project_nunchaku):
+    response = user_client.get('/charity_project/', params={'fields': 'name,invested_amount'})
+    assert response.status_code == 200
+    assert response.json() == [
+        {'name': 'chimichangas4life', 'invested_amount': 0},
+        {'name': 'nunchaku', 'invested_amount': 0},
+    ], 'Параметр `fields` должен оставлять в ответе только запрошенные поля.'
+
+
+@pytest.mark.parametrize('params', [
+    {'fields': 'name,hashed_password'},
+    {'cursor': 'not a cursor'},
+    {'limit': 0},
+])
+def test_get_charity_projects_invalid_page(user_client, charity_project, params):
+    response = user_client.get('/charity_project/', params=params)
+    assert response.status_code in (400, 422), (
+        'Некорректные параметры страницы должны отклоняться.'
+    )
+
+
+def test_get_charity_projects_etag(superuser_client, charity_project):
+    response = superuser_client.get('/charity_project/')
+    etag = response.headers.get('ETag')
+    assert etag, 'Список проектов должен отдаваться с заголовком `ETag`.'
+    response = superuser_client.get('/charity_project/', headers={'If-None-Match': etag})
+    assert response.status_code == 304 and not response.content, (
+        'При совпадении `If-None-Match` должен возвращаться статус-код 304 без тела.'
+    )
+    superuser_client.post('/charity_project/', json={
+        'name': 'cached', 'description': 'cached', 'full_amount': 100,
+    })
+    response = superuser_client.get('/charity_project/', headers={'If-None-Match': etag})
+    assert response.status_code == 200, (
+        'После создания проекта закэшированный список должен сбрасываться.'
+    )
+    assert [project['name'] for project in response.json()] == ['chimichangas4life', 'cached']
+    assert response.headers['ETag'] != etag
+
+
+def test_closing_speed_report(superuser_client, mixer, small_fully_charity_project):
+    for name, days in (('slow', 30), ('fast', 0.5)):
+        mixer.blend(
+            'app.models.charity_project.CharityProject',
+            name=name, description=name, full_amount=10, invested_amount=10,
+            fully_invested=True, create_date=datetime(2011, 1, 1),
+            close_date=datetime(2011, 1, 1) + timedelta(days=days),
+        )
+    mixer.blend(
+        'app.models.charity_project.CharityProject',
+        name='open', description='open', full_amount=10,
+        create_date=datetime(2011, 1, 1),
+    )
+    response = superuser_client.get('/charity_project/closing_speed')
+    assert response.status_code == 200
+    assert [
+        (project['name'], project['collection_time']) for project in response.json()
+    ] == [('fast', 43200), ('1M$ for ur project', 86400), ('slow', 2592000)], (
+        'Отчёт должен содержать только закрытые проекты, от быстрых к медленным.'
+    )
+    response = superuser_client.get('/charity_project/closing_speed', params={'limit': 1, 'offset': 1})
+    assert [project['name'] for project in response.json()] == ['1M$ for ur project']
+
+
+class PostgresError(Exception):
+    def __init__(self, constraint_name):
+        super().__init__('duplicate key value violates unique constraint')
+        self.diag = SimpleNamespace(constraint_name=constraint_name)
+
+
+@pytest.mark.parametrize('orig, duplicate', [
+    (PostgresError(NAME_CONSTRAINT), True),
+    (PostgresError('user_email_key'), False),
+    (Exception('UNIQUE constraint failed: charityproject.name'), True),
+    (Exception('UNIQUE constraint failed: user.email'), False),
+    (Exception('NOT NULL constraint failed: charityproject.name'), False),
+])
+def test_name_duplicate_checks_constraint(orig, duplicate):
+    error = IntegrityError('INSERT', {}, orig)
+    assert is_name_duplicate(error) is duplicate, (
+        'Повтором имени считается только нарушение уникальности имени проекта.'
+    )
@@ -0,0 +1,80 @@
+import asyncio
+import random
+
+import pytest
+from conftest import TestingSessionLocal
+from sqlalchemy import select
+
+from app.core.config import settings
+from app.crud.donation import donation_crud
+from app.models import Allocation, CharityProject, Donation
+from app.schemas.donation import DonationBase
+from app.utils.aggregates import read_totals
+from app.utils.investing import OpenObject, invest, investing_process
+
+
+async def invest_without_lock(obj_in, model_add, session):
+    await invest(
+        [OpenObject(obj_in.id, obj_in.full_amount, obj_in.invested_amount)],
+        type(obj_in), model_add, session,
+    )
+
+
+async def donate(amount, process):
+    async with TestingSessionLocal() as session:
+        donation = await donation_crud.create(
+            DonationBase(full_amount=amount), session
+        )
+        await process(donation, CharityProject, session)
+
+
+@pytest.mark.parametrize('process', [investing_process, invest_without_lock])
+async def test_concurrent_donations_never_overinvest(mixer, monkeypatch, process):
+    """Параллельные пожертвования не должны переполнять проекты и терять деньги. Вызов invest без блокировки имитирует несколько процессов приложения."""
+    monkeypatch.setattr(settings, 'investing_attempts', 100)
+    for number in range(3):
+        mixer.blend(
+            'app.models.charity_project.CharityProject',
+            name=f'project_{number}',
+            description='race',
+            full_amount=1000,
+            invested_amount=0,
+            fully_invested=False,
+            close_date=None,
+        )
+    amounts = [random.randint(50, 400) for _ in range(30)]
+
+    await asyncio.gather(*(donate(amount, process) for amount in amounts))
+
+    async with TestingSessionLocal() as session:
+        projects = (await session.execute(select(CharityProject))).scalars().all()
+        donations = (await session.execute(select(Donation))).scalars().all()
+    assert len(donations) == len(amounts)
+    for obj in (*projects, *donations):
+        assert 0 <= obj.invested_amount <= obj.full_amount, test_concurrent_donations_never_overinvest.__doc__
+        assert obj.fully_invested == (obj.invested_amount == obj.full_amount), test_concurrent_donations_never_overinvest.__doc__
+    invested_in_projects = sum(obj.invested_amount for obj in projects)
+    assert invested_in_projects == sum(obj.invested_amount for obj in donations), test_concurrent_donations_never_overinvest.__doc__
+    assert invested_in_projects == min(sum(amounts), 3000), test_concurrent_donations_never_overinvest.__doc__
+
+
+async def test_stale_snapshot_of_closed_object_is_skipped(mixer):
+    """Снимок, закрытый в БД другим запросом, при повторе не распределяется повторно."""
+    mixer.blend(
+        'app.models.donation.Donation', user_id=2, full_amount=50,
+        invested_amount=50, fully_invested=True,
+    )
+    mixer.blend(
+        'app.models.charity_project.CharityProject', name='open',
+        description='open', full_amount=100, invested_amount=0,
+        fully_invested=False, close_date=None,
+    )
+    async with TestingSessionLocal() as session:
+        incoming = await invest(
+            [OpenObject(1, 50, 0)], Donation, CharityProject, session
+        )
+        assert incoming[0].fully_invested, test_stale_snapshot_of_closed_object_is_skipped.__doc__
+        assert (await session.execute(select(Allocation))).all() == [], test_stale_snapshot_of_closed_object_is_skipped.__doc__
+        project = await session.get(CharityProject, 1)
+        assert project.invested_amount == 0, test_stale_snapshot_of_closed_object_is_skipped.__doc__
+        assert (await read_totals(session))['open_donations'] == 0, test_stale_snapshot_of_closed_object_is_skipped.__doc__
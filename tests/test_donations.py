@@ -1,6 +1,14 @@
+import csv
+import io
+import json
 from datetime import datetime
 
 import pytest
+from conftest import TestingSessionLocal
+from sqlalchemy import select
+
+from app.crud.base import encode_cursor
+from app.models import Donation
 
 
 @pytest.mark.parametrize('json, keys, expected_data', [
@@ -130,6 +138,10 @@ def test_get_all_donations(superuser_client, donation, another_donation):
     {'full_amount': 0.5},
     {'full_amount': 0.155555},
     {'full_amount': -1.5},
+    {'full_amount': 1.5},
+    {'full_amount': 10.0},
+    {'full_amount': '10'},
+    {'full_amount': 10 ** 12 + 1},
 ])
 def test_donation_invalid(user_client, json):
     response = user_client.post('/donation/', json=json)
@@ -178,3 +190,120 @@ def test_create_donation_check_create_date(user_client):
     assert response_1.json()['create_date'] != response_2.json()['create_date'], (
         'При создании двух пожертвований с паузой (в 1 секунду, например) у них должны быть разные `create_date`'
     )
+
+
+BATCH = [600000, 500000, 100, 4900000, 50]
+
+
+@pytest.mark.parametrize('batch', [True, False])
+async def test_donation_batch_matches_sequential(user_client, charity_project, charity_project_nunchaku, batch):
+    if batch:
+        response = user_client.post('/donation/batch', json=[
+            {'full_amount': amount} for amount in BATCH
+        ])
+        assert response.status_code == 200, (
+            'При создании пакета пожертвований должен возвращаться статус-код 200.'
+        )
+        assert [item['full_amount'] for item in response.json()] == BATCH
+        assert [item['id'] for item in response.json()] == [1, 2, 3, 4, 5]
+    else:
+        for amount in BATCH:
+            user_client.post('/donation/', json={'full_amount': amount})
+    async with TestingSessionLocal() as session:
+        donations = await session.scalars(select(Donation).order_by(Donation.id))
+        assert [
+            (donation.invested_amount, donation.fully_invested)
+            for donation in donations
+        ] == [
+            (600000, True), (500000, True), (100, True), (4899900, False), (0, False),
+        ], 'Пакет пожертвований должен распределяться так же, как пожертвования по одному.'
+    assert charity_project.fully_invested and charity_project_nunchaku.fully_invested, (
+        'Пакет пожертвований должен распределяться так же, как пожертвования по одному.'
+    )
+
+
+@pytest.mark.parametrize('json', [[], [{'full_amount': 10}, {'full_amount': 0}]])
+def test_donation_batch_invalid(user_client, json):
+    response = user_client.post('/donation/batch', json=json)
+    assert response.status_code == 422, (
+        'Пустой пакет или пакет с некорректным пожертвованием должен отклоняться с кодом 422.'
+    )
+
+
+def test_export_donations_ndjson(superuser_client, donation, another_donation):
+    response = superuser_client.get('/donation/export')
+    assert response.status_code == 200, (
+        'Выгрузка пожертвований должна возвращать статус-код 200.'
+    )
+    assert response.headers['content-type'].startswith('application/x-ndjson')
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert lines == superuser_client.get('/donation/').json(), (
+        'Строки NDJSON должны совпадать с элементами списка пожертвований.'
+    )
+
+
+def test_export_donations_csv_date_filter(superuser_client, donation, another_donation):
+    response = superuser_client.get('/donation/export', params={
+        'format': 'csv', 'date_from': '2012-01-01T00:00:00',
+    })
+    assert response.status_code == 200
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert [(row['id'], row['comment']) for row in rows] == [('2', 'From admin')], (
+        'Выгрузка должна учитывать фильтр по дате создания.'
+    )
+    assert rows[0]['create_date'] == '2012-12-12T00:00:00'
+
+
+def test_export_donations_superuser_only(user_client, donation):
+    response = user_client.get('/donation/export')
+    assert response.status_code == 401, (
+        'Выгрузка пожертвований доступна только суперпользователю.'
+    )
+
+
+def test_donation_batch_without_projects(user_client):
+    user_client.post('/donation/batch', json=[{'full_amount': 10}, {'full_amount': 20}])
+    response = user_client.get('/donation/my')
+    assert [item['full_amount'] for item in response.json()] == [10, 20], (
+        'Пакет пожертвований должен сохраняться, даже если открытых проектов нет.'
+    )
+
+
+def test_get_user_donation_history_pages(user_client, mixer):
+    for day, amount in enumerate([10, 20, 30, 40, 50], start=1):
+        mixer.blend(
+            'app.models.donation.Donation', user_id=2, full_amount=amount,
+            create_date=datetime(2020, 1, day),
+        )
+    mixer.blend(
+        'app.models.donation.Donation', user_id=1, full_amount=1,
+        create_date=datetime(2020, 1, 2),
+    )
+    seen = []
+    params = {'limit': 2, 'newest_first': True, 'date_to': '2020-01-05T00:00:00'}
+    while True:
+        response = user_client.get('/donation/my', params=params)
+        assert response.status_code == 200
+        seen.extend(item['full_amount'] for item in response.json())
+        cursor = response.headers.get('X-Next-Cursor')
+        if cursor is None:
+            break
+        params['cursor'] = cursor
+    assert seen == [40, 30, 20, 10], (
+        'История пожертвований должна листаться по курсору с учётом фильтра по дате.'
+    )
+    response = user_client.get('/donation/my', params={
+        'date_from': '2020-01-03T00:00:00', 'fields': 'id,full_amount',
+    })
+    assert response.json() == [
+        {'id': 3, 'full_amount': 30}, {'id': 4, 'full_amount': 40}, {'id': 5, 'full_amount': 50},
+    ]
+
+
+@pytest.mark.parametrize('cursor', ['broken', encode_cursor(1)])
+def test_get_user_donation_history_bad_cursor(user_client, cursor):
+    response = user_client.get('/donation/my', params={'limit': 1, 'cursor': cursor})
+    assert response.status_code == 400, (
+        'Повреждённый курсор истории и курсор списка без даты '
+        'должны отклоняться с кодом 400.'
+    )
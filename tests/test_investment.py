@@ -1,4 +1,10 @@
+from datetime import datetime
+
 import pytest
+from conftest import TestingSessionLocal
+
+from app.models import CharityProject
+from app.utils.investing import get_not_full_invested_objects
 
 
 def test_donation_exist_non_project(superuser_client, donation):
@@ -45,3 +51,78 @@ def test_donation_to_little_invest_project(user_client, charity_project_little_i
     assert charity_project_little_invested.invested_amount == 1000, test_donation_to_little_invest_project.__doc__
     assert not charity_project_nunchaku.fully_invested, test_donation_to_little_invest_project.__doc__
     assert charity_project_nunchaku.invested_amount == 0, test_donation_to_little_invest_project.__doc__
+
+
+def test_donation_spans_fifo_prefix(user_client, mixer):
+    """Пожертвование закрывает первые проекты по очереди создания и частично инвестирует следующий. Более поздние проекты не затрагиваются."""
+    for day, full_amount in enumerate((100, 200, 300, 400), start=1):
+        mixer.blend(
+            'app.models.charity_project.CharityProject',
+            name=f'project_{day}',
+            description='FIFO',
+            full_amount=full_amount,
+            invested_amount=0,
+            fully_invested=False,
+            close_date=None,
+            create_date=datetime(2010, 10, day),
+        )
+    response = user_client.post('/donation/', json={'full_amount': 350})
+    assert response.status_code == 200, test_donation_spans_fifo_prefix.__doc__
+    projects = user_client.get('/charity_project/').json()
+    assert [
+        (project['invested_amount'], project['fully_invested'])
+        for project in projects
+    ] == [
+        (100, True), (200, True), (50, False), (0, False),
+    ], test_donation_spans_fifo_prefix.__doc__
+    assert all('close_date' in project for project in projects[:2]), test_donation_spans_fifo_prefix.__doc__
+
+    user_client.post('/donation/', json={'full_amount': 1000})
+    projects = user_client.get('/charity_project/').json()
+    assert [project['invested_amount'] for project in projects] == [
+        100, 200, 300, 400,
+    ], test_donation_spans_fifo_prefix.__doc__
+    assert all(project['fully_invested'] for project in projects), test_donation_spans_fifo_prefix.__doc__
+
+
+def test_project_collects_open_donations(superuser_client, donation, another_donation):
+    """Новый проект забирает открытые пожертвования по очереди: первое целиком, второе частично."""
+    response = superuser_client.post('/charity_project/', json={
+        'name': 'fifo',
+        'description': 'FIFO',
+        'full_amount': 600,
+    })
+    assert response.json()['invested_amount'] == 600, test_project_collects_open_donations.__doc__
+    assert response.json()['fully_invested'], test_project_collects_open_donations.__doc__
+    donations = superuser_client.get('/donation/').json()
+    assert [
+        (item['invested_amount'], item['fully_invested'])
+        for item in donations
+    ] == [(100, True), (500, False)], test_project_collects_open_donations.__doc__
+
+
+async def test_open_objects_stream_stops_when_amount_covered(mixer):
+    """Открытые проекты выбираются порциями в порядке FIFO, выборка прекращается, когда их свободных сумм хватает на пожертвование."""
+    for number in range(5):
+        mixer.blend(
+            'app.models.charity_project.CharityProject',
+            name=f'project_{number}',
+            description='FIFO',
+            full_amount=100,
+            invested_amount=0,
+            fully_invested=number == 1,
+            create_date=datetime(2010, 10, 10),
+        )
+    async with TestingSessionLocal() as session:
+        covering = [
+            obj.id async for obj in get_not_full_invested_objects(
+                CharityProject, session, amount=250, batch_size=2
+            )
+        ]
+        everything = [
+            obj.id async for obj in get_not_full_invested_objects(
+                CharityProject, session, batch_size=2
+            )
+        ]
+    assert covering == [1, 3, 4], test_open_objects_stream_stops_when_amount_covered.__doc__
+    assert everything == [1, 3, 4, 5], test_open_objects_stream_stops_when_amount_covered.__doc__
@@ -0,0 +1,98 @@
+from datetime import datetime
+
+import pytest_asyncio
+from conftest import TestingSessionLocal
+from sqlalchemy import delete
+
+from app.models import CharityProject, Donation
+from app.utils.investing import (OpenObject, check_ledger, load_ledger,
+                                 rebuild_ledger)
+from app.utils.ledger import ledger
+
+
+@pytest_asyncio.fixture
+async def loaded_ledger():
+    async with TestingSessionLocal() as session:
+        await load_ledger(session)
+    yield ledger
+    ledger.loaded = False
+
+
+async def test_ledger_write_through(charity_project, charity_project_nunchaku, loaded_ledger, user_client):
+    response = user_client.post('/donation/', json={'full_amount': 1500000})
+    assert response.status_code == 200
+    assert [item[:3] for item in ledger.pools[CharityProject]] == [
+        (2, 5000000, 500000),
+    ], 'Закрытый проект должен покинуть пул, частично инвестированный — остаться с новой суммой.'
+    assert not ledger.pools[Donation], (
+        'Полностью распределённое пожертвование не должно попадать в пул.'
+    )
+    async with TestingSessionLocal() as session:
+        assert await check_ledger(session) == [], (
+            'После распределения пулы в памяти должны совпадать с БД.'
+        )
+
+
+async def test_ledger_update_and_remove(charity_project, loaded_ledger, superuser_client):
+    superuser_client.patch('/charity_project/1', json={'full_amount': 2000000})
+    assert ledger.pools[CharityProject][0][1] == 2000000, (
+        'Изменение суммы проекта должно отражаться в пуле.'
+    )
+    superuser_client.delete('/charity_project/1')
+    assert not ledger.pools[CharityProject], (
+        'Удалённый проект должен покинуть пул.'
+    )
+
+
+async def test_ledger_keeps_open_donation(loaded_ledger, user_client):
+    user_client.post('/donation/', json={'full_amount': 100})
+    user_client.post('/donation/', json={'full_amount': 200})
+    assert [item[:3] for item in ledger.pools[Donation]] == [
+        (1, 100, 0), (2, 200, 0),
+    ], 'Нераспределённое пожертвование должно встать в конец пула.'
+
+
+async def test_ledger_divergence_rebuild(charity_project, charity_project_nunchaku, loaded_ledger, user_client):
+    async with TestingSessionLocal() as session:
+        await session.execute(
+            delete(CharityProject).where(CharityProject.id == 1)
+        )
+        await session.commit()
+        assert await check_ledger(session), (
+            'Проверка должна находить проекты, которых уже нет в БД.'
+        )
+
+    response = user_client.post('/donation/', json={'full_amount': 100})
+    assert response.status_code == 200
+    projects = user_client.get('/charity_project/').json()
+    assert projects[0]['invested_amount'] == 100, (
+        'При расхождении пул должен перестраиваться, а распределение повторяться.'
+    )
+    async with TestingSessionLocal() as session:
+        await rebuild_ledger(session)
+        assert await check_ledger(session) == []
+
+
+async def test_ledger_add_out_of_order(loaded_ledger):
+    for obj_id, day in ((1, 1), (3, 3), (2, 2), (4, 2)):
+        ledger.add(Donation, OpenObject(obj_id, 100, 0, datetime(2020, 1, day)))
+    assert [item[0] for item in ledger.pools[Donation]] == [1, 2, 4, 3], (
+        'Объект, пришедший позже более нового, должен встать на своё место в FIFO.'
+    )
+    assert ledger.loaded, 'Нарушение порядка не должно отключать пулы в памяти.'
+
+
+async def test_ledger_reconcile_endpoint(charity_project, charity_project_nunchaku, loaded_ledger, superuser_client):
+    assert superuser_client.post('/stats/ledger').json() == {
+        'drift': [], 'fixed': False,
+    }
+    async with TestingSessionLocal() as session:
+        await session.execute(
+            delete(CharityProject).where(CharityProject.id == 1)
+        )
+        await session.commit()
+    response = superuser_client.post('/stats/ledger', params={'fix': True})
+    assert response.json()['fixed'] and response.json()['drift'], (
+        'Сверка должна находить и исправлять расхождение пулов с БД.'
+    )
+    assert superuser_client.post('/stats/ledger').json()['drift'] == []
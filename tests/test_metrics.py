@@ -0,0 +1,51 @@
+import re
+
+from app.core.config import settings
+
+
+def timings(response):
+    return {
+        entry.split(';')[0].strip(): entry
+        for entry in response.headers['server-timing'].split(',')
+    }
+
+
+def test_server_timing_header(test_client, charity_project):
+    response = test_client.get('/charity_project/')
+    entries = timings(response)
+    assert 'app' in entries and 'sql' in entries, (
+        'Ответ должен содержать заголовок Server-Timing с общим временем и временем SQL.'
+    )
+    statements = int(re.search(r'desc="(\d+) statements"', entries['sql']).group(1))
+    assert statements >= 1, 'Server-Timing должен учитывать выполненные SQL-запросы.'
+    assert not any(name.startswith('sql-') for name in entries), (
+        'Тексты SQL-запросов не должны попадать в заголовок без настройки.'
+    )
+
+
+def test_server_timing_slowest_statements(test_client, charity_project, monkeypatch):
+    monkeypatch.setattr(settings, 'server_timing_sql', True)
+    entries = timings(test_client.get('/charity_project/'))
+    assert 'SELECT' in entries['sql-1']
+
+
+def test_server_timing_investing(user_client, charity_project):
+    response = user_client.post('/donation/', json={'full_amount': 10})
+    assert 'investing' in timings(response), (
+        'Время распределения средств должно попадать в Server-Timing.'
+    )
+
+
+def test_prometheus_metrics(user_client, test_client, charity_project):
+    test_client.get('/charity_project/')
+    user_client.post('/donation/', json={'full_amount': 10})
+    response = test_client.get('/metrics')
+    assert response.status_code == 200
+    assert response.headers['content-type'].startswith('text/plain; version=0.0.4')
+    text = response.text
+    assert (
+        'http_request_duration_seconds_bucket{method="GET",route="/charity_project/",le="+Inf"}'
+        in text
+    ), 'Гистограммы запросов должны быть разбиты по шаблону пути.'
+    assert 'http_request_sql_statements_count{method="POST",route="/donation/"}' in text
+    assert 'investing_process_duration_seconds_count{model="donation"}' in text
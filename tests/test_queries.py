@@ -0,0 +1,109 @@
+import pytest
+from conftest import engine
+from sqlalchemy import event
+
+
+@pytest.fixture
+def statements():
+    executed = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        executed.append(statement)
+
+    event.listen(engine.sync_engine, 'before_cursor_execute', record)
+    yield executed
+    event.remove(engine.sync_engine, 'before_cursor_execute', record)
+
+
+def test_create_donation_queries(user_client, charity_project, statements):
+    response = user_client.post('/donation/', json={'full_amount': 100})
+    assert response.status_code == 200
+    assert len(statements) <= 9, (
+        'Пожертвование с распределением: INSERT, выборка открытых проектов, '
+        'точка сохранения, два UPDATE, запись в журнал и два UPSERT итогов.\n'
+        + '\n'.join(statements)
+    )
+
+
+def test_create_donation_without_projects_queries(user_client, statements):
+    user_client.post('/donation/', json={'full_amount': 100})
+    assert len(statements) <= 4, '\n'.join(statements)
+
+
+def test_create_charity_project_queries(superuser_client, statements):
+    response = superuser_client.post('/charity_project/', json={
+        'name': 'queries', 'description': 'queries', 'full_amount': 100,
+    })
+    assert response.status_code == 200
+    assert len(statements) <= 3, (
+        'Создание проекта без открытых пожертвований: INSERT, выборка '
+        'открытых пожертвований и UPSERT итогов, без предварительной '
+        'проверки имени.\n'
+        + '\n'.join(statements)
+    )
+
+
+def test_create_charity_project_duplicate_queries(superuser_client, charity_project, statements):
+    response = superuser_client.post('/charity_project/', json={
+        'name': 'chimichangas4life', 'description': 'queries', 'full_amount': 100,
+    })
+    assert response.status_code == 400
+    assert len(statements) <= 1, '\n'.join(statements)
+
+
+def test_update_charity_project_queries(superuser_client, charity_project, statements):
+    response = superuser_client.patch('/charity_project/1', json={'full_amount': 2000000})
+    assert response.status_code == 200
+    assert len(statements) <= 3, '\n'.join(statements)
+
+
+def test_get_charity_projects_queries(user_client, charity_project, charity_project_nunchaku, statements):
+    user_client.get('/charity_project/')
+    assert len(statements) == 1, '\n'.join(statements)
+
+
+def test_get_charity_projects_cached_queries(user_client, charity_project, statements):
+    first = user_client.get('/charity_project/')
+    second = user_client.get('/charity_project/')
+    assert second.json() == first.json()
+    assert len(statements) == 1, (
+        'Повторный запрос списка проектов должен обслуживаться из кэша.\n'
+        + '\n'.join(statements)
+    )
+    user_client.post('/donation/', json={'full_amount': 100})
+    statements.clear()
+    response = user_client.get('/charity_project/')
+    assert response.json()[0]['invested_amount'] == 100, (
+        'Распределение пожертвования должно сбрасывать кэш списка проектов.'
+    )
+    assert len(statements) == 1
+
+
+async def test_donation_history_reads_only_index(user_client, donation):
+    recorded = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        recorded.append((statement, parameters))
+
+    event.listen(engine.sync_engine, 'before_cursor_execute', record)
+    try:
+        response = user_client.get(
+            '/donation/my', params={'fields': 'full_amount', 'limit': 5}
+        )
+    finally:
+        event.remove(engine.sync_engine, 'before_cursor_execute', record)
+    assert response.status_code == 200
+    statement, parameters = next(
+        (statement, parameters) for statement, parameters in recorded
+        if statement.lstrip().startswith('SELECT')
+        and 'FROM donation' in statement
+    )
+    async with engine.connect() as connection:
+        plan = await connection.exec_driver_sql(
+            f'EXPLAIN QUERY PLAN {statement}', parameters
+        )
+        details = ' '.join(row[-1] for row in plan)
+    assert 'COVERING INDEX ix_donation_user_history' in details, (
+        'История сумм пожертвований должна читаться только из индекса.\n'
+        + details
+    )
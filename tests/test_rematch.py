@@ -0,0 +1,81 @@
+from datetime import datetime, timedelta
+
+import pytest
+from conftest import TestingSessionLocal
+from sqlalchemy import select
+
+from app.models import CharityProject, Donation
+from app.tools.rematch import rematch
+from app.tools.replay_allocations import replay_allocations
+from app.utils.response_cache import response_cache
+
+
+@pytest.fixture
+def open_pools(mixer):
+    start = datetime(2020, 1, 1)
+    for i, amount in enumerate((100, 50, 300)):
+        mixer.blend(
+            'app.models.charity_project.CharityProject',
+            name=f'project {i}', description='-', full_amount=amount,
+            invested_amount=0, fully_invested=False,
+            create_date=start + timedelta(days=i),
+        )
+    for i, amount in enumerate((70, 70, 70, 500)):
+        mixer.blend(
+            'app.models.donation.Donation', full_amount=amount,
+            invested_amount=0, fully_invested=False, user_id=None,
+            create_date=start + timedelta(days=i),
+        )
+
+
+async def read_state(session, model):
+    rows = await session.execute(
+        select(model.invested_amount, model.fully_invested).order_by(model.id)
+    )
+    return [tuple(row) for row in rows]
+
+
+@pytest.mark.parametrize('chunk_size', [1, 1000])
+async def test_rematch(open_pools, chunk_size):
+    progress = []
+    async with TestingSessionLocal() as session:
+        stats = await rematch(
+            session, chunk_size=chunk_size, on_progress=progress.append,
+        )
+    assert (stats.transfers, stats.amount) == (6, 450)
+    assert len(progress) > (chunk_size == 1), (
+        'Прогресс должен сообщаться после каждой записанной порции.'
+    )
+    async with TestingSessionLocal() as session:
+        assert await read_state(session, Donation) == [
+            (70, True), (70, True), (70, True), (240, False),
+        ], 'Пожертвования должны распределяться в порядке FIFO, как в invest_money.'
+        assert await read_state(session, CharityProject) == [
+            (100, True), (50, True), (300, True),
+        ]
+        assert await replay_allocations(session) == [], (
+            'Переводы повторного распределения должны попадать в журнал.'
+        )
+
+
+async def test_rematch_resets_response_cache(open_pools):
+    namespaces = (CharityProject.__tablename__, Donation.__tablename__)
+    before = [await response_cache.backend.version(name) for name in namespaces]
+    async with TestingSessionLocal() as session:
+        await rematch(session)
+    after = [await response_cache.backend.version(name) for name in namespaces]
+    assert all(new > old for old, new in zip(before, after)), (
+        'Повторное распределение должно сбрасывать кэш списков проектов и пожертвований.'
+    )
+
+
+async def test_rematch_dry_run(open_pools):
+    diff = []
+    async with TestingSessionLocal() as session:
+        await rematch(session, dry_run=True, on_diff=diff.append)
+    assert 'donation 4: invested_amount 0 -> 240 (открыт)' in diff
+    assert len(diff) == 7, 'Пробный запуск должен показывать все изменения.'
+    async with TestingSessionLocal() as session:
+        assert await read_state(session, Donation) == [(0, False)] * 4, (
+            'Пробный запуск не должен менять данные.'
+        )
@@ -0,0 +1,93 @@
+import pytest
+import pytest_asyncio
+from conftest import BASE_DIR, TestingSessionLocal, app
+from fastapi.testclient import TestClient
+from fixtures.user import user
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from starlette.requests import Request
+
+from app.core import replicas
+from app.core.db import Base
+from app.core.replicas import (ReadYourWritesMiddleware, SessionRouter,
+                               current_user_id, get_read_session)
+from app.core.user import jwt_strategy
+from app.models import Donation
+
+REPLICA_DB = BASE_DIR / 'replica.db'
+
+
+@pytest_asyncio.fixture
+async def replica():
+    engine = create_async_engine(f'sqlite+aiosqlite:///{REPLICA_DB}')
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.execute(insert(Donation).values(
+            id=1, user_id=2, full_amount=777, invested_amount=0,
+            fully_invested=False,
+        ))
+    yield sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    await engine.dispose()
+    REPLICA_DB.unlink()
+
+
+@pytest.fixture
+def routed_client(user_client, replica, monkeypatch):
+    router = SessionRouter(TestingSessionLocal, [replica], read_your_writes=60)
+    monkeypatch.setattr(replicas, 'session_router', router)
+    app.dependency_overrides.pop(get_read_session)
+    app.dependency_overrides[current_user_id] = lambda: 2
+    return user_client
+
+
+def amounts(client):
+    return [item['full_amount'] for item in client.get('/donation/my').json()]
+
+
+def test_reads_go_to_replica(routed_client):
+    assert amounts(routed_client) == [777], (
+        'Чтение списка своих пожертвований должно идти в реплику.'
+    )
+
+
+def test_read_your_writes(routed_client):
+    routed_client.post('/donation/', json={'full_amount': 10})
+    assert amounts(routed_client) == [10], (
+        'После записи пользователь должен читать свои изменения из основной БД.'
+    )
+    app.dependency_overrides[current_user_id] = lambda: 3
+    assert amounts(routed_client) == [777], (
+        'Другие пользователи продолжают читать из реплики.'
+    )
+
+
+def test_read_your_writes_across_processes(routed_client, replica, monkeypatch):
+    client = TestClient(ReadYourWritesMiddleware(app))
+    response = client.post('/donation/', json={'full_amount': 10})
+    assert 'read_primary_until=' in response.headers['set-cookie'], (
+        'После записи клиент должен получить cookie со сроком чтения из основной БД.'
+    )
+    # Другой процесс не видит отметку о записи в памяти этого процесса.
+    monkeypatch.setattr(replicas, 'session_router', SessionRouter(
+        TestingSessionLocal, [replica], read_your_writes=60,
+    ))
+    assert amounts(client) == [10], (
+        'По cookie чтения после записи должны идти в основную БД в любом процессе.'
+    )
+
+
+def test_router_without_replicas_reads_primary():
+    router = SessionRouter(TestingSessionLocal)
+    assert router.for_read() is TestingSessionLocal
+    assert router.for_read(2) is TestingSessionLocal
+
+
+async def test_current_user_id_from_token():
+    token = await jwt_strategy.write_token(user)
+
+    def request(authorization):
+        return Request({'type': 'http', 'headers': [(b'authorization', authorization.encode())]})
+
+    assert await current_user_id(request(f'Bearer {token}')) == 2
+    assert await current_user_id(request('Bearer broken')) is None
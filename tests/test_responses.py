@@ -0,0 +1,49 @@
+import json
+from datetime import datetime
+
+from conftest import TestingSessionLocal
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import select
+
+from app.api import responses
+from app.models import CharityProject, Donation
+from app.schemas.charity_project import CharityProjectDB
+from app.schemas.donation import DonationCreate, DonationDB
+
+
+async def through_schema(model, schema, **options):
+    async with TestingSessionLocal() as session:
+        objs = await session.scalars(select(model).order_by(model.id))
+        return [
+            jsonable_encoder(schema.from_orm(obj), **options) for obj in objs
+        ]
+
+
+async def test_lists_match_schema_serialization(superuser_client, charity_project):
+    superuser_client.post('/donation/', json={'full_amount': 10})
+    superuser_client.post('/donation/', json={'full_amount': 2000000, 'comment': 'Всё'})
+    assert superuser_client.get('/donation/').json() == await through_schema(
+        Donation, DonationDB, exclude_none=True
+    ), 'Список пожертвований должен совпадать с сериализацией через схему.'
+    assert superuser_client.get('/charity_project/').json() == await through_schema(
+        CharityProject, CharityProjectDB, exclude_none=True
+    ), 'Список проектов должен совпадать с сериализацией через схему.'
+
+
+async def test_my_donations_match_schema_serialization(user_client, charity_project):
+    user_client.post('/donation/', json={'full_amount': 10})
+    user_client.post('/donation/', json={'full_amount': 20, 'comment': 'Всё'})
+    my = user_client.get('/donation/my').json()
+    assert my == await through_schema(Donation, DonationCreate), (
+        'Список своих пожертвований должен совпадать с сериализацией через схему.'
+    )
+    assert my[0]['comment'] is None and 'user_id' not in my[0], (
+        'В своих пожертвованиях пустой комментарий выдаётся как null, а user_id скрыт.'
+    )
+
+
+def test_dumps_dates_like_schemas():
+    content = [{'id': 1, 'name': 'Проект', 'create_date': datetime(2011, 11, 11, 0, 0, 0, 5)}]
+    assert json.loads(responses.dumps(content)) == [
+        {'id': 1, 'name': 'Проект', 'create_date': '2011-11-11T00:00:00.000005'}
+    ], 'Даты должны выводиться как isoformat(), как в схемах pydantic.'
@@ -0,0 +1,121 @@
+import pytest
+from conftest import SQLALCHEMY_DATABASE_URL, TestingSessionLocal, engine
+from mixer.backend.sqlalchemy import Mixer
+
+from app.api.endpoints.metrics import startup_gauges
+from app.core.config import settings
+from app.core.db import make_engine
+from app.core.init_db import user_exists
+from app.core.lifecycle import Lifecycle, lifecycle
+from app.core.warmup import preload_project_list, warm_pool, warm_statements
+from app.crud.charity_project import charity_project_crud
+from app.crud.donation import donation_crud
+from app.models import CharityProject, User
+from app.schemas.charity_project import CharityProjectDB
+from app.schemas.donation import DonationCreate
+from app.utils.aggregates import read_totals
+from app.utils.investing import get_not_full_invested_objects
+from app.utils.response_cache import response_cache
+
+
+async def test_lifecycle_order_and_rollback():
+    calls = []
+
+    def hook(name):
+        async def run():
+            calls.append(name)
+        return run
+
+    async def fail():
+        raise RuntimeError('boom')
+
+    phases = Lifecycle()
+    phases.add('first', hook('start first'), hook('stop first'))
+    phases.add('warmup', fail, optional=True)
+    phases.add('second', hook('start second'), hook('stop second'))
+    await phases.startup()
+    await phases.shutdown()
+    assert calls == [
+        'start first', 'start second', 'stop second', 'stop first'
+    ], 'Фазы должны останавливаться в порядке, обратном запуску.'
+    assert list(phases.timings) == ['first', 'warmup', 'second'], (
+        'Время запуска должно записываться для каждой фазы.'
+    )
+
+    calls.clear()
+    phases.add('broken', fail)
+    with pytest.raises(RuntimeError):
+        await phases.startup()
+    assert calls == [
+        'start first', 'start second', 'stop second', 'stop first'
+    ], 'При ошибке обязательной фазы запущенные фазы должны остановиться.'
+
+
+async def test_lifecycle_restart_resets_state():
+    phases = Lifecycle()
+    phases.add('only')
+    await phases.startup()
+    await phases.startup()
+    assert [phase.name for phase in phases.started] == ['only'], (
+        'Повторный запуск не должен накапливать запущенные фазы.'
+    )
+    assert list(phases.timings) == ['only']
+
+
+async def test_warm_pool_opens_connections():
+    warmed_engine = make_engine(SQLALCHEMY_DATABASE_URL)
+    try:
+        assert await warm_pool(warmed_engine) == settings.pool_size
+        assert warmed_engine.pool.checkedin() == settings.pool_size, (
+            'После прогрева соединения должны ждать в пуле.'
+        )
+    finally:
+        await warmed_engine.dispose()
+
+
+async def test_warm_statements_fill_compiled_cache(charity_project, donation):
+    async with TestingSessionLocal() as session:
+        await warm_statements(session)
+    compiled = len(engine.sync_engine._compiled_cache)
+    async with TestingSessionLocal() as session:
+        async for _ in get_not_full_invested_objects(
+            CharityProject, session, batch_size=1
+        ):
+            pass
+        await charity_project_crud.get(1, session)
+        await charity_project_crud.get_page(
+            session, 5, fields=list(CharityProjectDB.__fields__)
+        )
+        await donation_crud.get_user_history(
+            session, 2, list(DonationCreate.__fields__), limit=5
+        )
+        await read_totals(session)
+    assert len(engine.sync_engine._compiled_cache) == compiled, (
+        'Горячие запросы после прогрева не должны компилироваться заново.'
+    )
+
+
+async def test_user_exists(mixer: Mixer):
+    mixer.blend(User, email='Admin@Example.com')
+    async with TestingSessionLocal() as session:
+        assert await user_exists(session, 'admin@example.com')
+        assert not await user_exists(session, 'nobody@example.com')
+
+
+async def test_preload_project_list(test_client, charity_project):
+    async with TestingSessionLocal() as session:
+        await preload_project_list(session)
+    key = await response_cache.key(CharityProject.__tablename__, '')
+    entry = await response_cache.get(key)
+    assert entry is not None, 'Список проектов должен оказаться в кэше.'
+    response = test_client.get('/charity_project/')
+    assert response.headers['etag'] == entry.etag, (
+        'Первый запрос списка должен отдаваться из заполненного кэша.'
+    )
+
+
+def test_startup_gauges(monkeypatch):
+    monkeypatch.setattr(lifecycle, 'timings', {'warmup': 0.25})
+    assert 'app_startup_phase_seconds{phase="warmup"} 0.25' in (
+        startup_gauges()
+    )
@@ -0,0 +1,115 @@
+from itertools import count
+
+from conftest import TestingSessionLocal, app, current_user
+from fixtures.user import user
+from sqlalchemy import func, select
+
+from app.models import FundTotals
+from app.utils import aggregates
+from app.utils.aggregates import reconcile_totals
+
+
+def test_stats_follow_writes(superuser_client):
+    app.dependency_overrides[current_user] = lambda: user
+    superuser_client.post('/charity_project/', json={
+        'name': 'first', 'description': 'first', 'full_amount': 100,
+    })
+    superuser_client.post('/charity_project/', json={
+        'name': 'second', 'description': 'second', 'full_amount': 500,
+    })
+    superuser_client.patch('/charity_project/2', json={'full_amount': 600})
+    superuser_client.post('/donation/', json={'full_amount': 300})
+    superuser_client.post('/donation/batch', json=[{'full_amount': 400}, {'full_amount': 50}])
+    response = superuser_client.get('/stats/')
+    assert response.status_code == 200, (
+        'Эндпоинт итогов фонда должен возвращать статус-код 200.'
+    )
+    assert response.json() == {
+        'projects_count': 2,
+        'open_projects': 0,
+        'projects_required': 700,
+        'donations_count': 3,
+        'open_donations': 1,
+        'donated': 750,
+        'invested': 700,
+        'still_needed': 0,
+        'free_donations': 50,
+    }, 'Итоги фонда должны учитывать создание, изменение и распределение.'
+    assert superuser_client.get('/stats/my').json() == {
+        'donations_count': 3, 'donated': 750, 'invested': 700,
+    }
+    response = superuser_client.post('/stats/reconcile')
+    assert response.json() == {'drift': [], 'fixed': False}, (
+        'Итоги, накопленные через API, должны совпадать с пересчётом по таблицам.'
+    )
+
+
+async def test_stats_reconcile_fixes_drift(superuser_client, charity_project, donation):
+    response = superuser_client.post('/stats/reconcile', params={'fix': True})
+    assert response.json()['fixed']
+    assert 'donated: stored=0 actual=100' in response.json()['drift'], (
+        'Сверка должна сообщать о расхождении итогов с таблицами.'
+    )
+    async with TestingSessionLocal() as session:
+        assert await reconcile_totals(session) == [], (
+            'После исправления итоги должны совпадать с таблицами.'
+        )
+    assert superuser_client.get('/stats/').json()['projects_required'] == 1000000
+
+
+async def test_fund_totals_are_sharded(superuser_client, monkeypatch):
+    app.dependency_overrides[current_user] = lambda: user
+    shards = count()
+    monkeypatch.setattr(
+        aggregates.random, 'randint', lambda low, high: next(shards) % high + 1
+    )
+    monkeypatch.setattr(aggregates.settings, 'totals_shards', 3)
+    superuser_client.post('/charity_project/', json={
+        'name': 'first', 'description': 'first', 'full_amount': 100,
+    })
+    for amount in (30, 40, 50):
+        superuser_client.post('/donation/', json={'full_amount': amount})
+    async with TestingSessionLocal() as session:
+        rows = await session.scalar(select(func.count(FundTotals.id)))
+    assert rows == 3, 'Итоги фонда должны раскладываться по строкам-частям.'
+    stats = superuser_client.get('/stats/').json()
+    assert (stats['donated'], stats['invested'], stats['open_projects']) == (
+        120, 100, 0
+    ), 'Итоги фонда должны складываться из всех строк-частей.'
+    response = superuser_client.post('/stats/reconcile')
+    assert response.json() == {'drift': [], 'fixed': False}
+
+
+def test_user_invested_follows_later_projects(superuser_client):
+    app.dependency_overrides[current_user] = lambda: user
+    superuser_client.post('/donation/', json={'full_amount': 300})
+    assert superuser_client.get('/stats/my').json()['invested'] == 0
+    superuser_client.post('/charity_project/', json={
+        'name': 'first', 'description': 'first', 'full_amount': 100,
+    })
+    assert superuser_client.get('/stats/my').json() == {
+        'donations_count': 1, 'donated': 300, 'invested': 100,
+    }, 'Вложенная сумма пользователя должна расти, когда новый проект забирает его пожертвование.'
+    response = superuser_client.post('/stats/reconcile')
+    assert response.json() == {'drift': [], 'fixed': False}
+
+
+def test_large_amounts_sum_without_overflow(superuser_client):
+    app.dependency_overrides[current_user] = lambda: user
+    amount = 5 * 10 ** 11
+    response = superuser_client.post('/charity_project/', json={
+        'name': 'large', 'description': 'large', 'full_amount': amount,
+    })
+    assert response.json()['full_amount'] == amount, (
+        'Суммы больше 2**31 копеек должны сохраняться без потерь.'
+    )
+    superuser_client.post('/donation/batch', json=[
+        {'full_amount': amount // 2}, {'full_amount': amount // 2 + 1},
+    ])
+    stats = superuser_client.get('/stats/').json()
+    assert (stats['donated'], stats['invested'], stats['free_donations']) == (
+        amount + 1, amount, 1,
+    ), 'Итоги по крупным суммам не должны переполняться.'
+    assert superuser_client.post('/stats/reconcile').json() == {
+        'drift': [], 'fixed': False,
+    }, 'Пересчёт итогов в БД должен совпадать с накопленными итогами.'